@@ -1,5 +1,5 @@
 # -*- coding: utf-8 -*-
-from . import future, async, limit, singleton, core, stream, green, event
+from . import future, async, limit, singleton, core, stream, green, event, fs
 
 from .future import *
 from .async import *
@@ -9,9 +9,10 @@ from .core import *
 from .stream import *
 from .green import *
 from .event import *
+from .fs import *
 
 __all__ = (future.__all__ + async.__all__ + limit.__all__ + singleton.__all__ +
-           core.__all__ + stream.__all__ + green.__all__ + event.__all__)
+           core.__all__ + stream.__all__ + green.__all__ + event.__all__ + fs.__all__)
 #------------------------------------------------------------------------------#
 # Load Test Protocol                                                           #
 #------------------------------------------------------------------------------#
@@ -2,11 +2,14 @@
 import sys
 import inspect
 import functools
+from time import time
 
-from .future.future import CompletedFuture
-from .future.pair import FutureSourcePair
+from .future.future import Future, CompletedFuture, FutureCanceled
+from .future.promise import Promise, STATE_DONE
 
-__all__ = ('Async', 'AsyncReturn', 'DummyAsync',)
+__all__ = ('Async', 'AsyncReturn', 'DummyAsync', 'Task',)
+
+getframe = getattr (sys, '_getframe', None)
 #------------------------------------------------------------------------------#
 # Asynchronous Function                                                        #
 #------------------------------------------------------------------------------#
@@ -37,34 +40,165 @@ def Async (function):
 
     @functools.wraps (function)
     def generator_async (*args, **keys):
-        generator = function (*args, **keys)
-        future, source = FutureSourcePair ()
-
-        def generator_cont (result, error):
-            """Resume generator with provided result, error pair.
-            """
-            try:
-                while True:
-                    awaiter = (generator.send  (result) if error is None else
-                               generator.throw (*error)).Await ()
-
-                    if awaiter.IsCompleted ():
-                        result, error = awaiter.GetResult ()
-                    else:
-                        awaiter.OnCompleted (generator_cont)
-                        return
+        task = Task (function (*args, **keys))
+        task (None, None)
+        return task
 
-            except (AsyncResult, StopIteration) as result:
-                source.SetResult (result.args [0] if result.args else None)
-            except Exception:
-                source.SetError (sys.exc_info ())
-
-            generator.close ()
+    return generator_async
 
-        generator_cont (None, None)
-        return future
+#------------------------------------------------------------------------------#
+# Task                                                                         #
+#------------------------------------------------------------------------------#
+class Task (Promise):
+    """Task of asynchronous function
 
-    return generator_async
+    Task is a future resolved with result of the generator, and it is also the
+    continuation which resumes the generator, so suspension does not allocate
+    anything. Creation site and runtime are recorded only in debug mode.
+    """
+    __slots__ = ('generator', 'awaiter', 'canceled', 'site', 'started', 'stopped',)
+
+    debug = False
+
+    def __init__ (self, generator):
+        Promise.__init__ (self)
+        self.generator = generator
+        self.awaiter = None
+        self.canceled = False
+
+        if self.debug:
+            frame = getframe (2) if getframe else None # caller of asynchronous function
+            self.site = (frame.f_code.co_filename, frame.f_lineno) if frame else None
+            self.started = time ()
+        else:
+            self.site = None
+            self.started = None
+        self.stopped = None
+
+    @classmethod
+    def Debug (cls, enable = None):
+        """Set or get debug mode
+
+        Creation site and runtime are recorded for tasks created in debug mode.
+        If enable is not set, returns current debug mode.
+        """
+        if enable is not None:
+            cls.debug = bool (enable)
+        return cls.debug
+
+    #--------------------------------------------------------------------------#
+    # Properties                                                               #
+    #--------------------------------------------------------------------------#
+    @property
+    def Name (self):
+        """Name of asynchronous function
+        """
+        return self.generator.__name__
+
+    @property
+    def Awaiter (self):
+        """Awaiter task is suspended on (None if task is running or completed)
+        """
+        return self.awaiter
+
+    @property
+    def Site (self):
+        """Creation site of the task as (file name, line number) pair
+
+        None if task has not been created in debug mode.
+        """
+        return self.site
+
+    @property
+    def Runtime (self):
+        """Time in seconds since task creation until its completion (or now)
+
+        None if task has not been created in debug mode.
+        """
+        if self.started is None:
+            return None
+        return (self.stopped or time ()) - self.started
+
+    #--------------------------------------------------------------------------#
+    # Cancel                                                                   #
+    #--------------------------------------------------------------------------#
+    def Cancel (self):
+        """Cancel task
+
+        FutureCanceled is raised inside the generator once it is resumed: at
+        the next yield if task cancels itself, otherwise once the awaiter it is
+        suspended on is completed (its result is ignored). If the awaiter is a
+        task, it is canceled as well. Returns False if task is completed.
+        """
+        if self.state & STATE_DONE:
+            return False
+
+        if not self.canceled:
+            self.canceled = True
+            if isinstance (self.awaiter, Task):
+                self.awaiter.Cancel ()
+        return True
+
+    def Dispose (self):
+        """Dispose task (cancel it)
+        """
+        self.Cancel ()
+
+    #--------------------------------------------------------------------------#
+    # Resume                                                                   #
+    #--------------------------------------------------------------------------#
+    def __call__ (self, result, error):
+        """Resume generator with provided result, error pair
+        """
+        if self.canceled:
+            self.canceled = False
+            if error is None:
+                result, error = None, canceled_error ()
+
+        generator = self.generator
+        self.awaiter = None
+        try:
+            while True:
+                awaiter = (generator.send  (result) if error is None else
+                           generator.throw (*error)).Await ()
+
+                if self.canceled:
+                    self.canceled = False
+                    result, error = None, canceled_error ()
+                elif awaiter.IsCompleted ():
+                    result, error = awaiter.GetResult ()
+                else:
+                    self.awaiter = awaiter
+                    awaiter.OnCompleted (self)
+                    return
+
+        except (AsyncResult, StopIteration) as result:
+            if self.started is not None:
+                self.stopped = time ()
+            self.TrySetResult (result.args [0] if result.args else None)
+        except Exception:
+            if self.started is not None:
+                self.stopped = time ()
+            self.TrySetError (sys.exc_info ())
+
+        generator.close ()
+
+    #--------------------------------------------------------------------------#
+    # To String                                                                #
+    #--------------------------------------------------------------------------#
+    def __str__ (self):
+        """String representation of the task
+        """
+        if self.state & STATE_DONE:
+            return Future.__str__ (self)
+        return '<{} [{} ?{}] at {}>'.format (type (self).__name__, self.Name, self.awaiter, id (self))
+
+def canceled_error ():
+    """Error of canceled task
+    """
+    try: raise FutureCanceled ('Task has been canceled')
+    except FutureCanceled:
+        return sys.exc_info ()
 
 #------------------------------------------------------------------------------#
 # Dummy Asynchronous Function                                                  #
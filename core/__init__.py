@@ -4,13 +4,14 @@
 # won't hurt.
 CORE_TIMEOUT = 3600.0
 
-from . import poll, error, core
+from . import poll, error, core, worker
 
 from .poll import *
 from .error import *
 from .core import *
+from .worker import *
 
-__all__ = poll.__all__ + error.__all__ + core.__all__ + (
+__all__ = poll.__all__ + error.__all__ + core.__all__ + worker.__all__ + (
           'Time', 'TimeDelay', 'Idle', 'Poll',)
 
 #------------------------------------------------------------------------------#
@@ -49,6 +49,9 @@ class Core (object):
         self.context = ContextAwaiter (self)
         self.files = {}
 
+        # corked streams
+        self.corked = set ()
+
         # notifier
         self.notifier = Notifier (self)
 
@@ -147,6 +150,28 @@ class Core (object):
 
         return file.Await (mask, cancel)
 
+    #--------------------------------------------------------------------------#
+    # Cork                                                                     #
+    #--------------------------------------------------------------------------#
+    def Cork (self, stream):
+        """Flush stream at the end of current iteration
+
+        Stream is flushed once before the core blocks waiting for events, so all
+        writes made during single iteration are coalesced into single flush.
+        """
+        if self.Disposed:
+            raise RuntimeError ('Core is disposed')
+
+        self.corked.add (stream)
+
+    def uncork (self):
+        """Flush corked streams
+        """
+        corked, self.corked = self.corked, set ()
+        for stream in corked:
+            if not stream.Disposed:
+                stream.Flush ()
+
     #--------------------------------------------------------------------------#
     # Notify                                                                   #
     #--------------------------------------------------------------------------#
@@ -225,7 +250,12 @@ class Core (object):
                 # StopIteration and break this loop.
                 yield
 
-                events = self.poller.Poll (0) if not block else \
+                # Flush streams written during this iteration. Streams corked by
+                # flush itself must not wait for events.
+                if self.corked:
+                    self.uncork ()
+
+                events = self.poller.Poll (0) if not block or self.corked else \
                          self.poller.Poll (min (timer.Timeout (), context.Timeout ()))
 
         finally:
@@ -258,6 +288,7 @@ class Core (object):
         files, self.files = self.files, {}
         for file in files.values ():
             file.Dispose (error)
+        self.corked.clear ()
         self.context.Dispose (error)
         self.timer.Dispose (error)
 
@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+import sys
+import threading
+import collections
+
+from .core import Core
+from ..async import Async, AsyncReturn
+from ..future import FutureSourcePair, FutureCanceled
+
+__all__ = ('WorkerPool',)
+#------------------------------------------------------------------------------#
+# Worker Pool                                                                  #
+#------------------------------------------------------------------------------#
+class WorkerPool (object):
+    """Pool of worker threads
+
+    Executes blocking functions (such as regular file I/O, which can not be
+    polled) on at most ``size`` threads, threads are started on demand. Returned
+    futures are resolved inside thread of the core which was current on
+    submission. It is safe to submit functions from any thread.
+    """
+    instance_lock = threading.Lock ()
+    instance      = None
+
+    default_size = 4
+
+    def __init__ (self, size = None, core = None):
+        self.size = size or self.default_size
+        self.core = core
+
+        self.lock = threading.Lock ()
+        self.cond = threading.Condition (self.lock)
+        self.jobs = collections.deque ()
+        self.workers = []
+        self.idle = 0
+        self.disposed = False
+
+    #--------------------------------------------------------------------------#
+    # Instance                                                                 #
+    #--------------------------------------------------------------------------#
+    @classmethod
+    def Instance (cls, instance = None):
+        """Global pool instance
+
+        If ``instance`` is provided sets current global instance to ``instance``,
+        otherwise returns current global instance, creates it if needed.
+        """
+        with cls.instance_lock:
+            if instance is not None:
+                cls.instance = instance
+            elif cls.instance is None:
+                cls.instance = WorkerPool ()
+            return cls.instance
+
+    #--------------------------------------------------------------------------#
+    # Submit                                                                   #
+    #--------------------------------------------------------------------------#
+    def Submit (self, func, *args):
+        """Execute function with arguments on worker thread
+
+        Returns future resolved with function's result inside core's thread.
+        """
+        core = self.core or Core.Instance ()
+
+        future, source = FutureSourcePair ()
+        with self.lock:
+            if self.disposed:
+                source.SetException (FutureCanceled ('Worker pool is disposed'))
+                return future
+
+            self.jobs.append ((func, args, source, core))
+            if self.idle:
+                self.idle -= 1 # waked up worker is no longer idle
+                self.cond.notify ()
+            elif len (self.workers) < self.size:
+                worker = threading.Thread (target = self.worker)
+                worker.daemon = True
+                worker.start ()
+                self.workers.append (worker)
+
+        return future
+
+    @Async
+    def Map (self, func, items, chunk_size = None):
+        """Apply function to each item on worker threads
+
+        Items are split into chunks of ``chunk_size`` (by default items are
+        evenly split between workers), each chunk is processed by single worker
+        thread, hence core is notified once per chunk. Returns list of results.
+        """
+        items = list (items)
+        if not items:
+            AsyncReturn ([])
+
+        chunk_size = chunk_size or -(-len (items) // self.size)
+        futures = [self.Submit (map_chunk, func, items [offset:offset + chunk_size])
+                   for offset in range (0, len (items), chunk_size)]
+
+        results = []
+        for future in futures:
+            results.extend ((yield future))
+        AsyncReturn (results)
+
+    #--------------------------------------------------------------------------#
+    # Properties                                                               #
+    #--------------------------------------------------------------------------#
+    @property
+    def Size (self):
+        """Maximum number of worker threads
+        """
+        return self.size
+
+    @property
+    def Pending (self):
+        """Number of jobs waiting for execution
+        """
+        return len (self.jobs)
+
+    #--------------------------------------------------------------------------#
+    # Private                                                                  #
+    #--------------------------------------------------------------------------#
+    def worker (self):
+        """Worker thread main function
+        """
+        while True:
+            with self.lock:
+                while not self.jobs and not self.disposed:
+                    self.idle += 1
+                    self.cond.wait ()
+                if self.disposed:
+                    return
+                func, args, source, core = self.jobs.popleft ()
+
+            try:
+                result, error = func (*args), None
+            except Exception:
+                result, error = None, sys.exc_info ()
+            self.complete (core, source, result, error)
+
+    @staticmethod
+    def complete (core, source, result, error):
+        """Resolve source inside core's thread
+        """
+        def complete_cont (_, context_error):
+            if context_error is not None:
+                source.TrySetError (context_error) # core has been disposed
+            elif error is None:
+                source.TrySetResult (result)
+            else:
+                source.TrySetError (error)
+
+        try:
+            core.Context ().Then (complete_cont)
+        except Exception:
+            complete_cont (None, sys.exc_info ()) # core has been disposed concurrently
+
+    #--------------------------------------------------------------------------#
+    # Disposable                                                               #
+    #--------------------------------------------------------------------------#
+    def Dispose (self):
+        """Dispose pool
+
+        Jobs which have not been started yet are canceled, worker threads exit
+        once current jobs are finished.
+        """
+        with self.lock:
+            if self.disposed:
+                return
+            self.disposed = True
+            jobs, self.jobs = self.jobs, collections.deque ()
+            self.cond.notify_all ()
+
+        try:
+            raise FutureCanceled ('Worker pool has been disposed')
+        except FutureCanceled:
+            error = sys.exc_info ()
+        for func, args, source, core in jobs:
+            self.complete (core, source, None, error)
+
+    def __enter__ (self):
+        return self
+
+    def __exit__ (self, et, eo, tb):
+        self.Dispose ()
+        return False
+
+    #--------------------------------------------------------------------------#
+    # To String                                                                #
+    #--------------------------------------------------------------------------#
+    def __str__ (self):
+        """String representation
+        """
+        return '<WorkerPool [size:{} workers:{} pending:{}] at {}>'.format (
+            self.size, len (self.workers), len (self.jobs), id (self))
+
+    def __repr__ (self):
+        """String representation
+        """
+        return str (self)
+
+def map_chunk (func, items):
+    """Apply function to chunk of items
+    """
+    return [func (item) for item in items]
+
+# vim: nu ft=python columns=120 :
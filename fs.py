@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+"""Asynchronous file system operations
+
+File system calls block, so they are executed by worker pool and returned
+futures are resolved inside core's thread.
+"""
+import os
+import errno
+
+from .async import Async, AsyncReturn
+from .future import RaisedFuture
+from .core.worker import WorkerPool
+from .stream.disk import BufferedFileFD
+
+__all__ = ('Stat', 'StatBatch', 'ListDir', 'ScanDir', 'Open', 'Rename', 'Unlink', 'FSync',)
+
+scandir = getattr (os, 'scandir', None) # python 3.5 or higher
+#------------------------------------------------------------------------------#
+# Stat                                                                         #
+#------------------------------------------------------------------------------#
+def Stat (path, follow = None, pool = None):
+    """Stat path
+
+    Symbolic links are followed unless ``follow`` is False.
+    """
+    return (pool or WorkerPool.Instance ()).Submit (os.stat if follow is None or follow else os.lstat, path)
+
+def StatBatch (paths, follow = None, chunk_size = None, pool = None):
+    """Stat list of paths
+
+    Paths are processed in chunks (each chunk is processed by single worker
+    thread). Returns list of stat results, where result is None if path does
+    not exist.
+    """
+    stat = os.stat if follow is None or follow else os.lstat
+    def stat_path (path):
+        try:
+            return stat (path)
+        except OSError as error:
+            if error.errno != errno.ENOENT:
+                raise
+    return (pool or WorkerPool.Instance ()).Map (stat_path, paths, chunk_size)
+
+#------------------------------------------------------------------------------#
+# Directory                                                                    #
+#------------------------------------------------------------------------------#
+def ListDir (path, pool = None):
+    """List directory
+
+    Returns list of entry names.
+    """
+    return (pool or WorkerPool.Instance ()).Submit (os.listdir, path)
+
+def ScanDir (path, pool = None):
+    """Scan directory (python 3.5 or higher)
+
+    Returns list of os.DirEntry objects. Entry type methods (is_dir, is_file)
+    do not usually require system calls, but stat method does, so it must not
+    be used inside core's thread.
+    """
+    if scandir is None:
+        return RaisedFuture (NotImplementedError ('scandir is not supported'))
+    return (pool or WorkerPool.Instance ()).Submit (scan_dir, path)
+
+def scan_dir (path):
+    """Scan directory into list
+    """
+    entries = scandir (path)
+    try:
+        return list (entries)
+    finally:
+        getattr (entries, 'close', lambda: None) () # python 3.6 or higher
+
+#------------------------------------------------------------------------------#
+# Open                                                                         #
+#------------------------------------------------------------------------------#
+@Async
+def Open (path, flags = None, mode = None, buffer_size = None, pool = None):
+    """Open file
+
+    Returns buffered stream appropriate for opened file (BufferedDiskFile for
+    regular files).
+    """
+    fd = yield (pool or WorkerPool.Instance ()).Submit (os.open, path,
+        os.O_RDONLY if flags is None else flags, 0o666 if mode is None else mode)
+    try:
+        stream = BufferedFileFD (fd, buffer_size)
+    except Exception:
+        os.close (fd)
+        raise
+    AsyncReturn (stream)
+
+#------------------------------------------------------------------------------#
+# Modify                                                                       #
+#------------------------------------------------------------------------------#
+def Rename (source, target, pool = None):
+    """Rename file or directory
+    """
+    return (pool or WorkerPool.Instance ()).Submit (os.rename, source, target)
+
+def Unlink (path, pool = None):
+    """Remove file
+    """
+    return (pool or WorkerPool.Instance ()).Submit (os.unlink, path)
+
+def FSync (file, pool = None):
+    """Flush file (descriptor or object with fileno method) to disk
+    """
+    return (pool or WorkerPool.Instance ()).Submit (os.fsync, file if isinstance (file, int) else file.fileno ())
+
+# vim: nu ft=python columns=120 :
@@ -1,7 +1,8 @@
 # -*- coding: utf-8 -*-
-from . import future, pair, source, delegate, lazy, scope, progress
+from . import future, promise, pair, source, delegate, lazy, scope, progress
 
 from .future   import *
+from .promise  import *
 from .pair     import *
 from .source   import *
 from .delegate import *
@@ -9,6 +10,6 @@ from .lazy     import *
 from .scope    import *
 from .progress import *
 
-__all__ = (future.__all__ + pair.__all__ + source.__all__ + delegate.__all__ +
+__all__ = (future.__all__ + promise.__all__ + pair.__all__ + source.__all__ + delegate.__all__ +
            lazy.__all__ + scope.__all__ + progress.__all__)
 # vim: nu ft=python columns=120 :
\ No newline at end of file
@@ -1,10 +1,6 @@
 # -*- coding: utf-8 -*-
-import sys
-from .future import Future, FutureNotReady, FutureCanceled
-
-STATE_NONE = 0x0
-STATE_DONE = 0x1
-STATE_FAIL = 0x2
+from .future import Future
+from .promise import Promise
 
 __all__ = ('FutureSourcePair',)
 #------------------------------------------------------------------------------#
@@ -12,18 +8,22 @@ __all__ = ('FutureSourcePair',)
 #------------------------------------------------------------------------------#
 def FutureSourcePair ():
     """Returns Future, FutureSource pair
+
+    Both future and source are the same Promise object.
     """
-    context = [STATE_NONE, None, []] # state, value, continuations
-    return SourceReceiver (context), SourceSender (context)
+    promise = Promise ()
+    return promise, promise
 
 #------------------------------------------------------------------------------#
 # Source Sender                                                                #
 #------------------------------------------------------------------------------#
 class SourceSender (object):
-    __slots__ = ('context',)
+    """Source view of the promise
+    """
+    __slots__ = ('promise',)
 
-    def __init__ (self, context):
-        self.context = context
+    def __init__ (self, promise):
+        self.promise = promise
 
     #--------------------------------------------------------------------------#
     # Set Value                                                                #
@@ -31,32 +31,27 @@ class SourceSender (object):
     def SetResult (self, result):
         """Set result
         """
-        if not self.TrySetResult (result):
-            raise ValueError ('Future has already been resolved')
+        self.promise.SetResult (result)
 
     def SetError (self, error):
         """Set error
         """
-        if not self.TrySetError (error):
-            raise ValueError ('Future has already been resolved')
+        self.promise.SetError (error)
 
     def SetCurrentError (self):
         """Set error to current error
         """
-        if not self.TrySetCurrentError ():
-            raise ValueError ('Future has already been resolved')
+        self.promise.SetCurrentError ()
 
     def SetException (self, exception):
         """Set exception
         """
-        if not self.TrySetException (exception):
-            raise ValueError ('Future has already been resolved')
+        self.promise.SetException (exception)
 
     def SetCanceled (self, msg = None):
         """Set canceled
         """
-        if not self.TrySetCanceled (msg):
-            raise ValueError ('Future has already been resolved')
+        self.promise.SetCanceled (msg)
 
     #--------------------------------------------------------------------------#
     # Try Set Value                                                            #
@@ -64,51 +59,27 @@ class SourceSender (object):
     def TrySetResult (self, result):
         """Try set result
         """
-        context = self.context
-        if context [0] & STATE_DONE:
-            return False
-
-        context [0] |= STATE_DONE
-        context [1]  = result
-        conts, context [2] = context [2], None
-        for cont in conts:
-            cont (result, None)
-
-        return True
+        return self.promise.TrySetResult (result)
 
     def TrySetError (self, error):
         """Try set error
         """
-        context = self.context
-        if context [0] & STATE_DONE:
-            return False
-
-        context [0] |= STATE_DONE | STATE_FAIL
-        context [1]  = error
-        conts, context [2] = context [2], None
-        for cont in conts:
-            cont (None, error)
-
-        return True
+        return self.promise.TrySetError (error)
 
     def TrySetCurrentError (self):
         """Try set error from current exception
         """
-        return self.TrySetError (sys.exc_info ())
+        return self.promise.TrySetCurrentError ()
 
     def TrySetException (self, exception):
         """Try set exception
         """
-        try: raise exception
-        except Exception:
-            error = sys.exc_info ()
-
-        return self.TrySetError (error)
+        return self.promise.TrySetException (exception)
 
     def TrySetCanceled (self, msg = None):
         """Try set canceled
         """
-        return self.TrySetException (FutureCanceled (msg) if msg else FutureCanceled ())
+        return self.promise.TrySetCanceled (msg)
 
     #--------------------------------------------------------------------------#
     # Awaitable                                                                #
@@ -116,7 +87,7 @@ class SourceSender (object):
     def Await (self):
         """Get awaiter
         """
-        return SourceReceiver (self.context)
+        return self.promise
 
     #--------------------------------------------------------------------------#
     # Dispose                                                                  #
@@ -124,7 +95,7 @@ class SourceSender (object):
     def Dispose (self):
         """Dispose object
         """
-        self.TrySetCanceled ()
+        self.promise.TrySetCanceled ()
 
     def __enter__ (self):
         return self
@@ -137,10 +108,12 @@ class SourceSender (object):
 # Source Receiver                                                              #
 #------------------------------------------------------------------------------#
 class SourceReceiver (Future):
-    __slots__ = Future.__slots__ + ('context',)
+    """Future view of the promise
+    """
+    __slots__ = Future.__slots__ + ('promise',)
 
-    def __init__ (self, context):
-        self.context = context
+    def __init__ (self, promise):
+        self.promise = promise
 
     #--------------------------------------------------------------------------#
     # Awaiter                                                                  #
@@ -148,29 +121,16 @@ class SourceReceiver (Future):
     def IsCompleted (self):
         """Is awaiter completed
         """
-        return self.context [0] & STATE_DONE
+        return self.promise.IsCompleted ()
 
     def OnCompleted (self, cont):
         """On awaiter completed
         """
-        state = self.context [0]
-        if state & STATE_DONE:
-            if state & STATE_FAIL:
-                cont (None, self.context [1])
-            else:
-                cont (self.context [1], None)
-        else:
-            self.context [2].append (cont)
+        self.promise.OnCompleted (cont)
 
     def GetResult (self):
         """Get result
         """
-        state = self.context [0]
-        if state & STATE_DONE:
-            if state & STATE_FAIL:
-                return None, self.context [1]
-            else:
-                return self.context [1], None
-        raise FutureNotReady ()
+        return self.promise.GetResult ()
 
 # vim: nu ft=python columns=120 :
@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+import sys
+from .future import Future, FutureNotReady, FutureCanceled
+
+STATE_NONE = 0x0
+STATE_DONE = 0x1
+STATE_FAIL = 0x2
+
+__all__ = ('Promise',)
+#------------------------------------------------------------------------------#
+# Promise                                                                      #
+#------------------------------------------------------------------------------#
+class Promise (Future):
+    """Promise
+
+    Future which is also its own source. Continuations are stored in ``conts``
+    which is None if there are no continuations, continuation itself if there
+    is only one of them (the most common case) or list of continuations.
+    """
+    __slots__ = ('state', 'value', 'conts',)
+
+    def __init__ (self):
+        self.state = STATE_NONE
+        self.value = None
+        self.conts = None
+
+    #--------------------------------------------------------------------------#
+    # Awaiter                                                                  #
+    #--------------------------------------------------------------------------#
+    def IsCompleted (self):
+        """Is future completed
+        """
+        return self.state & STATE_DONE
+
+    def OnCompleted (self, cont):
+        """Call continuation when the future is completed
+        """
+        state = self.state
+        if state & STATE_DONE:
+            if state & STATE_FAIL:
+                cont (None, self.value)
+            else:
+                cont (self.value, None)
+        else:
+            conts = self.conts
+            if conts is None:
+                self.conts = cont
+            elif type (conts) is list:
+                conts.append (cont)
+            else:
+                self.conts = [conts, cont]
+
+    def GetResult (self):
+        """Get result, error pair
+        """
+        state = self.state
+        if state & STATE_DONE:
+            if state & STATE_FAIL:
+                return None, self.value
+            else:
+                return self.value, None
+        raise FutureNotReady ()
+
+    #--------------------------------------------------------------------------#
+    # Set Value                                                                #
+    #--------------------------------------------------------------------------#
+    def SetResult (self, result):
+        """Set result
+        """
+        if not self.TrySetResult (result):
+            raise ValueError ('Future has already been resolved')
+
+    def SetError (self, error):
+        """Set error
+        """
+        if not self.TrySetError (error):
+            raise ValueError ('Future has already been resolved')
+
+    def SetCurrentError (self):
+        """Set error to current error
+        """
+        if not self.TrySetCurrentError ():
+            raise ValueError ('Future has already been resolved')
+
+    def SetException (self, exception):
+        """Set exception
+        """
+        if not self.TrySetException (exception):
+            raise ValueError ('Future has already been resolved')
+
+    def SetCanceled (self, msg = None):
+        """Set canceled
+        """
+        if not self.TrySetCanceled (msg):
+            raise ValueError ('Future has already been resolved')
+
+    #--------------------------------------------------------------------------#
+    # Try Set Value                                                            #
+    #--------------------------------------------------------------------------#
+    def TrySetResult (self, result):
+        """Try set result
+        """
+        if self.state & STATE_DONE:
+            return False
+
+        self.state = STATE_DONE
+        self.value = result
+        conts, self.conts = self.conts, None
+        if conts is not None:
+            if type (conts) is list:
+                for cont in conts:
+                    cont (result, None)
+            else:
+                conts (result, None)
+
+        return True
+
+    def TrySetError (self, error):
+        """Try set error
+        """
+        if self.state & STATE_DONE:
+            return False
+
+        self.state = STATE_DONE | STATE_FAIL
+        self.value = error
+        conts, self.conts = self.conts, None
+        if conts is not None:
+            if type (conts) is list:
+                for cont in conts:
+                    cont (None, error)
+            else:
+                conts (None, error)
+
+        return True
+
+    def TrySetCurrentError (self):
+        """Try set error from current exception
+        """
+        return self.TrySetError (sys.exc_info ())
+
+    def TrySetException (self, exception):
+        """Try set exception
+        """
+        try: raise exception
+        except Exception:
+            error = sys.exc_info ()
+
+        return self.TrySetError (error)
+
+    def TrySetCanceled (self, msg = None):
+        """Try set canceled
+        """
+        return self.TrySetException (FutureCanceled (msg) if msg else FutureCanceled ())
+
+    #--------------------------------------------------------------------------#
+    # Dispose                                                                  #
+    #--------------------------------------------------------------------------#
+    def Dispose (self):
+        """Dispose object (cancel if not resolved)
+        """
+        self.TrySetCanceled ()
+
+    def __enter__ (self):
+        return self
+
+    def __exit__ (self, et, eo, tb):
+        self.Dispose ()
+        return False
+
+# vim: nu ft=python columns=120 :
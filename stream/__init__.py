@@ -1,14 +1,25 @@
 # -*- coding: utf-8 -*-
-from . import stream, file, pipe, sock, sock_ssl, wrapped, buffered
+from . import stream, file, disk, mapped, pipe, sock, datagram, sock_ssl, stream_ssl, wrapped, buffered, relay, frame, pool, ring, inotify
 
 from .stream import *
 from .file import *
+from .disk import *
+from .mapped import *
 from .pipe import *
 from .sock import *
+from .datagram import *
 from .sock_ssl import *
+from .stream_ssl import *
 from .wrapped import *
 from .buffered import *
+from .relay import *
+from .frame import *
+from .pool import *
+from .ring import *
+from .inotify import *
 
-__all__ = (stream.__all__ + file.__all__ + pipe.__all__ + sock.__all__ +
-           sock_ssl.__all__ + wrapped.__all__ + buffered.__all__)
+__all__ = (stream.__all__ + file.__all__ + disk.__all__ + mapped.__all__ + pipe.__all__ + sock.__all__ + datagram.__all__ +
+           sock_ssl.__all__ + stream_ssl.__all__ + wrapped.__all__ + buffered.__all__ + relay.__all__ +
+           frame.__all__ + pool.__all__ + ring.__all__ +
+           inotify.__all__)
 # vim: nu ft=python columns=120 :
@@ -1,13 +1,29 @@
 # -*- coding: utf-8 -*-
+import sys
+import array
 import struct
 from collections import deque
+try:
+    import numpy
+except ImportError:
+    numpy = None # no numpy support
 
+from .pool import BufferPool
 from .wrapped import WrappedStream
 from ..async import Async, AsyncReturn
+from ..future import Future, FutureSourcePair, CompletedFuture, FutureCanceled
+from ..event import Event
 from ..singleton import Singleton
-from ..core import BrokenPipeError
+from ..core import Core, BrokenPipeError
+
+__all__ = ('BufferedStream', 'BufferOverflowError',)
+#------------------------------------------------------------------------------#
+# Errors                                                                       #
+#------------------------------------------------------------------------------#
+class BufferOverflowError (BufferError):
+    """Buffer size limit has been exceeded
+    """
 
-__all__ = ('BufferedStream',)
 #------------------------------------------------------------------------------#
 # Buffered Stream                                                              #
 #------------------------------------------------------------------------------#
@@ -16,12 +32,22 @@ class BufferedStream (WrappedStream):
     """
     default_buffer_size = 1 << 16
 
-    def __init__ (self, base, buffer_size = None):
+    def __init__ (self, base, buffer_size = None, buffer_type = None):
         WrappedStream.__init__ (self, base)
 
         self.buffer_size = buffer_size or self.default_buffer_size
-        self.read_buffer = Buffer ()
+        self.read_buffer = (buffer_type or Buffer) ()
         self.write_buffer = Buffer ()
+        self.read_limit = 0
+
+        # automatic flush
+        self.flush_core = None
+        self.flush_cork = False
+
+        # write watermarks
+        self.write_high = 2 * self.buffer_size
+        self.write_low = self.buffer_size
+        self.OnWritable = Event ()
 
         # We cannot apply Singleton decorator directly to flush_unsafe method
         # because otherwise this method will be global singleton for all buffered
@@ -40,7 +66,7 @@ class BufferedStream (WrappedStream):
 
         with self.reading:
             if not self.read_buffer:
-                self.read_buffer.Enqueue ((yield self.base.Read (self.buffer_size, cancel)))
+                yield self.fill (cancel)
 
             AsyncReturn (self.read_buffer.Dequeue (size))
 
@@ -53,60 +79,175 @@ class BufferedStream (WrappedStream):
 
         with self.reading:
             while self.read_buffer.Length () < size:
-                self.read_buffer.Enqueue ((yield self.base.Read (self.buffer_size, cancel)))
+                yield self.fill (cancel)
 
             AsyncReturn (self.read_buffer.Dequeue (size))
 
     @Async
     def ReadUntilEof (self, cancel = None):
         """Read until stream is closed
+
+        BufferOverflowError is raised if read buffer limit is reached before
+        stream is closed.
         """
         with self.reading:
             try:
                 while True:
-                    self.read_buffer.Enqueue ((yield self.base.Read (self.buffer_size, cancel)))
+                    yield self.fill (cancel)
             except BrokenPipeError: pass
 
             AsyncReturn (self.read_buffer.Dequeue ())
 
     @Async
-    def ReadUntilSub (self, sub = None, cancel = None):
+    def ReadUntilSub (self, sub = None, cancel = None, max_size = None):
         """Read until substring is found
 
-        Returns data including substring. Default substring is "\\n".
+        Returns data including substring. Default substring is "\\n". Only
+        newly arrived data (and its overlap with previous data) is scanned on
+        each iteration. BufferOverflowError is raised if substring is not found
+        within ``max_size`` bytes (read buffer limit by default).
         """
         sub = sub or b'\n'
+        max_size = max_size or self.read_limit
 
         with self.reading:
             offset = 0
             while True:
-                data = self.read_buffer.Slice ()
-                find_offset = data [offset:].find (sub)
+                find_offset = self.read_buffer.Find (sub, offset)
                 if find_offset >= 0:
+                    size = find_offset + len (sub)
                     break
 
-                offset = max (0, len (data) - len (sub))
-                self.read_buffer.Enqueue ((yield self.base.Read (self.buffer_size, cancel)))
+                size = self.read_buffer.Length ()
+                offset = max (0, size - len (sub) + 1)
+                if max_size and size >= max_size:
+                    break
+                yield self.fill (cancel)
+
+            if max_size and (find_offset < 0 or size > max_size):
+                raise BufferOverflowError ('Substring has not been found within {} bytes'.format (max_size))
+            AsyncReturn (self.read_buffer.Dequeue (size))
+
+    def ReadLines (self, max_lines = None, sub = None, cancel = None, max_size = None):
+        """Read all complete records already buffered
+
+        Returns list of at least one and at most ``max_lines`` (if set) records,
+        each including separator ``sub`` (default is "\\n"). Records are split
+        in one pass over the read buffer, base stream is only read if there is
+        no complete record buffered. BufferOverflowError is raised if first
+        record is not found within ``max_size`` bytes (read buffer limit by
+        default).
+        """
+        sub = sub or b'\n'
+        max_size = max_size or self.read_limit
+
+        try:
+            with self.reading:
+                find_offset = self.read_buffer.Find (sub)
+                if find_offset >= 0 and (not max_size or find_offset + len (sub) <= max_size):
+                    return CompletedFuture (self.read_lines (find_offset + len (sub), max_lines, sub))
+        except Exception:
+            return CompletedFuture (error = sys.exc_info ())
+        return self.read_lines_async (max_lines, sub, cancel, max_size)
+
+    @Async
+    def read_lines_async (self, max_lines, sub, cancel, max_size):
+        """Read records when there is no complete record buffered
+        """
+        line = yield self.ReadUntilSub (sub, cancel, max_size)
+        if max_lines == 1:
+            AsyncReturn ([line])
+
+        with self.reading:
+            find_offset = self.read_buffer.Find (sub)
+            if find_offset < 0:
+                AsyncReturn ([line])
+
+            lines = self.read_lines (find_offset + len (sub), max_lines and max_lines - 1, sub)
+            lines.insert (0, line)
+            AsyncReturn (lines)
+
+    def read_lines (self, end, max_lines, sub):
+        """Split buffered records, first of which ends at ``end``
+        """
+        data = self.read_buffer.Slice ()
+
+        lines, start = [], 0
+        while True:
+            lines.append (data [start:end])
+            start = end
+            if max_lines and len (lines) >= max_lines:
+                break
+
+            end = data.find (sub, start)
+            if end < 0:
+                break
+            end += len (sub)
 
-            AsyncReturn (self.read_buffer.Dequeue (offset + find_offset + len (sub)))
+        self.read_buffer.Dequeue (start, False)
+        return lines
 
     @Async
-    def ReadUntilRegex (self, regex, cancel = None):
+    def ReadUntilRegex (self, regex, cancel = None, max_size = None, overlap = None):
         """Read until regular expression is matched
 
-        Returns data (including match) and match object.
+        Returns data (including match) and match object. If ``overlap`` (maximum
+        length of a match) is set, only newly arrived data and ``overlap`` bytes
+        preceding it are searched on each iteration, otherwise whole buffer is
+        searched. BufferOverflowError is raised if match is not found within
+        ``max_size`` bytes (read buffer limit by default).
         """
+        max_size = max_size or self.read_limit
 
         with self.reading:
+            offset = 0
             while True:
-                data = self.read_buffer.Slice ()
-                match = regex.search (data)
+                match = self.read_buffer.Search (regex, offset)
                 if match:
+                    size = offset + match.end ()
                     break
 
-                self.read_buffer.Enqueue ((yield self.base.Read (self.buffer_size, cancel)))
-
-            AsyncReturn ((self.read_buffer.Dequeue (match.end ()), match))
+                size = self.read_buffer.Length ()
+                if overlap is not None:
+                    offset = max (0, size - overlap)
+                if max_size and size >= max_size:
+                    break
+                yield self.fill (cancel)
+
+            if max_size and (not match or size > max_size):
+                raise BufferOverflowError ('Regular expression has not been matched within {} bytes'
+                    .format (max_size))
+
+            data = self.read_buffer.Dequeue (size)
+            if offset:
+                # make match positions relative to returned data
+                match = regex.match (data, offset + match.start ()) or match
+            AsyncReturn ((data, match))
+
+    def ReadLimit (self, limit = None):
+        """Set or get read buffer limit
+
+        Read buffer never grows beyond the limit, base stream is not read (and
+        therefore not polled) until buffered data is consumed. Reads which need
+        more data buffered raise BufferOverflowError, limit is also default
+        ``max_size`` of delimited reads. Zero limit disables it. If limit is not
+        set, returns current limit.
+        """
+        if limit is not None:
+            if limit < 0:
+                raise ValueError ('Invalid read buffer limit: {}'.format (limit))
+            self.read_limit = limit
+        return self.read_limit
+
+    def fill (self, cancel = None):
+        """Read base stream into read buffer respecting read buffer limit
+        """
+        size = self.buffer_size
+        if self.read_limit:
+            size = min (size, self.read_limit - self.read_buffer.Length ())
+            if size <= 0:
+                raise BufferOverflowError ('Read buffer limit has been reached: {}'.format (self.read_limit))
+        return self.read_buffer.Fill (self.base, size, cancel)
 
     #--------------------------------------------------------------------------#
     # Write                                                                    #
@@ -115,16 +256,19 @@ class BufferedStream (WrappedStream):
     def Write (self, data, cancel = None):
         """Write data
 
-        Write data without blocking if write buffer's length less then doubled
-        buffer size limit, if buffer's length is more then buffer size limit
-        flush is started in the background.
+        Write data without blocking if write buffer's length less then high
+        watermark (doubled buffer size by default), otherwise waits for buffer
+        to be drained. If buffer's length is more then low watermark (buffer
+        size by default) flush is started in the background.
         """
-        if self.write_buffer.Length () > 2 * self.buffer_size:
-            yield self.Flush ()
+        if self.write_buffer.Length () > self.write_high:
+            yield self.Drain (cancel)
 
         with self.writing:
             self.write_buffer.Enqueue (data)
-            if not self.flushing and self.write_buffer.Length () >= self.buffer_size:
+            if self.flush_core is not None:
+                self.flush_core.Cork (self)
+            elif not self.flushing and self.write_buffer.Length () >= self.write_low:
                 self.Flush ()
 
             AsyncReturn (len (data))
@@ -133,10 +277,63 @@ class BufferedStream (WrappedStream):
         """Enqueue data to write buffer
 
         Just enqueues data to write buffer (buffer's size limit would not be
-        checked), flush need to be called manually.
+        checked), flush need to be called manually unless automatic flush is
+        enabled. Once buffer's length exceeds high watermark flush is started in
+        the background, producer may wait for it with Drain.
         """
         with self.writing:
             self.write_buffer.Enqueue (data)
+            if self.flush_core is not None:
+                self.flush_core.Cork (self)
+            if not self.flushing and self.write_buffer.Length () > self.write_high:
+                self.Flush ()
+
+    @Async
+    def SendFile (self, file, offset = None, count = None, cancel = None):
+        """Asynchronously send content of the file
+
+        Write buffer is flushed and then file is sent by base stream.
+        """
+        yield self.Flush (cancel)
+        AsyncReturn ((yield self.base.SendFile (file, offset, count, cancel)))
+
+    def WriteWatermarks (self, high = None, low = None):
+        """Set or get write buffer watermarks
+
+        Write waits for buffer to be drained below low watermark once its length
+        exceeds high watermark. If only high watermark is set, low watermark is
+        set to its half. Returns tuple of current watermarks.
+        """
+        if high is not None:
+            low = high // 2 if low is None else low
+            if not 0 <= low <= high:
+                raise ValueError ('Invalid watermarks: high={} low={}'.format (high, low))
+            self.write_high, self.write_low = high, low
+
+        return self.write_high, self.write_low
+
+    @Async
+    def Drain (self, cancel = None):
+        """Wait until write buffer's length drops below low watermark
+
+        Flush is started if it is not in progress.
+        """
+        while self.base is not None and self.write_buffer.Length () > self.write_low:
+            flush = self.Flush ()
+            writable, writable_source = FutureSourcePair ()
+            def writable_handler ():
+                writable_source.TrySetResult (None)
+                return False
+            self.OnWritable.On (writable_handler)
+            try:
+                yield Future.Any ((flush, writable) if cancel is None else (flush, writable, cancel))
+            finally:
+                self.OnWritable.Off (writable_handler)
+
+            if flush.IsCompleted ():
+                flush.Result () # raise flush error if any
+            if cancel is not None and cancel.Await ().IsCompleted ():
+                raise FutureCanceled ('Drain has been canceled')
 
     #--------------------------------------------------------------------------#
     # Flush                                                                    #
@@ -152,11 +349,51 @@ class BufferedStream (WrappedStream):
             return # base stream was detached
 
         with self.flushing:
-            while self.write_buffer:
-                self.write_buffer.Dequeue ((yield self.base.Write (
-                    self.write_buffer.Slice (self.buffer_size), cancel)), False)
+            cork = self.flush_cork and self.write_buffer.Length () > self.buffer_size
+            if cork:
+                self.base.Cork (True)
+            try:
+                while self.write_buffer:
+                    length = self.write_buffer.Length ()
+                    self.write_buffer.Dequeue ((yield self.base.WriteVector (
+                        self.write_buffer.Chunks (self.buffer_size), cancel)), False)
+                    if length > self.write_low >= self.write_buffer.Length ():
+                        self.OnWritable ()
+            finally:
+                if cork and not self.base.Disposed:
+                    self.base.Cork (False)
             yield self.base.Flush (cancel)
 
+    def AutoFlush (self, enable = None, cork = None, core = None):
+        """Automatic flush at the end of core's iteration
+
+        When enabled, writes never start flush on their own below the doubled
+        buffer size, instead stream is flushed once at the end of current core's
+        iteration. If ``cork`` is True, base stream is corked (TCP_CORK) while
+        flush requires more then one write, in which case base stream must be
+        TCP socket. If enable is not set, returns current "automatic flush"
+        value.
+        """
+        if enable is None:
+            return self.flush_core is not None
+
+        elif enable:
+            if cork:
+                try:
+                    self.base.Cork ()
+                except (AttributeError, NotImplementedError, EnvironmentError):
+                    raise ValueError ('Base stream can not be corked: {}'.format (self.base))
+            self.flush_core = core or getattr (self.base, 'core', None) or Core.Instance ()
+            self.flush_cork = bool (cork)
+            if self.write_buffer:
+                self.flush_core.Cork (self)
+
+        else:
+            self.flush_core = None
+            self.flush_cork = False
+
+        return enable
+
     #--------------------------------------------------------------------------#
     # Serialize                                                                #
     #--------------------------------------------------------------------------#
@@ -183,32 +420,67 @@ class BufferedStream (WrappedStream):
         """
         struct_data = yield self.ReadUntilSize (self.size_struct.unpack ((
                       yield self.ReadUntilSize (self.size_struct.size, cancel))) [0], cancel)
-        if complex:
-            AsyncReturn ([struct.unpack (struct_data [offset:offset + struct.size])
-                for offset in range (0, len (struct_data), struct.size)])
-        else:
-            AsyncReturn ([struct.unpack (struct_data [offset:offset + struct.size]) [0]
-                for offset in range (0, len (struct_data), struct.size)])
+        AsyncReturn (struct_list_unpack (struct, struct_data, complex))
 
     def StructListWriteBuffer (self, struct_list, struct, complex = None):
         """Write list of structures to buffer
         """
         self.WriteBuffer (self.size_struct.pack (len (struct_list) * struct.size))
-        if complex:
-            for struct_target in struct_list:
-                self.WriteBuffer (struct.pack (*struct_target))
+        self.WriteBuffer (struct_list_pack (struct, struct_list, complex))
+
+    # Array
+    shape_struct = struct.Struct ('>Q')
+
+    @Async
+    def ArrayRead (self, ndarray = None, cancel = None):
+        """Read array
+
+        Returns array.array or numpy.ndarray if ``ndarray`` is True. Data is
+        converted as a whole, so no per element work is done. Array module arrays
+        are always flat.
+        """
+        dtype = (yield self.BytesRead (cancel)).decode ()
+        shape = yield self.StructListRead (self.shape_struct, False, cancel)
+        data = yield self.BytesRead (cancel)
+
+        if ndarray:
+            if numpy is None:
+                raise ImportError ('numpy is not available')
+            AsyncReturn (numpy.frombuffer (data, dtype).reshape (shape))
+        AsyncReturn (array_from_dtype (dtype, data))
+
+    def ArrayWriteBuffer (self, array):
+        """Write array.array or numpy.ndarray to buffer
+
+        Type (in numpy format) and shape of array are written before its data.
+        """
+        if numpy is not None and isinstance (array, numpy.ndarray):
+            array = numpy.ascontiguousarray (array)
+            dtype, shape = array.dtype.str, array.shape
         else:
-            for struct_target in struct_list:
-                self.WriteBuffer (struct.pack (struct_target))
+            dtype, shape = array_dtype (array), (len (array),)
+
+        self.BytesWriteBuffer (dtype.encode ())
+        self.StructListWriteBuffer (shape, self.shape_struct, False)
+        self.BytesWriteBuffer (array.tobytes () if hasattr (array, 'tobytes') else array.tostring ())
 
     # List of bytes
     @Async
-    def BytesListRead (self, cancel = None):
+    def BytesListRead (self, cancel = None, view = None):
         """Read array of bytes
+
+        Whole payload is read at once and then sliced. If ``view`` is True items
+        are returned as memoryview slices of the payload (no copy is made).
         """
-        bytes_list = []
-        for size in (yield self.StructListRead (self.size_struct, False, cancel)):
-            bytes_list.append ((yield self.ReadUntilSize (size)))
+        sizes = yield self.StructListRead (self.size_struct, False, cancel)
+        data = yield self.ReadUntilSize (sum (sizes), cancel)
+        if view:
+            data = memoryview (data)
+
+        bytes_list, offset = [], 0
+        for size in sizes:
+            bytes_list.append (data [offset:offset + size])
+            offset += size
         AsyncReturn (bytes_list)
 
     def BytesListWriteBuffer (self, bytes_list):
@@ -216,7 +488,90 @@ class BufferedStream (WrappedStream):
         """
         self.StructListWriteBuffer ([len (bytes) for bytes in bytes_list], self.size_struct, False)
         for bytes in bytes_list:
-            self.WriteBuffer (bytes)
+            self.WriteBuffer (bytes) # separate chunks are flushed without copying
+
+#------------------------------------------------------------------------------#
+# Structures                                                                   #
+#------------------------------------------------------------------------------#
+def struct_list_unpack (struct_type, data, complex = None):
+    """Unpack list of structures with a single call if possible
+    """
+    if not complex:
+        count = len (data) // struct_type.size if struct_type.size else 0
+        struct_bulk = struct_list_format (struct_type, count)
+        if struct_bulk is not None:
+            return list (struct.unpack (struct_bulk, data))
+
+    if hasattr (struct_type, 'iter_unpack'):
+        if complex:
+            return list (struct_type.iter_unpack (data))
+        else:
+            return [item for item, in struct_type.iter_unpack (data)]
+    elif complex:
+        return [struct_type.unpack_from (data, offset)
+            for offset in range (0, len (data), struct_type.size)]
+    else:
+        return [struct_type.unpack_from (data, offset) [0]
+            for offset in range (0, len (data), struct_type.size)]
+
+def struct_list_pack (struct_type, struct_list, complex = None):
+    """Pack list of structures with a single call if possible
+    """
+    if complex:
+        return b''.join ([struct_type.pack (*item) for item in struct_list])
+
+    struct_bulk = struct_list_format (struct_type, len (struct_list))
+    if struct_bulk is not None:
+        return struct.pack (struct_bulk, *struct_list)
+    return b''.join ([struct_type.pack (item) for item in struct_list])
+
+def struct_list_format (struct_type, count):
+    """Format of ``count`` structures, if structure is a single value
+
+    Returns None if structure can not be repeated with a count prefix.
+    """
+    format = struct_type.format
+    if not isinstance (format, str):
+        format = format.decode ()
+
+    prefix, code = (format [:1], format [1:]) if format [:1] in '@=<>!' else ('', format)
+    if len (code) != 1 or code in 'spP':
+        return None
+    return '{}{}{}'.format (prefix, count, code)
+
+#------------------------------------------------------------------------------#
+# Arrays                                                                       #
+#------------------------------------------------------------------------------#
+array_kinds = {'i': 'bhilq', 'u': 'BHILQ', 'f': 'fd'}
+array_typecodes = getattr (array, 'typecodes', 'bBhHiIlLfd')
+array_native = '<' if sys.byteorder == 'little' else '>'
+
+def array_dtype (array):
+    """Numpy compatible type string of array.array
+    """
+    for kind, typecodes in array_kinds.items ():
+        if array.typecode in typecodes:
+            return '{}{}{}'.format (array_native if array.itemsize > 1 else '|', kind, array.itemsize)
+    raise ValueError ('Unsupported array type: {}'.format (array.typecode))
+
+def array_from_dtype (dtype, data):
+    """Create array.array from numpy compatible type string and data
+    """
+    order, kind, itemsize = dtype [0], dtype [1], int (dtype [2:])
+    for typecode in array_kinds.get (kind, ''):
+        if typecode in array_typecodes and array.array (typecode).itemsize == itemsize:
+            break
+    else:
+        raise ValueError ('Unsupported array type: {}'.format (dtype))
+
+    result = array.array (typecode)
+    if hasattr (result, 'frombytes'):
+        result.frombytes (data)
+    else:
+        result.fromstring (data)
+    if order not in ('|', '=', array_native):
+        result.byteswap ()
+    return result
 
 #------------------------------------------------------------------------------#
 # Buffer                                                                       #
@@ -256,6 +611,83 @@ class Buffer (object):
 
         return data [self.offset + offset:size]
 
+    #--------------------------------------------------------------------------#
+    # Find                                                                     #
+    #--------------------------------------------------------------------------#
+    def Find (self, sub, offset = None):
+        """Find first position of ``sub`` starting from ``offset``
+
+        Chunks are scanned separately (along with overlap of adjacent chunks),
+        so no data is copied. Returns -1 if ``sub`` is not found.
+        """
+        offset = (offset or 0) + self.offset
+        overlap = len (sub) - 1
+
+        tail = b''
+        chunk_start = 0
+        for chunk in self.chunks:
+            chunk_end = chunk_start + len (chunk)
+            if chunk_end > offset:
+                # substring spanning chunks boundary
+                if tail:
+                    index = (tail + chunk [:overlap]).find (sub)
+                    if index >= 0:
+                        return chunk_start - len (tail) + index - self.offset
+
+                # substring inside chunk
+                index = chunk.find (sub, max (0, offset - chunk_start))
+                if index >= 0:
+                    return chunk_start + index - self.offset
+
+                # tail of scanned data which may be a prefix of substring
+                if overlap:
+                    tail = chunk [-overlap:] if len (chunk) >= overlap else (tail + chunk) [-overlap:]
+                    tail = tail [max (0, offset - (chunk_end - len (tail))):]
+            chunk_start = chunk_end
+
+        return -1
+
+    def Search (self, regex, offset = None):
+        """Search regular expression starting from ``offset``
+
+        Only chunks starting from ``offset`` are joined. Returns match object with
+        positions relative to ``offset`` or None.
+        """
+        offset = (offset or 0) + self.offset
+
+        data = []
+        chunk_start = 0
+        for chunk in self.chunks:
+            chunk_end = chunk_start + len (chunk)
+            if chunk_end > offset:
+                data.append (chunk if chunk_start >= offset else chunk [offset - chunk_start:])
+            chunk_start = chunk_end
+
+        return regex.search (data [0] if len (data) == 1 else b''.join (data))
+
+    #--------------------------------------------------------------------------#
+    # Chunks                                                                   #
+    #--------------------------------------------------------------------------#
+    def Chunks (self, size = None):
+        """Get list of chunks containing at least ``size`` bytes
+
+        Chunks are not merged, so no data is copied (except for the head of the
+        first chunk if buffer has offset).
+        """
+        size = size or self.Length ()
+
+        chunks = []
+        chunks_size = -self.offset
+        for chunk in self.chunks:
+            if chunks_size >= size:
+                break
+            chunks.append (chunk)
+            chunks_size += len (chunk)
+
+        if chunks and self.offset:
+            chunks [0] = chunks [0][self.offset:]
+        return chunks
+
     #--------------------------------------------------------------------------#
     # Enqueue                                                                  #
     #--------------------------------------------------------------------------#
@@ -266,6 +698,11 @@ class Buffer (object):
             self.chunks.append (data)
             self.chunks_size += len (data)
 
+    def Fill (self, stream, size, cancel = None):
+        """Enqueue at most ``size`` bytes read from ``stream``
+        """
+        return stream.Read (size, cancel).ChainResult (self.Enqueue)
+
     #--------------------------------------------------------------------------#
     # Dequeue                                                                  #
     #--------------------------------------------------------------------------#
@@ -341,4 +778,190 @@ class Buffer (object):
         """
         return str (self)
 
+#------------------------------------------------------------------------------#
+# Array Buffer                                                                 #
+#------------------------------------------------------------------------------#
+view_search = sys.version_info [0] > 2 # regular expressions can search memoryview
+
+class ArrayBuffer (object):
+    """Bytes FIFO buffer backed by contiguous growable byte array
+
+    Data is kept between read and write cursors of a single bytearray, which
+    is compacted (or reallocated) only when there is no space left after write
+    cursor. Unlike Buffer it provides memoryview slices of its data without
+    copying and can be filled directly with ``ReadInto`` of a stream. Views
+    are only valid until next modification of the buffer. If ``pool`` is set,
+    byte arrays are borrowed from it and returned once buffer is drained.
+    """
+    def __init__ (self, pool = None):
+        self.pool = pool
+        self.data = bytearray ()
+        self.head = 0
+        self.tail = 0
+
+    #--------------------------------------------------------------------------#
+    # Slice                                                                    #
+    #--------------------------------------------------------------------------#
+    def Slice (self, size = None, offset = None):
+        """Get bytes with ``offset`` and ``size``
+        """
+        return self.View (size, offset).tobytes ()
+
+    def View (self, size = None, offset = None):
+        """Get memoryview with ``offset`` and ``size`` without copying
+        """
+        start = self.head + (offset or 0)
+        stop = self.tail if size is None else min (start + size, self.tail)
+        return memoryview (self.data) [start:stop]
+
+    #--------------------------------------------------------------------------#
+    # Find                                                                     #
+    #--------------------------------------------------------------------------#
+    def Find (self, sub, offset = None):
+        """Find first position of ``sub`` starting from ``offset``
+
+        Returns -1 if ``sub`` is not found.
+        """
+        index = self.data.find (sub, self.head + (offset or 0), self.tail)
+        return index - self.head if index >= 0 else -1
+
+    def Search (self, regex, offset = None):
+        """Search regular expression starting from ``offset``
+
+        Returns match object with positions relative to ``offset`` or None.
+        Match never refers to buffer memory, which is reused (or returned to
+        the pool) once data is dequeued.
+        """
+        view = self.View (None, offset)
+        if view_search:
+            match = regex.search (view)
+            if match is None:
+                return None
+            # repeat search over a copy, memoryview is only used to scan for a match
+            return regex.search (view.tobytes (), match.start ())
+        return regex.search (view.tobytes ())
+
+    #--------------------------------------------------------------------------#
+    # Chunks                                                                   #
+    #--------------------------------------------------------------------------#
+    def Chunks (self, size = None):
+        """Get list of chunks containing at least ``size`` bytes
+        """
+        return [self.View (size)] if self.tail > self.head else []
+
+    #--------------------------------------------------------------------------#
+    # Enqueue                                                                  #
+    #--------------------------------------------------------------------------#
+    def Enqueue (self, data):
+        """Enqueue "data" to buffer
+        """
+        if data:
+            self.Reserve (len (data)) [:] = data
+            self.tail += len (data)
+
+    def Fill (self, stream, size, cancel = None):
+        """Read at most ``size`` bytes from ``stream`` directly into buffer
+        """
+        return stream.ReadInto (self.Reserve (size), cancel).ChainResult (self.Commit)
+
+    def Reserve (self, size):
+        """Get writable memoryview of ``size`` bytes after write cursor
+
+        Reserved data becomes part of the buffer once it is committed.
+        """
+        length = self.tail - self.head
+        if self.tail + size > len (self.data):
+            if length + size <= len (self.data) and length <= self.head:
+                # compact (source and destination regions are not overlapping)
+                self.data [:length] = memoryview (self.data) [self.head:self.tail]
+            else:
+                # reallocate (never resize inplace as data may have been exported)
+                data_size = max (length + size, len (self.data) << 1)
+                data = self.pool.Acquire (data_size) if self.pool else bytearray (data_size)
+                data [:length] = memoryview (self.data) [self.head:self.tail]
+                self.release ()
+                self.data = data
+            self.head, self.tail = 0, length
+
+        return memoryview (self.data) [self.tail:self.tail + size]
+
+    def Commit (self, size):
+        """Commit ``size`` bytes of reserved data
+        """
+        self.tail += size
+        return size
+
+    #--------------------------------------------------------------------------#
+    # Dequeue                                                                  #
+    #--------------------------------------------------------------------------#
+    def Dequeue (self, size = None, returns = None):
+        """Dequeue "size" bytes from buffer
+
+        Returns dequeued data if returns if True (or not set) otherwise None.
+        """
+        size = min (size or self.tail, self.tail - self.head)
+
+        data = None
+        if returns is None or returns:
+            data = memoryview (self.data) [self.head:self.head + size].tobytes ()
+
+        self.head += size
+        if self.head == self.tail:
+            self.head, self.tail = 0, 0
+            if self.pool:
+                self.release ()
+
+        return data
+
+    def release (self):
+        """Return byte array to the pool
+        """
+        data, self.data = self.data, bytearray ()
+        if self.pool and data:
+            self.pool.Release (data)
+
+    #--------------------------------------------------------------------------#
+    # Length                                                                   #
+    #--------------------------------------------------------------------------#
+    def Length  (self):
+        """Length of the buffer
+        """
+        return self.tail - self.head
+    __len__ = Length
+
+    #--------------------------------------------------------------------------#
+    # Empty?                                                                   #
+    #--------------------------------------------------------------------------#
+    def __bool__ (self):
+        """Buffer is not empty
+        """
+        return self.tail > self.head
+    __nonzero__ = __bool__
+
+    #--------------------------------------------------------------------------#
+    # To String                                                                #
+    #--------------------------------------------------------------------------#
+    def __str__ (self):
+        """String representation
+        """
+        return '<{} [length:{} capacity:{}] at {}>'.format (type (self).__name__,
+            self.Length (), len (self.data), id (self))
+
+    def __repr__ (self):
+        """String representation
+        """
+        return str (self)
+
+#------------------------------------------------------------------------------#
+# Pooled Buffer                                                                #
+#------------------------------------------------------------------------------#
+class PooledBuffer (ArrayBuffer):
+    """Array buffer backed by global buffer pool
+
+    Drained buffer returns its memory to the pool, so buffers of idle streams
+    do not hold any memory.
+    """
+    def __init__ (self, pool = None):
+        ArrayBuffer.__init__ (self, pool or BufferPool.Instance ())
+
 # vim: nu ft=python columns=120 :
@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+import socket
+import struct
+
+from .sock import Socket
+from ..async import Async, AsyncReturn
+from ..core import POLL_READ, POLL_WRITE
+from ..core.error import BlockingErrorSet
+
+__all__ = ('DatagramSocket',)
+
+SOL_UDP = getattr (socket, 'SOL_UDP', 17)
+UDP_SEGMENT = getattr (socket, 'UDP_SEGMENT', 103) # linux 4.18 or higher
+UDP_GRO = getattr (socket, 'UDP_GRO', 104) # linux 5.0 or higher
+UDP_MAX_SEGMENTS = 64 # maximum number of segments per GSO send
+UDP_MAX_PAYLOAD = 65507
+UDP_GRO_CMSG_SIZE = socket.CMSG_SPACE (4) if hasattr (socket, 'CMSG_SPACE') else 0
+#------------------------------------------------------------------------------#
+# Datagram Socket                                                              #
+#------------------------------------------------------------------------------#
+class DatagramSocket (Socket):
+    """Asynchronous datagram (UDP) socket
+
+    Batch methods drain (or fill) socket with as many datagrams as possible on
+    each readiness event, which significantly reduces number of polls under
+    high packet rate.
+    """
+    default_size = 1 << 16
+
+    def __init__ (self, sock = None, core = None):
+        Socket.__init__ (self, socket.socket (socket.AF_INET, socket.SOCK_DGRAM) if sock is None else sock, core)
+        self.segment_size = 0
+        self.gro = False
+
+    #--------------------------------------------------------------------------#
+    # Receive                                                                  #
+    #--------------------------------------------------------------------------#
+    @Async
+    def RecvFrom (self, size = None, cancel = None):
+        """Asynchronously receive datagram
+
+        Returns (data, address) tuple.
+        """
+        size = size or self.default_size
+        with self.reading:
+            while True:
+                try:
+                    AsyncReturn (self.sock.recvfrom (size))
+
+                except socket.error as error:
+                    if error.errno not in BlockingErrorSet:
+                        raise
+
+                yield self.core.Poll (self.fd, POLL_READ, cancel)
+
+    @Async
+    def RecvFromBatch (self, size = None, count = None, cancel = None):
+        """Asynchronously receive batch of datagrams
+
+        Waits for at least one datagram, then receives datagrams until socket
+        is drained or ``count`` datagrams are received. Returns list of (data,
+        address) tuples. If receive offload is enabled coalesced datagrams are
+        split back into segments.
+        """
+        size = size or self.default_size
+        with self.reading:
+            datagrams = []
+            while True:
+                try:
+                    while count is None or len (datagrams) < count:
+                        datagrams.extend (self.recv_datagrams (size))
+
+                except socket.error as error:
+                    if error.errno not in BlockingErrorSet:
+                        raise
+
+                if datagrams:
+                    AsyncReturn (datagrams)
+
+                yield self.core.Poll (self.fd, POLL_READ, cancel)
+
+    #--------------------------------------------------------------------------#
+    # Send                                                                     #
+    #--------------------------------------------------------------------------#
+    @Async
+    def SendTo (self, data, address, cancel = None):
+        """Asynchronously send datagram to address
+        """
+        with self.writing:
+            while True:
+                try:
+                    AsyncReturn (self.sock.sendto (data, address))
+
+                except socket.error as error:
+                    if error.errno not in BlockingErrorSet:
+                        raise
+
+                yield self.core.Poll (self.fd, POLL_WRITE, cancel)
+
+    @Async
+    def SendToBatch (self, datagrams, address = None, cancel = None):
+        """Asynchronously send batch of datagrams
+
+        ``datagrams`` is a list of (data, address) tuples, or list of data if
+        ``address`` is set. If segmentation offload is enabled runs of datagrams
+        destined to the same address are sent with single system call. Returns
+        number of sent datagrams.
+        """
+        datagrams = list (datagrams) if address is None else [(data, address) for data in datagrams]
+
+        with self.writing:
+            sent = 0
+            while sent < len (datagrams):
+                try:
+                    while sent < len (datagrams):
+                        sent += self.send_datagrams (datagrams, sent)
+
+                except socket.error as error:
+                    if error.errno not in BlockingErrorSet:
+                        raise
+                    yield self.core.Poll (self.fd, POLL_WRITE, cancel)
+
+            AsyncReturn (sent)
+
+    #--------------------------------------------------------------------------#
+    # Options                                                                  #
+    #--------------------------------------------------------------------------#
+    def SegmentSize (self, size = None):
+        """Set or get segmentation offload (UDP_SEGMENT) segment size
+
+        Segment size is passed only with runs of datagrams coalesced by
+        SendToBatch, other datagrams are sent as is. Zero segment size disables
+        segmentation offload. If size is not set, returns current segment size.
+        """
+        if size is None:
+            return self.segment_size
+
+        if size:
+            if not hasattr (self.sock, 'sendmsg'):
+                raise NotImplementedError ('Segmentation offload requires sendmsg')
+            self.sock.getsockopt (SOL_UDP, UDP_SEGMENT) # raises if it is not supported
+        self.segment_size = size
+        return size
+
+    def ReceiveOffload (self, enable = None):
+        """Set or get receive offload (UDP_GRO) option value
+
+        If enable is not set, returns current "receive offload" value.
+        """
+        if enable is None:
+            return self.gro
+
+        if enable and not hasattr (self.sock, 'recvmsg'):
+            raise NotImplementedError ('Receive offload requires recvmsg')
+
+        self.sock.setsockopt (SOL_UDP, UDP_GRO, 1 if enable else 0)
+        self.gro = bool (enable)
+        return enable
+
+    #--------------------------------------------------------------------------#
+    # Private                                                                  #
+    #--------------------------------------------------------------------------#
+    def recv_datagrams (self, size):
+        """Receive single (possibly coalesced) datagram
+
+        Returns list of (data, address) tuples.
+        """
+        if not self.gro:
+            return (self.sock.recvfrom (size),)
+
+        data, ancdata, flags, address = self.sock.recvmsg (max (size, self.default_size), UDP_GRO_CMSG_SIZE)
+        for level, kind, value in ancdata:
+            if level == SOL_UDP and kind == UDP_GRO:
+                segment = struct.unpack ('i', value [:4]) [0] if len (value) >= 4 else \
+                          struct.unpack ('H', value [:2]) [0]
+                if 0 < segment < len (data):
+                    return [(data [offset:offset + segment], address) for offset in range (0, len (data), segment)]
+        return ((data, address),)
+
+    def send_datagrams (self, datagrams, start):
+        """Send datagrams starting with ``start`` index
+
+        Returns number of sent datagrams.
+        """
+        data, address = datagrams [start]
+        segment = self.segment_size
+        if not segment or len (data) != segment:
+            self.sock.sendto (data, address)
+            return 1
+
+        # coalesce run of full segments (the last one can be shorter)
+        chunks = [data]
+        for chunk, chunk_address in datagrams [start + 1:start + min (UDP_MAX_SEGMENTS, UDP_MAX_PAYLOAD // segment)]:
+            if chunk_address != address or len (chunk) > segment or not chunk:
+                break
+            chunks.append (chunk)
+            if len (chunk) < segment:
+                break
+
+        if len (chunks) == 1:
+            self.sock.sendto (data, address)
+        else:
+            self.sock.sendmsg ((b''.join (chunks),), ((SOL_UDP, UDP_SEGMENT, struct.pack ('H', segment)),), 0, address)
+        return len (chunks)
+
+# vim: nu ft=python columns=120 :
@@ -0,0 +1,259 @@
+# -*- coding: utf-8 -*-
+import os
+import stat
+import errno
+
+from .stream import Stream, file_read, file_write
+from .file import BufferedFile
+from .buffered import BufferedStream
+from ..async import Async, AsyncReturn
+from ..future import RaisedFuture, CompletedFuture
+from ..core.worker import WorkerPool
+from ..core.error import BrokenPipeError
+
+__all__ = ('DiskFile', 'BufferedDiskFile', 'BufferedFileFD',)
+#------------------------------------------------------------------------------#
+# Disk File                                                                    #
+#------------------------------------------------------------------------------#
+class DiskFile (Stream):
+    """Asynchronous regular (disk) file
+
+    Regular files can not be polled, and reading or writing them blocks, so
+    positional reads and writes are executed by worker pool. Sequential reads
+    prefetch up to ``readahead`` following blocks of ``readahead_size`` bytes.
+    """
+    default_readahead      = 2
+    default_readahead_size = 1 << 16
+
+    def __init__ (self, fd, closefd = None, pool = None, readahead = None, readahead_size = None):
+        Stream.__init__ (self)
+
+        self.fd = fd
+        self.closefd = closefd is None or closefd
+        self.pool = pool or WorkerPool.Instance ()
+
+        self.position = os.lseek (fd, 0, os.SEEK_CUR)
+        self.readahead = self.default_readahead if readahead is None else readahead
+        self.readahead_size = readahead_size or self.default_readahead_size
+        self.ahead = [] # list of prefetched blocks [offset, size, future]
+        self.jobs = set () # futures of jobs using descriptor
+
+    #--------------------------------------------------------------------------#
+    # Properties                                                               #
+    #--------------------------------------------------------------------------#
+    @property
+    def Fd (self):
+        """File descriptor
+        """
+        return self.fd
+
+    @property
+    def Pool (self):
+        """Associated worker pool
+        """
+        return self.pool
+
+    def Position (self, position = None):
+        """Set or get current position
+
+        If position is not set, returns current position.
+        """
+        if position is None:
+            return self.position
+
+        self.position = position
+        return position
+
+    #--------------------------------------------------------------------------#
+    # Read                                                                     #
+    #--------------------------------------------------------------------------#
+    @Async
+    def Read (self, size, cancel = None):
+        """Asynchronously read data at current position
+        """
+        with self.reading:
+            if self.readahead:
+                data = yield self.read_ahead (size)
+            else:
+                data = yield self.submit (file_read, size, self.position)
+
+            if size and not data:
+                raise BrokenPipeError (errno.EPIPE, 'Broken pipe') # end of file
+            self.position += len (data)
+            AsyncReturn (data)
+
+    def ReadAt (self, size, offset):
+        """Asynchronously read data at specified offset
+
+        Current position is not changed. Returns empty data at the end of file.
+        """
+        if self.Disposed:
+            return RaisedFuture (ValueError ('File is disposed'))
+        return self.submit (file_read, size, offset)
+
+    #--------------------------------------------------------------------------#
+    # Write                                                                    #
+    #--------------------------------------------------------------------------#
+    @Async
+    def Write (self, data, cancel = None):
+        """Asynchronously write data at current position
+        """
+        with self.writing:
+            del self.ahead [:] # prefetched data is no longer valid
+            size = yield self.submit (file_write, data, self.position)
+            self.position += size
+            AsyncReturn (size)
+
+    def WriteAt (self, data, offset):
+        """Asynchronously write data at specified offset
+
+        Current position is not changed. Returns size of written data.
+        """
+        if self.Disposed:
+            return RaisedFuture (ValueError ('File is disposed'))
+        del self.ahead [:]
+        return self.submit (file_write, data, offset)
+
+    #--------------------------------------------------------------------------#
+    # Sync                                                                     #
+    #--------------------------------------------------------------------------#
+    def Sync (self):
+        """Asynchronously flush file content to disk (fsync)
+        """
+        if self.Disposed:
+            return RaisedFuture (ValueError ('File is disposed'))
+        return self.submit (os.fsync)
+
+    #--------------------------------------------------------------------------#
+    # Dispose                                                                  #
+    #--------------------------------------------------------------------------#
+    @Async
+    def Dispose (self, cancel = None):
+        """Dispose file
+
+        Descriptor is closed once all submitted jobs (including prefetch) are
+        finished, as otherwise they could use reused descriptor.
+        """
+        if self.Disposed:
+            return
+
+        try:
+            yield Stream.Dispose (self, cancel)
+        finally:
+            del self.ahead [:]
+            fd, self.fd = self.fd, -1
+            while self.jobs:
+                try:
+                    yield next (iter (self.jobs))
+                except Exception: pass
+            if self.closefd:
+                os.close (fd)
+
+        AsyncReturn (fd)
+
+    def Detach (self, cancel = None):
+        """Detach descriptor
+
+        Put the stream into closed state without actually closing the underlying
+        file descriptor. The file descriptor is returned, and can be reused for
+        other purposes.
+        """
+        if self.Disposed:
+            return RaisedFuture (ValueError ('File is disposed'))
+
+        self.closefd = False
+        return self.Dispose (cancel)
+
+    #--------------------------------------------------------------------------#
+    # Private                                                                  #
+    #--------------------------------------------------------------------------#
+    def submit (self, func, *args):
+        """Submit function with descriptor and arguments to worker pool
+        """
+        future = self.pool.Submit (func, self.fd, *args)
+        if not future.IsCompleted ():
+            self.jobs.add (future)
+            future.Then (lambda result, error: self.jobs.discard (future))
+        return future
+
+    @Async
+    def read_ahead (self, size):
+        """Read data at current position from prefetched blocks
+        """
+        ahead = self.ahead
+        while True:
+            if not ahead or ahead [0][0] != self.position:
+                del ahead [:] # not a sequential read
+                block_size = max (size, self.readahead_size)
+                ahead.append ([self.position, block_size,
+                               self.submit (file_read, block_size, self.position)])
+
+            block = ahead [0]
+            block_offset, block_size, block_future = block
+            data = yield block_future
+            if ahead and ahead [0] is block:
+                break
+            # prefetched blocks have been dropped by write while waiting, read again
+
+        eof = len (data) < block_size
+        if len (data) > size:
+            # keep the rest of the block
+            ahead [0] = [block_offset + size, block_size - size, CompletedFuture (data [size:])]
+        elif eof:
+            del ahead [:]
+        else:
+            ahead.pop (0)
+
+        # prefetch following blocks
+        if not eof:
+            offset = ahead [-1][0] + ahead [-1][1] if ahead else block_offset + block_size
+            count = self.readahead + (1 if len (data) > size else 0)
+            while len (ahead) < count:
+                ahead.append ([offset, self.readahead_size,
+                               self.submit (file_read, self.readahead_size, offset)])
+                offset += self.readahead_size
+
+        AsyncReturn (data [:size])
+
+    #--------------------------------------------------------------------------#
+    # To String                                                                #
+    #--------------------------------------------------------------------------#
+    def __str__ (self):
+        """String representation
+        """
+        return '<{} [fd:{} position:{} flags:{}] at {}>'.format (type (self).__name__,
+            self.fd, self.position, ','.join (self.FlagsNames), id (self))
+
+#------------------------------------------------------------------------------#
+# Buffered Disk File                                                           #
+#------------------------------------------------------------------------------#
+class BufferedDiskFile (BufferedStream):
+    """Buffered asynchronous regular (disk) file
+    """
+    def __init__ (self, fd, buffer_size = None, closefd = None, pool = None, buffer_type = None):
+        BufferedStream.__init__ (self, DiskFile (fd, closefd, pool), buffer_size, buffer_type)
+
+    #--------------------------------------------------------------------------#
+    # Detach                                                                   #
+    #--------------------------------------------------------------------------#
+    @Async
+    def Detach (self, cancel = None):
+        """Detach underlying descriptor
+        """
+        AsyncReturn ((yield (yield BufferedStream.Detach (self, cancel)).Detach (cancel)))
+
+#------------------------------------------------------------------------------#
+# Buffered File Factory                                                        #
+#------------------------------------------------------------------------------#
+def BufferedFileFD (fd, buffer_size = None, closefd = None, core = None, buffer_type = None):
+    """Create buffered stream appropriate for file descriptor
+
+    Regular files (for example standard streams redirected to a file) can not
+    be polled, so BufferedDiskFile executed by global worker pool is created for
+    them, BufferedFile otherwise.
+    """
+    if stat.S_ISREG (os.fstat (fd).st_mode):
+        return BufferedDiskFile (fd, buffer_size, closefd, None, buffer_type)
+    return BufferedFile (fd, buffer_size, closefd, core, buffer_type)
+
+# vim: nu ft=python columns=120 :
@@ -11,6 +11,14 @@ from ..core import Core, POLL_READ, POLL_WRITE
 from ..core.error import BrokenPipeError, BlockingErrorSet, PipeErrorSet
 
 __all__ = ('File', 'BufferedFile', 'BlockingFD', 'CloseOnExecFD',)
+
+try:
+    IOV_MAX = os.sysconf ('SC_IOV_MAX') # maximum number of chunks in vectored write
+except (AttributeError, ValueError, OSError):
+    IOV_MAX = -1
+IOV_MAX = IOV_MAX if IOV_MAX > 0 else 1024
+readv = getattr (os, 'readv', None) # python 3.3 or higher
+writev = getattr (os, 'writev', None)
 #------------------------------------------------------------------------------#
 # File                                                                         #
 #------------------------------------------------------------------------------#
@@ -65,6 +73,35 @@ class File (Stream):
 
                 yield self.core.Poll (self.fd, POLL_READ, cancel)
 
+    def ReadInto (self, buffer, cancel = None):
+        """Unbuffered asynchronous read into writable buffer
+
+        Buffer is filled with readv system call if it is available.
+        """
+        if readv is None:
+            return Stream.ReadInto (self, buffer, cancel)
+        return self.read_into (buffer, cancel)
+
+    @Async
+    def read_into (self, buffer, cancel = None):
+        """Unbuffered asynchronous read into writable buffer with readv
+        """
+        with self.reading:
+            while True:
+                try:
+                    size = readv (self.fd, (buffer,))
+                    if not size and len (buffer):
+                        raise BrokenPipeError (errno.EPIPE, 'Broken pipe')
+                    AsyncReturn (size)
+
+                except OSError as error:
+                    if error.errno not in BlockingErrorSet:
+                        if error.errno in PipeErrorSet:
+                            raise BrokenPipeError (error.errno, error.strerror)
+                        raise
+
+                yield self.core.Poll (self.fd, POLL_READ, cancel)
+
     #--------------------------------------------------------------------------#
     # Write                                                                    #
     #--------------------------------------------------------------------------#
@@ -85,6 +122,32 @@ class File (Stream):
 
                 yield self.core.Poll (self.fd, POLL_WRITE, cancel)
 
+    def WriteVector (self, chunks, cancel = None):
+        """Unbuffered asynchronous vectored write
+
+        Chunks are written with single writev system call if it is available.
+        """
+        if writev is None:
+            return Stream.WriteVector (self, chunks, cancel)
+        return self.write_vector (chunks [:IOV_MAX], cancel)
+
+    @Async
+    def write_vector (self, chunks, cancel = None):
+        """Unbuffered asynchronous vectored write with writev
+        """
+        with self.writing:
+            while True:
+                try:
+                    AsyncReturn (writev (self.fd, chunks))
+
+                except OSError as error:
+                    if error.errno not in BlockingErrorSet:
+                        if error.errno in PipeErrorSet:
+                            raise BrokenPipeError (error.errno, error.strerror)
+                        raise
+
+                yield self.core.Poll (self.fd, POLL_WRITE, cancel)
+
     #--------------------------------------------------------------------------#
     # Dispose                                                                  #
     #--------------------------------------------------------------------------#
@@ -158,8 +221,8 @@ class File (Stream):
 class BufferedFile (BufferedStream):
     """Buffered asynchronous file
     """
-    def __init__ (self, fd, buffer_size = None, closefd = None, core = None):
-        BufferedStream.__init__ (self, File (fd, closefd, core), buffer_size)
+    def __init__ (self, fd, buffer_size = None, closefd = None, core = None, buffer_type = None):
+        BufferedStream.__init__ (self, File (fd, closefd, core), buffer_size, buffer_type)
 
     #--------------------------------------------------------------------------#
     # Detach                                                                   #
@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+import sys
+import struct
+
+from .buffered import BufferOverflowError
+from ..async import Async, AsyncReturn
+from ..future import CompletedFuture
+
+__all__ = ('FrameReader', 'FrameWriter',)
+#------------------------------------------------------------------------------#
+# Frame Header                                                                 #
+#------------------------------------------------------------------------------#
+frame_headers = {
+    1: struct.Struct ('>B'),
+    2: struct.Struct ('>H'),
+    4: struct.Struct ('>I'),
+    8: struct.Struct ('>Q'),
+}
+
+def frame_header (width):
+    """Get frame header structure of specified width (default 4 bytes)
+    """
+    header = frame_headers.get (width or 4)
+    if header is None:
+        raise ValueError ('Unsupported frame header width: {}'.format (width))
+    return header
+
+#------------------------------------------------------------------------------#
+# Frame Reader                                                                 #
+#------------------------------------------------------------------------------#
+class FrameReader (object):
+    """Length prefixed frames reader
+
+    Reads frames (big-endian size header followed by data) from buffered
+    stream. Frames which are already buffered are decoded without reading
+    base stream. Default header of 4 bytes is compatible with BytesRead.
+    """
+    def __init__ (self, stream, header = None, max_size = None):
+        self.stream = stream
+        self.header = frame_header (header)
+        self.max_size = max_size
+
+    #--------------------------------------------------------------------------#
+    # Read                                                                     #
+    #--------------------------------------------------------------------------#
+    def Read (self, cancel = None):
+        """Read single frame
+        """
+        return self.read (1, cancel).ChainResult (lambda frames: frames [0])
+
+    def ReadBatch (self, max_count = None, cancel = None):
+        """Read all buffered frames
+
+        Returns list of at least one and at most ``max_count`` (if set) frames.
+        Base stream is only read if there is no complete frame buffered.
+        """
+        return self.read (max_count, cancel)
+
+    def read (self, max_count, cancel):
+        """Read frames
+        """
+        try:
+            with self.stream.reading:
+                if self.frame_ready ():
+                    return CompletedFuture (self.decode (max_count))
+        except Exception:
+            return CompletedFuture (error = sys.exc_info ())
+        return self.read_async (max_count, cancel)
+
+    @Async
+    def read_async (self, max_count, cancel):
+        """Read frames when there is no complete frame buffered
+        """
+        stream = self.stream
+        with stream.reading:
+            while not self.frame_ready ():
+                yield stream.fill (cancel)
+            AsyncReturn (self.decode (max_count))
+
+    #--------------------------------------------------------------------------#
+    # Private                                                                  #
+    #--------------------------------------------------------------------------#
+    def frame_ready (self):
+        """Whether first frame is completely buffered
+        """
+        buffer = self.stream.read_buffer
+        length = buffer.Length ()
+        if length < self.header.size:
+            return False
+
+        size = self.header.unpack (buffer.Slice (self.header.size)) [0]
+        if self.max_size and size > self.max_size:
+            raise BufferOverflowError ('Frame size exceeds limit: {} > {}'.format (size, self.max_size))
+
+        return length >= self.header.size + size
+
+    def decode (self, max_count):
+        """Decode buffered frames (first frame must be complete)
+        """
+        buffer = self.stream.read_buffer
+        header = self.header
+
+        if max_count == 1:
+            size = header.unpack (buffer.Dequeue (header.size)) [0]
+            return [buffer.Dequeue (size) if size else b''] # zero size dequeues whole buffer
+
+        data = buffer.Slice ()
+        frames, offset = [], 0
+        while len (data) - offset >= header.size:
+            start = offset + header.size
+            size = header.unpack_from (data, offset) [0]
+            if self.max_size and size > self.max_size:
+                break # reported by the next read
+            if len (data) < start + size:
+                break
+
+            offset = start + size
+            frames.append (data [start:offset])
+            if max_count and len (frames) >= max_count:
+                break
+
+        buffer.Dequeue (offset, False)
+        return frames
+
+#------------------------------------------------------------------------------#
+# Frame Writer                                                                 #
+#------------------------------------------------------------------------------#
+class FrameWriter (object):
+    """Length prefixed frames writer
+    """
+    def __init__ (self, stream, header = None, max_size = None):
+        self.stream = stream
+        self.header = frame_header (header)
+        self.max_size = max_size
+
+    #--------------------------------------------------------------------------#
+    # Write                                                                    #
+    #--------------------------------------------------------------------------#
+    def WriteBuffer (self, frame):
+        """Write frame to buffer
+        """
+        if self.max_size and len (frame) > self.max_size:
+            raise BufferOverflowError ('Frame size exceeds limit: {} > {}'.format (len (frame), self.max_size))
+
+        self.stream.WriteBuffer (self.header.pack (len (frame)))
+        self.stream.WriteBuffer (frame)
+
+    def WriteBatchBuffer (self, frames):
+        """Write list of frames to buffer
+        """
+        for frame in frames:
+            self.WriteBuffer (frame)
+
+    #--------------------------------------------------------------------------#
+    # Flush                                                                    #
+    #--------------------------------------------------------------------------#
+    def Flush (self, cancel = None):
+        """Flush underlying stream
+        """
+        return self.stream.Flush (cancel)
+
+# vim: nu ft=python columns=120 :
@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+import struct
+import collections
+
+from .file import File
+from .libc import libc_call
+from ..async import Async, AsyncReturn
+from ..core.error import BlockingErrorSet
+
+__all__ = ('Watcher', 'WatcherEvent',)
+
+fs_encoding = sys.getfilesystemencoding () or 'utf-8'
+WatcherEvent = collections.namedtuple ('WatcherEvent', ('path', 'name', 'mask', 'cookie',))
+#------------------------------------------------------------------------------#
+# Watcher                                                                      #
+#------------------------------------------------------------------------------#
+class Watcher (File):
+    """File system watcher (linux inotify)
+
+    Watches files and directories added with Add. Events returns batch of
+    events read at once, events of the same file are coalesced (their masks are
+    combined).
+    """
+    IN_ACCESS        = 0x00000001
+    IN_MODIFY        = 0x00000002
+    IN_ATTRIB        = 0x00000004
+    IN_CLOSE_WRITE   = 0x00000008
+    IN_CLOSE_NOWRITE = 0x00000010
+    IN_OPEN          = 0x00000020
+    IN_MOVED_FROM    = 0x00000040
+    IN_MOVED_TO      = 0x00000080
+    IN_CREATE        = 0x00000100
+    IN_DELETE        = 0x00000200
+    IN_DELETE_SELF   = 0x00000400
+    IN_MOVE_SELF     = 0x00000800
+    IN_UNMOUNT       = 0x00002000
+    IN_Q_OVERFLOW    = 0x00004000
+    IN_IGNORED       = 0x00008000
+    IN_ONLYDIR       = 0x01000000
+    IN_DONT_FOLLOW   = 0x02000000
+    IN_ISDIR         = 0x40000000
+
+    IN_CHANGES = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO |
+                  IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF)
+
+    IN_NONBLOCK = 0x800
+    IN_CLOEXEC  = 0x80000
+
+    event_struct = struct.Struct ('iIII') # wd, mask, cookie, name length
+    read_size = 1 << 16
+
+    def __init__ (self, core = None):
+        fd = libc_call ('inotify_init1', self.IN_NONBLOCK | self.IN_CLOEXEC)
+        File.__init__ (self, fd, True, core)
+
+        self.paths = {} # watch descriptor -> path
+        self.wds = {} # path -> watch descriptor
+
+    #--------------------------------------------------------------------------#
+    # Watch                                                                    #
+    #--------------------------------------------------------------------------#
+    def Add (self, path, mask = None):
+        """Watch path for events specified by mask (all changes by default)
+
+        Returns watch descriptor.
+        """
+        wd = libc_call ('inotify_add_watch', self.fd, path_encode (path),
+            self.IN_CHANGES if mask is None else mask)
+        self.paths [wd] = path
+        self.wds [path] = wd
+        return wd
+
+    def Remove (self, path):
+        """Stop watching path
+        """
+        wd = self.wds.pop (path)
+        self.paths.pop (wd, None)
+        libc_call ('inotify_rm_watch', self.fd, wd)
+
+    @property
+    def Paths (self):
+        """Watched paths
+        """
+        return list (self.wds)
+
+    #--------------------------------------------------------------------------#
+    # Events                                                                   #
+    #--------------------------------------------------------------------------#
+    @Async
+    def Events (self, delay = None, cancel = None):
+        """Asynchronously wait for events
+
+        If ``delay`` is set, events which occurred during ``delay`` seconds after
+        the first one are included too, which allows to coalesce bursts of
+        events. Returns non empty list of WatcherEvent in order of their first
+        occurrence, event name is empty for events of watched path itself.
+        Watches removed by the kernel (for example watched path has been
+        deleted) are reported with IN_IGNORED event, while explicitly removed
+        ones are not. IN_Q_OVERFLOW event has None path, and means that some
+        events have been lost.
+        """
+        while True:
+            data = [(yield File.Read (self, self.read_size, cancel))]
+            data.extend (self.read_available ())
+            if delay is not None:
+                yield self.core.TimeDelay (delay, cancel)
+                data.extend (self.read_available ())
+
+            events = self.events_parse (b''.join (data))
+            if events:
+                AsyncReturn (events)
+
+    #--------------------------------------------------------------------------#
+    # Private                                                                  #
+    #--------------------------------------------------------------------------#
+    def read_available (self):
+        """Read all available data without waiting
+        """
+        data = []
+        while True:
+            try:
+                chunk = os.read (self.fd, self.read_size)
+                if not chunk:
+                    break
+                data.append (chunk)
+            except OSError as error:
+                if error.errno not in BlockingErrorSet:
+                    raise
+                break
+        return data
+
+    def events_parse (self, data):
+        """Parse and coalesce inotify_event records
+        """
+        events = collections.OrderedDict ()
+        offset, header_size = 0, self.event_struct.size
+        while offset + header_size <= len (data):
+            wd, mask, cookie, name_size = self.event_struct.unpack_from (data, offset)
+            offset += header_size
+            name = path_decode (data [offset:offset + name_size].rstrip (b'\x00'))
+            offset += name_size
+
+            path = self.paths.get (wd)
+            if mask & self.IN_IGNORED:
+                # watch has been removed (explicitly or path has been deleted)
+                if path is not None and self.wds.get (path) == wd:
+                    del self.wds [path]
+                self.paths.pop (wd, None)
+            if path is None and not mask & self.IN_Q_OVERFLOW:
+                continue # watch has already been removed, None path is reserved for overflow
+
+            key = (path, name, cookie)
+            event = events.get (key)
+            events [key] = WatcherEvent (path, name, mask | (event.mask if event else 0), cookie)
+
+        return list (events.values ())
+
+    #--------------------------------------------------------------------------#
+    # To String                                                                #
+    #--------------------------------------------------------------------------#
+    def __str__ (self):
+        """String representation
+        """
+        return '<{} [fd:{} paths:{}] at {}>'.format (type (self).__name__, self.fd, len (self.wds), id (self))
+
+#------------------------------------------------------------------------------#
+# Helpers                                                                      #
+#------------------------------------------------------------------------------#
+def path_encode (path):
+    """Encode path to bytes
+    """
+    return path if isinstance (path, bytes) else path.encode (fs_encoding)
+
+def path_decode (path):
+    """Decode path from bytes (only if native paths are not bytes)
+    """
+    return path if str is bytes else path.decode (fs_encoding, 'surrogateescape')
+
+# vim: nu ft=python columns=120 :
@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+"""C library functions which are not exposed by os module
+
+Functions are called through ctypes, so they are available regardless of
+python version.
+"""
+import os
+try:
+    import ctypes
+    import ctypes.util
+except ImportError:
+    ctypes = None # no ctypes support
+
+#------------------------------------------------------------------------------#
+# C Library                                                                    #
+#------------------------------------------------------------------------------#
+libc = None
+
+def libc_function (name, restype = None, argtypes = None):
+    """Get libc function (setting its result and argument types if provided)
+
+    Returns None if function is not available.
+    """
+    global libc
+    if libc is None:
+        if ctypes is None:
+            return None
+        libc = ctypes.CDLL (ctypes.util.find_library ('c'), use_errno = True)
+
+    func = getattr (libc, name, None)
+    if func is not None:
+        if restype is not None:
+            func.restype = restype
+        if argtypes is not None:
+            func.argtypes = argtypes
+    return func
+
+def libc_call (name, *args):
+    """Call libc function, raise OSError if it fails
+    """
+    func = libc_function (name)
+    if func is None:
+        raise NotImplementedError ('{} is not supported'.format (name))
+
+    result = func (*args)
+    if result < 0:
+        error = ctypes.get_errno ()
+        raise OSError (error, os.strerror (error))
+    return result
+
+# vim: nu ft=python columns=120 :
@@ -0,0 +1,312 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+import mmap
+import errno
+try:
+    import ctypes
+except ImportError:
+    ctypes = None # no ctypes support
+
+from .stream import Stream
+from .libc import libc_function, libc_call
+from .buffered import BufferedStream
+from ..future import RaisedFuture
+from ..core.error import BrokenPipeError
+
+__all__ = ('MappedFile', 'MappedBuffer',)
+
+view_supported = sys.version_info [0] > 2 # memoryview of mmap object
+#------------------------------------------------------------------------------#
+# Mapped File                                                                  #
+#------------------------------------------------------------------------------#
+class MappedFile (BufferedStream):
+    """Memory mapped file
+
+    Whole file is mapped into memory and used as read buffer, so all read
+    methods of buffered stream (ReadUntilSub, StructListRead, ...) work directly
+    on mapped memory, and only returned data is copied. Reaching the end of the
+    file results in BrokenPipeError. Descriptor is not owned by mapped file and
+    can be closed right after its creation.
+    """
+    MADV_NORMAL     = 0
+    MADV_RANDOM     = 1
+    MADV_SEQUENTIAL = 2
+    MADV_WILLNEED   = 3
+    MADV_DONTNEED   = 4
+
+    def __init__ (self, fd, writable = None):
+        fd = fd if isinstance (fd, int) else fd.fileno ()
+        size = os.fstat (fd).st_size
+        self.writable = bool (writable)
+        self.memory = (mmap.mmap (fd, size, access = mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ)
+                       if size else b'') # empty file can not be mapped
+        BufferedStream.__init__ (self, Stream (), buffer_type = lambda: MappedBuffer (self.memory))
+
+    #--------------------------------------------------------------------------#
+    # Properties                                                               #
+    #--------------------------------------------------------------------------#
+    @property
+    def Memory (self):
+        """Mapped memory (mmap object)
+        """
+        return self.memory
+
+    @property
+    def Size (self):
+        """Size of mapped file
+        """
+        return len (self.memory)
+
+    def Position (self, position = None):
+        """Set or get current read position
+
+        If position is not set, returns current position.
+        """
+        return self.read_buffer.Position (position)
+
+    #--------------------------------------------------------------------------#
+    # View                                                                     #
+    #--------------------------------------------------------------------------#
+    def View (self, size = None, offset = None):
+        """Get memoryview of mapped memory without copying
+
+        View starts at ``offset`` (current position by default). Mapped file can
+        not be disposed while views are referenced.
+        """
+        if self.Disposed:
+            raise ValueError ('Mapped file is disposed')
+        return self.read_buffer.View (size, None if offset is None else offset - self.read_buffer.head)
+
+    def __getitem__ (self, index):
+        """Get memoryview (or bytes for python 2) slice of mapped memory
+        """
+        if self.Disposed:
+            raise ValueError ('Mapped file is disposed')
+        return (memoryview (self.memory) if view_supported and self.memory else self.memory) [index]
+
+    #--------------------------------------------------------------------------#
+    # Write                                                                    #
+    #--------------------------------------------------------------------------#
+    def WriteAt (self, data, offset):
+        """Write data to mapped memory at specified offset
+
+        Mapped file must be writable, size of the file can not be changed.
+        Returns size of written data.
+        """
+        if not self.writable:
+            raise ValueError ('Mapped file is not writable')
+        if offset < 0 or offset + len (data) > len (self.memory):
+            raise ValueError ('Write is out of mapped memory bounds')
+        self.memory [offset:offset + len (data)] = data
+        return len (data)
+
+    def Sync (self):
+        """Flush changes of mapped memory to disk (msync)
+        """
+        if self.writable:
+            self.memory.flush ()
+
+    #--------------------------------------------------------------------------#
+    # Advise                                                                   #
+    #--------------------------------------------------------------------------#
+    def Advise (self, advice, size = None, offset = None):
+        """Advise kernel about access pattern (madvise)
+
+        Advice is one of MADV_* constants, for example MADV_SEQUENTIAL or
+        MADV_RANDOM, which is applied to ``size`` bytes starting from ``offset``
+        (whole file by default). Before python 3.8 address of read only mapping
+        can not be retrieved, so advice is ignored for it.
+        """
+        madvise = getattr (self.memory, 'madvise', None) # python 3.8 or higher
+        if madvise is None and (ctypes is None or libc_function ('madvise', None,
+                (ctypes.c_void_p, ctypes.c_size_t, ctypes.c_int)) is None):
+            raise NotImplementedError ('madvise is not supported')
+        if not self.memory:
+            return
+
+        offset = offset or 0
+        size = len (self.memory) - offset if size is None else min (size, len (self.memory) - offset)
+        # offset must be page aligned
+        size += offset % mmap.PAGESIZE
+        offset -= offset % mmap.PAGESIZE
+
+        if madvise is not None:
+            madvise (advice, offset, size)
+        elif self.writable:
+            address = ctypes.addressof (ctypes.c_char.from_buffer (self.memory)) # exported buffer is released at once
+            libc_call ('madvise', address + offset, size, advice)
+
+    #--------------------------------------------------------------------------#
+    # Dispose                                                                  #
+    #--------------------------------------------------------------------------#
+    def Dispose (self, cancel = None):
+        """Dispose mapped file
+
+        Mapping is closed only if there are no referenced views, otherwise it is
+        closed once they are garbage collected.
+        """
+        if self.Disposed:
+            return BufferedStream.Dispose (self, cancel)
+
+        memory, self.memory = self.memory, b''
+        self.read_buffer.memory = b''
+        try:
+            memory and memory.close ()
+        except BufferError: pass # exported views are still referenced
+        return BufferedStream.Dispose (self, cancel)
+
+    #--------------------------------------------------------------------------#
+    # Private                                                                  #
+    #--------------------------------------------------------------------------#
+    def read_lines (self, end, max_lines, sub):
+        """Split records, first of which ends at ``end``
+
+        Records are split in place, without copying rest of the file.
+        """
+        lines = []
+        while True:
+            lines.append (self.read_buffer.Dequeue (end))
+            if max_lines and len (lines) >= max_lines:
+                break
+
+            end = self.read_buffer.Find (sub)
+            if end < 0:
+                break
+            end += len (sub)
+
+        return lines
+
+#------------------------------------------------------------------------------#
+# Mapped Buffer                                                                #
+#------------------------------------------------------------------------------#
+class MappedBuffer (object):
+    """Read only buffer over mapped memory
+
+    Buffer contains data of mapped memory starting from current position, it
+    can not be filled, filling it results in BrokenPipeError (end of file).
+    """
+    def __init__ (self, memory):
+        self.memory = memory
+        self.head = 0
+
+    #--------------------------------------------------------------------------#
+    # Position                                                                 #
+    #--------------------------------------------------------------------------#
+    def Position (self, position = None):
+        """Set or get current position
+        """
+        if position is not None:
+            if not 0 <= position <= len (self.memory):
+                raise ValueError ('Invalid position: {}'.format (position))
+            self.head = position
+        return self.head
+
+    #--------------------------------------------------------------------------#
+    # Slice                                                                    #
+    #--------------------------------------------------------------------------#
+    def Slice (self, size = None, offset = None):
+        """Get bytes with ``offset`` and ``size``
+        """
+        start = self.head + (offset or 0)
+        return self.memory [start:len (self.memory) if size is None else start + size]
+
+    def View (self, size = None, offset = None):
+        """Get memoryview with ``offset`` and ``size`` without copying
+
+        Bytes are returned instead if mmap does not support memoryview.
+        """
+        if not view_supported or not self.memory:
+            return self.Slice (size, offset)
+        start = self.head + (offset or 0)
+        return memoryview (self.memory) [start:len (self.memory) if size is None else start + size]
+
+    #--------------------------------------------------------------------------#
+    # Find                                                                     #
+    #--------------------------------------------------------------------------#
+    def Find (self, sub, offset = None):
+        """Find first position of ``sub`` starting from ``offset``
+
+        Returns -1 if ``sub`` is not found.
+        """
+        index = self.memory.find (sub, self.head + (offset or 0))
+        return index - self.head if index >= 0 else -1
+
+    def Search (self, regex, offset = None):
+        """Search regular expression starting from ``offset``
+
+        Returns match object with positions relative to ``offset`` or None.
+        """
+        return regex.search (self.View (None, offset))
+
+    #--------------------------------------------------------------------------#
+    # Chunks                                                                   #
+    #--------------------------------------------------------------------------#
+    def Chunks (self, size = None):
+        """Get list of chunks containing at least ``size`` bytes
+        """
+        return [self.View (size)] if self.Length () else []
+
+    #--------------------------------------------------------------------------#
+    # Enqueue                                                                  #
+    #--------------------------------------------------------------------------#
+    def Enqueue (self, data):
+        """Mapped buffer can not be enqueued
+        """
+        raise ValueError ('Mapped buffer is read only')
+
+    def Fill (self, stream, size, cancel = None):
+        """Mapped buffer can not be filled (end of file)
+        """
+        return RaisedFuture (BrokenPipeError (errno.EPIPE, 'Broken pipe'))
+
+    #--------------------------------------------------------------------------#
+    # Dequeue                                                                  #
+    #--------------------------------------------------------------------------#
+    def Dequeue (self, size = None, returns = None):
+        """Dequeue "size" bytes from buffer
+
+        Returns dequeued data if returns if True (or not set) otherwise None.
+        """
+        size = min (size or len (self.memory), self.Length ())
+
+        data = None
+        if returns is None or returns:
+            data = self.memory [self.head:self.head + size]
+
+        self.head += size
+        return data
+
+    #--------------------------------------------------------------------------#
+    # Length                                                                   #
+    #--------------------------------------------------------------------------#
+    def Length  (self):
+        """Length of the buffer
+        """
+        return len (self.memory) - self.head
+    __len__ = Length
+
+    #--------------------------------------------------------------------------#
+    # Empty?                                                                   #
+    #--------------------------------------------------------------------------#
+    def __bool__ (self):
+        """Buffer is not empty
+        """
+        return len (self.memory) > self.head
+    __nonzero__ = __bool__
+
+    #--------------------------------------------------------------------------#
+    # To String                                                                #
+    #--------------------------------------------------------------------------#
+    def __str__ (self):
+        """String representation
+        """
+        return '<{} [position:{} length:{}] at {}>'.format (type (self).__name__,
+            self.head, self.Length (), id (self))
+
+    def __repr__ (self):
+        """String representation
+        """
+        return str (self)
+
+# vim: nu ft=python columns=120 :
@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+import threading
+
+__all__ = ('BufferPool',)
+#------------------------------------------------------------------------------#
+# Buffer Pool                                                                  #
+#------------------------------------------------------------------------------#
+class BufferPool (object):
+    """Pool of reusable byte array slabs
+
+    Slabs are allocated in power of two size classes in range [min_size ..
+    max_size], larger requests are not pooled. Released slabs are retained for
+    reuse while total size of retained slabs does not exceed ``retain`` bytes.
+    It is safe to use pool from any thread.
+    """
+    instance_lock = threading.Lock ()
+    instance      = None
+
+    default_min_size = 1 << 12
+    default_max_size = 1 << 22
+    default_retain   = 1 << 26
+
+    def __init__ (self, retain = None, min_size = None, max_size = None):
+        self.retain = self.default_retain if retain is None else retain
+        self.min_size = min_size or self.default_min_size
+        self.max_size = max_size or self.default_max_size
+
+        self.lock = threading.Lock ()
+        self.slabs = {}
+        self.retained = 0
+
+    #--------------------------------------------------------------------------#
+    # Instance                                                                 #
+    #--------------------------------------------------------------------------#
+    @classmethod
+    def Instance (cls, instance = None):
+        """Global pool instance
+
+        If ``instance`` is provided sets current global instance to ``instance``,
+        otherwise returns current global instance, creates it if needed.
+        """
+        with cls.instance_lock:
+            if instance is not None:
+                cls.instance = instance
+            elif cls.instance is None:
+                cls.instance = BufferPool ()
+            return cls.instance
+
+    #--------------------------------------------------------------------------#
+    # Acquire                                                                  #
+    #--------------------------------------------------------------------------#
+    def Acquire (self, size):
+        """Get byte array of at least ``size`` bytes
+
+        Content of returned byte array is undefined.
+        """
+        size_class = self.size_class (size)
+        if size_class is None:
+            return bytearray (size)
+
+        with self.lock:
+            slabs = self.slabs.get (size_class)
+            if slabs:
+                self.retained -= size_class
+                return slabs.pop ()
+
+        return bytearray (size_class)
+
+    #--------------------------------------------------------------------------#
+    # Release                                                                  #
+    #--------------------------------------------------------------------------#
+    def Release (self, slab):
+        """Return byte array to the pool
+
+        Byte array must not be used by the caller after it has been released.
+        Returns True if it has been retained by the pool.
+        """
+        size = len (slab)
+        if self.size_class (size) != size:
+            return False # not a slab
+
+        with self.lock:
+            if self.retained + size > self.retain:
+                return False
+            self.slabs.setdefault (size, []).append (slab)
+            self.retained += size
+
+        return True
+
+    #--------------------------------------------------------------------------#
+    # Retained                                                                 #
+    #--------------------------------------------------------------------------#
+    @property
+    def Retained (self):
+        """Total size of retained slabs
+        """
+        return self.retained
+
+    def Clear (self):
+        """Drop all retained slabs
+        """
+        with self.lock:
+            self.slabs.clear ()
+            self.retained = 0
+
+    #--------------------------------------------------------------------------#
+    # Private                                                                  #
+    #--------------------------------------------------------------------------#
+    def size_class (self, size):
+        """Size class of the slab of at least ``size`` bytes
+
+        Returns None if size is too big to be pooled.
+        """
+        if size > self.max_size:
+            return None
+
+        size_class = self.min_size
+        while size_class < size:
+            size_class <<= 1
+        return size_class
+
+    #--------------------------------------------------------------------------#
+    # To String                                                                #
+    #--------------------------------------------------------------------------#
+    def __str__ (self):
+        """String representation
+        """
+        return '<BufferPool [retained:{} retain:{}] at {}>'.format (self.retained, self.retain, id (self))
+
+    def __repr__ (self):
+        """String representation
+        """
+        return str (self)
+
+# vim: nu ft=python columns=120 :
@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+import os
+import socket
+try:
+    import ctypes
+except ImportError:
+    ctypes = None # no ctypes support
+
+from .file import File, BlockingFD, CloseOnExecFD
+from .libc import libc_function, libc_call
+from .sock import Socket
+from .sock_ssl import SocketSSL
+from .buffered import BufferedStream
+from ..async import Async, AsyncReturn
+from ..future import Future
+from ..core import POLL_READ, POLL_WRITE
+from ..core.error import BrokenPipeError, BlockingErrorSet, PipeErrorSet
+
+__all__ = ('Relay', 'RelayPair',)
+#------------------------------------------------------------------------------#
+# Splice                                                                       #
+#------------------------------------------------------------------------------#
+SPLICE_F_MOVE     = 0x1
+SPLICE_F_NONBLOCK = 0x2
+SPLICE_FLAGS = SPLICE_F_MOVE | SPLICE_F_NONBLOCK
+
+def splice_supported ():
+    """Whether splice is supported (linux only)
+    """
+    return ctypes is not None and libc_function ('splice', ctypes.c_ssize_t,
+        (ctypes.c_int, ctypes.c_void_p, ctypes.c_int, ctypes.c_void_p, ctypes.c_size_t, ctypes.c_uint)) is not None
+
+def splice (fd_in, fd_out, size, flags):
+    """Move at most ``size`` bytes between descriptors, one of which is a pipe
+    """
+    return libc_call ('splice', fd_in, None, fd_out, None, size, flags)
+
+#------------------------------------------------------------------------------#
+# Relay                                                                        #
+#------------------------------------------------------------------------------#
+@Async
+def Relay (source, target, buffer_size = None, cancel = None):
+    """Relay data from source to target until source is closed
+
+    If both underlying raw streams are backed by file descriptors, data is moved
+    with splice through an intermediate kernel pipe and never copied to user
+    space, otherwise it is read and written back. Only buffered streams are
+    looked through, other wrapped streams (like StreamSSL) transform data, so
+    they are relayed with read and write. Data already buffered by source is
+    relayed first. Once source is closed, write side of the target
+    socket is shut down. Returns size of relayed data.
+    """
+    buffer_size = buffer_size or BufferedStream.default_buffer_size
+
+    # buffered data
+    size = 0
+    for data in relay_pending (source):
+        yield relay_write (target, data, cancel)
+        size += len (data)
+    yield target.Flush (cancel)
+
+    # relay
+    source, target = relay_raw (source), relay_raw (target)
+    if relay_splicable (source) and relay_splicable (target):
+        size += yield relay_splice (source, target, buffer_size, cancel)
+    else:
+        size += yield relay_copy (source, target, buffer_size, cancel)
+
+    # half-close
+    if isinstance (target, Socket) and not target.Disposed:
+        try:
+            target.Shutdown (socket.SHUT_WR)
+        except socket.error: pass
+
+    AsyncReturn (size)
+
+@Async
+def RelayPair (first, second, buffer_size = None, cancel = None):
+    """Relay data between streams in both directions until both are closed
+
+    Returns sizes of data relayed from first to second and from second to first.
+    """
+    forward = Relay (first, second, buffer_size, cancel)
+    backward = Relay (second, first, buffer_size, cancel)
+
+    yield Future.All ((forward, backward))
+    AsyncReturn ((forward.Result (), backward.Result ()))
+
+#------------------------------------------------------------------------------#
+# Private                                                                      #
+#------------------------------------------------------------------------------#
+def relay_raw (stream):
+    """Underlying stream of buffered stream
+    """
+    while isinstance (stream, BufferedStream):
+        stream = stream.base
+    return stream
+
+def relay_pending (stream):
+    """Dequeue data buffered by buffered stream
+    """
+    pending = []
+    while isinstance (stream, BufferedStream):
+        if stream.read_buffer:
+            pending.append (stream.read_buffer.Dequeue ())
+        stream = stream.base
+    return pending
+
+def relay_splicable (stream):
+    """Whether stream can be used as splice endpoint
+    """
+    return isinstance (stream, File) and not isinstance (stream, SocketSSL) and splice_supported ()
+
+@Async
+def relay_write (stream, data, cancel = None):
+    """Write all data to stream
+    """
+    while data:
+        data = data [(yield stream.Write (data, cancel)):]
+
+@Async
+def relay_copy (source, target, buffer_size, cancel = None):
+    """Relay data by reading it from source and writing it to target
+    """
+    size = 0
+    while True:
+        try:
+            data = yield source.Read (buffer_size, cancel)
+        except BrokenPipeError:
+            break
+
+        yield relay_write (target, data, cancel)
+        yield target.Flush (cancel) # target may be wrapped stream
+        size += len (data)
+
+    AsyncReturn (size)
+
+@Async
+def relay_splice (source, target, buffer_size, cancel = None):
+    """Relay data with splice through intermediate pipe
+    """
+    size = 0
+    pipe_read, pipe_write = os.pipe ()
+    try:
+        for fd in (pipe_read, pipe_write):
+            BlockingFD (fd, False)
+            CloseOnExecFD (fd, True)
+
+        with source.reading, target.writing:
+            while True:
+                # source -> pipe
+                try:
+                    pending = splice (source.fd, pipe_write, buffer_size, flags = SPLICE_FLAGS)
+                    if not pending:
+                        break
+
+                except OSError as error:
+                    if error.errno not in BlockingErrorSet:
+                        if error.errno in PipeErrorSet:
+                            break
+                        raise
+
+                    yield source.core.Poll (source.fd, POLL_READ, cancel)
+                    continue
+
+                # pipe -> target
+                while pending:
+                    try:
+                        written = splice (pipe_read, target.fd, pending, flags = SPLICE_FLAGS)
+                        pending -= written
+                        size += written
+                        continue
+
+                    except OSError as error:
+                        if error.errno not in BlockingErrorSet:
+                            if error.errno in PipeErrorSet:
+                                raise BrokenPipeError (error.errno, error.strerror)
+                            raise
+
+                    yield target.core.Poll (target.fd, POLL_WRITE, cancel)
+    finally:
+        os.close (pipe_read)
+        os.close (pipe_write)
+
+    AsyncReturn (size)
+
+# vim: nu ft=python columns=120 :
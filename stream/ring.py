@@ -0,0 +1,321 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+import mmap
+import struct
+
+from .stream import Stream
+from .file import File
+from .buffered import BufferedStream
+from ..async import Async, AsyncReturn
+from ..future import Future
+from ..core.error import BrokenPipeError, BlockingErrorSet, PipeErrorSet
+
+__all__ = ('SharedRing', 'SharedPipe',)
+
+RING_HEAD = 0 # write position (updated by writer only)
+RING_TAIL = 64 # read position (updated by reader only), placed on separate cache line
+RING_HEADER_SIZE = 128
+ring_bytes_only = sys.version_info [0] < 3 # mmap slice assignment accepts only strings
+#------------------------------------------------------------------------------#
+# Shared Ring                                                                  #
+#------------------------------------------------------------------------------#
+class SharedRing (Stream):
+    """Shared memory single producer single consumer ring stream
+
+    One side of unidirectional stream over shared memory ``memory`` (mmap
+    object with ring header followed by ring data). Data is copied directly to
+    and from shared memory, notifications are sent over pipes: writer notifies
+    reader with ``notify_fd`` after each write, and waits on ``wait_fd`` when
+    ring is full, reader does the opposite. Closing of the peer is detected by
+    the end of file (broken pipe) on notification pipes.
+    """
+    notify_size = 1 << 12
+
+    def __init__ (self, memory, writer, wait_fd, notify_fd, core = None):
+        Stream.__init__ (self)
+
+        self.memory = memory
+        self.writer = writer
+        self.capacity = len (memory) - RING_HEADER_SIZE
+        if self.capacity <= 0:
+            raise ValueError ('Shared memory is too small: {}'.format (len (memory)))
+
+        self.wait = File (wait_fd, True, core)
+        self.notify = File (notify_fd, True, core)
+
+    #--------------------------------------------------------------------------#
+    # Properties                                                               #
+    #--------------------------------------------------------------------------#
+    @property
+    def Capacity (self):
+        """Ring capacity
+        """
+        return self.capacity
+
+    @property
+    def Length (self):
+        """Size of data stored in the ring
+        """
+        return self.head_get () - self.tail_get ()
+
+    #--------------------------------------------------------------------------#
+    # Read                                                                     #
+    #--------------------------------------------------------------------------#
+    @Async
+    def Read (self, size, cancel = None):
+        """Asynchronously read data
+        """
+        with self.reading:
+            length = yield self.read_wait (cancel)
+            tail = self.tail_get ()
+
+            data = self.ring_read (tail, min (size, length))
+            self.tail_set (tail + len (data))
+            self.notify_peer ()
+
+            AsyncReturn (data)
+
+    @Async
+    def ReadInto (self, buffer, cancel = None):
+        """Asynchronously read data into writable buffer
+        """
+        with self.reading:
+            length = yield self.read_wait (cancel)
+            tail = self.tail_get ()
+
+            data = self.ring_read (tail, min (len (buffer), length))
+            buffer [:len (data)] = data
+            self.tail_set (tail + len (data))
+            self.notify_peer ()
+
+            AsyncReturn (len (data))
+
+    #--------------------------------------------------------------------------#
+    # Write                                                                    #
+    #--------------------------------------------------------------------------#
+    def Write (self, data, cancel = None):
+        """Asynchronously write data
+        """
+        return self.WriteVector ((data,), cancel)
+
+    @Async
+    def WriteVector (self, chunks, cancel = None):
+        """Asynchronously write list of data chunks
+
+        Chunks are copied to the ring while it has free space, and peer is
+        notified once.
+        """
+        with self.writing:
+            free = yield self.write_wait (cancel)
+            head = self.head_get ()
+
+            size = 0
+            for chunk in chunks:
+                chunk = chunk [:free - size]
+                self.ring_write (head + size, chunk)
+                size += len (chunk)
+                if size >= free:
+                    break
+
+            self.head_set (head + size)
+            self.notify_peer ()
+
+            AsyncReturn (size)
+
+    #--------------------------------------------------------------------------#
+    # Dispose                                                                  #
+    #--------------------------------------------------------------------------#
+    @Async
+    def Dispose (self, cancel = None):
+        """Dispose stream
+
+        Notification pipes are closed, so peer receives BrokenPipeError once
+        all data is consumed.
+        """
+        if self.Disposed:
+            return
+
+        try:
+            yield Stream.Dispose (self, cancel)
+        finally:
+            self.memory = None
+            yield Future.All ((self.wait.Dispose (), self.notify.Dispose ()))
+
+    #--------------------------------------------------------------------------#
+    # Private                                                                  #
+    #--------------------------------------------------------------------------#
+    @Async
+    def read_wait (self, cancel = None):
+        """Wait for data to become available
+
+        Returns size of available data.
+        """
+        if self.writer:
+            raise ValueError ('Writer side of the ring cannot be read')
+
+        while True:
+            length = self.head_get () - self.tail_get ()
+            if length:
+                AsyncReturn (length)
+
+            try:
+                yield self.wait.Read (self.notify_size, cancel)
+            except BrokenPipeError:
+                # writer might have written data right before disposal
+                length = self.head_get () - self.tail_get ()
+                if length:
+                    AsyncReturn (length)
+                raise
+
+    @Async
+    def write_wait (self, cancel = None):
+        """Wait for free space in the ring
+
+        Returns size of free space.
+        """
+        if not self.writer:
+            raise ValueError ('Reader side of the ring cannot be written')
+
+        while True:
+            free = self.capacity - (self.head_get () - self.tail_get ())
+            if free:
+                AsyncReturn (free)
+            yield self.wait.Read (self.notify_size, cancel)
+
+    def notify_peer (self):
+        """Notify peer that ring has been changed
+
+        Notification is omitted if pipe is full, as the peer has not consumed
+        previous notifications yet. Reader ignores disposed writer, as there
+        is nobody to notify.
+        """
+        try:
+            os.write (self.notify.Fd, b'\x00')
+        except OSError as error:
+            if error.errno not in BlockingErrorSet:
+                if error.errno in PipeErrorSet:
+                    if self.writer:
+                        raise BrokenPipeError (error.errno, error.strerror)
+                else:
+                    raise
+
+    def ring_read (self, position, size):
+        """Read data from the ring at position
+        """
+        offset = RING_HEADER_SIZE + position % self.capacity
+        size_head = min (size, RING_HEADER_SIZE + self.capacity - offset)
+        data = self.memory [offset:offset + size_head]
+        if size_head < size:
+            data += self.memory [RING_HEADER_SIZE:RING_HEADER_SIZE + size - size_head]
+        return data
+
+    def ring_write (self, position, data):
+        """Write data to the ring at position
+        """
+        if ring_bytes_only and not isinstance (data, bytes):
+            data = bytes (bytearray (data))
+        offset = RING_HEADER_SIZE + position % self.capacity
+        size_head = min (len (data), RING_HEADER_SIZE + self.capacity - offset)
+        self.memory [offset:offset + size_head] = data [:size_head]
+        if size_head < len (data):
+            self.memory [RING_HEADER_SIZE:RING_HEADER_SIZE + len (data) - size_head] = data [size_head:]
+
+    def head_get (self):
+        return struct.unpack_from ('Q', self.memory, RING_HEAD) [0]
+
+    def head_set (self, head):
+        struct.pack_into ('Q', self.memory, RING_HEAD, head)
+
+    def tail_get (self):
+        return struct.unpack_from ('Q', self.memory, RING_TAIL) [0]
+
+    def tail_set (self, tail):
+        struct.pack_into ('Q', self.memory, RING_TAIL, tail)
+
+    #--------------------------------------------------------------------------#
+    # To String                                                                #
+    #--------------------------------------------------------------------------#
+    def __str__ (self):
+        """String representation
+        """
+        return '<{} [{} capacity:{} flags:{}] at {}>'.format (type (self).__name__,
+            'writer' if self.writer else 'reader', self.capacity, ','.join (self.FlagsNames), id (self))
+
+#------------------------------------------------------------------------------#
+# Shared Pipe                                                                  #
+#------------------------------------------------------------------------------#
+class SharedPipe (object):
+    """Shared memory pipe
+
+    Creates anonymous shared memory ring and notification pipes, which are
+    inherited by forked processes. Each process is expected to dispose the side
+    it does not use. Both sides are buffered streams.
+    """
+    default_capacity = 1 << 20
+
+    def __init__ (self, capacity = None, buffer_size = None, core = None):
+        capacity = capacity or self.default_capacity
+        memory = mmap.mmap (-1, RING_HEADER_SIZE + capacity)
+
+        data_reader, data_writer = os.pipe ()
+        space_reader, space_writer = os.pipe ()
+
+        self.reader = BufferedStream (SharedRing (memory, False, data_reader, space_writer, core), buffer_size)
+        self.writer = BufferedStream (SharedRing (memory, True, space_reader, data_writer, core), buffer_size)
+
+    #--------------------------------------------------------------------------#
+    # Properties                                                               #
+    #--------------------------------------------------------------------------#
+    @property
+    def Reader (self):
+        """Readable side of the pipe
+        """
+        return self.reader
+
+    @property
+    def Writer (self):
+        """Writable side of the pipe
+        """
+        return self.writer
+
+    #--------------------------------------------------------------------------#
+    # Disposable                                                               #
+    #--------------------------------------------------------------------------#
+    @Async
+    def Dispose (self, cancel = None):
+        """Dispose pipe
+        """
+        dispose = []
+
+        reader, self.reader = self.reader, None
+        if reader is not None:
+            dispose.append (reader.Dispose (cancel))
+
+        writer, self.writer = self.writer, None
+        if writer is not None:
+            dispose.append (writer.Dispose (cancel))
+
+        yield Future.All (dispose)
+
+    def __enter__ (self):
+        return self
+
+    def __exit__ (self, et, eo, tb):
+        self.Dispose ()
+        return False
+
+    #--------------------------------------------------------------------------#
+    # To String                                                                #
+    #--------------------------------------------------------------------------#
+    def __str__ (self):
+        """String representation
+        """
+        return '<SharedPipe [reader:{} writer:{}] at {}>'.format (self.reader, self.writer, id (self))
+
+    def __repr__ (self):
+        """String representation
+        """
+        return str (self)
+
+# vim: nu ft=python columns=120 :
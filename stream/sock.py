@@ -1,15 +1,23 @@
 # -*- coding: utf-8 -*-
+import os
 import socket
 import errno
+import array
 
-from .stream import StreamContext
-from .file import File
+from .stream import Stream, StreamContext
+from .file import File, CloseOnExecFD, IOV_MAX
 from .buffered import BufferedStream
 from ..async import Async, AsyncReturn
 from ..core import POLL_READ, POLL_WRITE
 from ..core.error import BrokenPipeError, BlockingErrorSet, PipeErrorSet
 
 __all__ = ('Socket', 'BufferedSocket',)
+
+TCP_CORK = getattr (socket, 'TCP_CORK', None) # linux only
+sendfile = getattr (os, 'sendfile', None) # python 3.3 or higher
+SCM_RIGHTS = getattr (socket, 'SCM_RIGHTS', None)
+MSG_CMSG_CLOEXEC = getattr (socket, 'MSG_CMSG_CLOEXEC', 0) # linux only
+MSG_CTRUNC = getattr (socket, 'MSG_CTRUNC', 0)
 #------------------------------------------------------------------------------#
 # Socket                                                                       #
 #------------------------------------------------------------------------------#
@@ -59,6 +67,26 @@ class Socket (File):
 
                 yield self.core.Poll (self.fd, POLL_READ, cancel)
 
+    @Async
+    def ReadInto (self, buffer, cancel = None):
+        """Unbuffered asynchronous read into writable buffer
+        """
+        with self.reading:
+            while True:
+                try:
+                    size = self.sock.recv_into (buffer)
+                    if not size and len (buffer):
+                        raise BrokenPipeError (errno.EPIPE, 'Broken pipe')
+                    AsyncReturn (size)
+
+                except socket.error as error:
+                    if error.errno not in BlockingErrorSet:
+                        if error.errno in PipeErrorSet:
+                            raise BrokenPipeError (error.errno, error.strerror)
+                        raise
+
+                yield self.core.Poll (self.fd, POLL_READ, cancel)
+
     #--------------------------------------------------------------------------#
     # Write                                                                    #
     #--------------------------------------------------------------------------#
@@ -79,6 +107,146 @@ class Socket (File):
 
                 yield self.core.Poll (self.fd, POLL_WRITE, cancel)
 
+    def WriteVector (self, chunks, cancel = None):
+        """Unbuffered asynchronous vectored write
+
+        Chunks are sent with single sendmsg system call if it is available.
+        """
+        if not hasattr (self.sock, 'sendmsg'):
+            return Stream.WriteVector (self, chunks, cancel)
+        return self.write_vector (chunks [:IOV_MAX], cancel)
+
+    @Async
+    def write_vector (self, chunks, cancel = None):
+        """Unbuffered asynchronous vectored write with sendmsg
+        """
+        with self.writing:
+            while True:
+                try:
+                    AsyncReturn (self.sock.sendmsg (chunks))
+
+                except socket.error as error:
+                    if error.errno not in BlockingErrorSet:
+                        if error.errno in PipeErrorSet:
+                            raise BrokenPipeError (error.errno, error.strerror)
+                        raise
+
+                yield self.core.Poll (self.fd, POLL_WRITE, cancel)
+
+    def SendFile (self, file, offset = None, count = None, cancel = None):
+        """Asynchronously send content of the file
+
+        File is sent with sendfile system call (without copying it to user
+        space) if it is available.
+        """
+        if sendfile is None:
+            return Stream.SendFile (self, file, offset, count, cancel)
+        return self.send_file (file, offset, count, cancel)
+
+    @Async
+    def send_file (self, file, offset = None, count = None, cancel = None):
+        """Asynchronously send content of the file with sendfile
+        """
+        fd = file if isinstance (file, int) else file.fileno ()
+        offset = offset or 0
+        if count is None:
+            count = max (0, os.fstat (fd).st_size - offset)
+
+        with self.writing:
+            size = 0
+            while size < count:
+                try:
+                    sent = sendfile (self.fd, fd, offset + size, count - size)
+                    if not sent:
+                        break # end of file
+                    size += sent
+                    continue
+
+                except OSError as error:
+                    if error.errno not in BlockingErrorSet:
+                        if error.errno in PipeErrorSet:
+                            raise BrokenPipeError (error.errno, error.strerror)
+                        raise
+
+                yield self.core.Poll (self.fd, POLL_WRITE, cancel)
+
+            AsyncReturn (size)
+
+    #--------------------------------------------------------------------------#
+    # File Descriptors                                                         #
+    #--------------------------------------------------------------------------#
+    @Async
+    def SendFds (self, fds, data = None, cancel = None):
+        """Asynchronously send file descriptors (unix domain socket only)
+
+        Descriptors (integers or objects with fileno method) are sent as SCM_RIGHTS
+        ancillary data along with ``data``, which must not be empty. Descriptors
+        are duplicated by receiver and can be closed once this method completes.
+        Returns number of sent bytes of data.
+        """
+        if SCM_RIGHTS is None or not hasattr (self.sock, 'sendmsg'):
+            raise NotImplementedError ('File descriptor passing is not supported')
+
+        data = data or b'\x00'
+        fds = array.array ('i', (fd if isinstance (fd, int) else fd.fileno () for fd in fds))
+        with self.writing:
+            while True:
+                try:
+                    AsyncReturn (self.sock.sendmsg ((data,), ((socket.SOL_SOCKET, SCM_RIGHTS, fds),)))
+
+                except socket.error as error:
+                    if error.errno not in BlockingErrorSet:
+                        if error.errno in PipeErrorSet:
+                            raise BrokenPipeError (error.errno, error.strerror)
+                        raise
+
+                yield self.core.Poll (self.fd, POLL_WRITE, cancel)
+
+    @Async
+    def RecvFds (self, size, count, cancel = None):
+        """Asynchronously receive file descriptors (unix domain socket only)
+
+        Receives up to ``size`` bytes of data and up to ``count`` descriptors
+        sent with it, received descriptors have "close on exec" flag set and must
+        be closed by the caller. Returns (data, fds) tuple. If more than ``count``
+        descriptors have been sent, received ones are closed (the rest is dropped
+        by the kernel) and socket.error with EMSGSIZE is raised.
+        """
+        if SCM_RIGHTS is None or not hasattr (self.sock, 'recvmsg'):
+            raise NotImplementedError ('File descriptor passing is not supported')
+
+        fds_size = socket.CMSG_SPACE (count * array.array ('i').itemsize)
+        with self.reading:
+            while True:
+                try:
+                    data, ancdata, flags, addr = self.sock.recvmsg (size, fds_size, MSG_CMSG_CLOEXEC)
+                    break
+
+                except socket.error as error:
+                    if error.errno not in BlockingErrorSet:
+                        if error.errno in PipeErrorSet:
+                            raise BrokenPipeError (error.errno, error.strerror)
+                        raise
+
+                yield self.core.Poll (self.fd, POLL_READ, cancel)
+
+        fds = array.array ('i')
+        for level, kind, value in ancdata:
+            if level == socket.SOL_SOCKET and kind == SCM_RIGHTS:
+                fds.frombytes (value [:len (value) - len (value) % fds.itemsize])
+        fds = fds.tolist ()
+        if flags & MSG_CTRUNC:
+            for fd in fds:
+                os.close (fd)
+            raise socket.error (errno.EMSGSIZE, 'File descriptors have been truncated')
+        if not MSG_CMSG_CLOEXEC:
+            for fd in fds:
+                CloseOnExecFD (fd, True)
+
+        if size and not data and not fds:
+            raise BrokenPipeError (errno.EPIPE, 'Broken pipe')
+        AsyncReturn ((data, fds))
+
     #--------------------------------------------------------------------------#
     # Connect                                                                  #
     #--------------------------------------------------------------------------#
@@ -141,6 +309,24 @@ class Socket (File):
         """
         self.sock.shutdown (how)
 
+    #--------------------------------------------------------------------------#
+    # Options                                                                  #
+    #--------------------------------------------------------------------------#
+    def Cork (self, enable = None):
+        """Set or get "cork" (TCP_CORK) option value
+
+        Corked socket sends only full frames until it is uncorked. If enable is
+        not set, returns current "cork" value.
+        """
+        if TCP_CORK is None:
+            raise NotImplementedError ('TCP_CORK is not supported')
+
+        if enable is None:
+            return bool (self.sock.getsockopt (socket.IPPROTO_TCP, TCP_CORK))
+
+        self.sock.setsockopt (socket.IPPROTO_TCP, TCP_CORK, 1 if enable else 0)
+        return enable
+
     #--------------------------------------------------------------------------#
     # Dispose                                                                  #
     #--------------------------------------------------------------------------#
@@ -197,8 +383,8 @@ class Socket (File):
 class BufferedSocket (BufferedStream):
     """Buffered asynchronous socket
     """
-    def __init__ (self, sock, buffer_size = None, core = None):
-        BufferedStream.__init__ (self, Socket (sock, core), buffer_size)
+    def __init__ (self, sock, buffer_size = None, core = None, buffer_type = None):
+        BufferedStream.__init__ (self, Socket (sock, core), buffer_size, buffer_type)
 
     #--------------------------------------------------------------------------#
     # Detach                                                                   #
@@ -209,6 +395,30 @@ class BufferedSocket (BufferedStream):
         """
         AsyncReturn ((yield (yield BufferedStream.Detach (self, cancel)).Detach (cancel)))
 
+    #--------------------------------------------------------------------------#
+    # File Descriptors                                                         #
+    #--------------------------------------------------------------------------#
+    @Async
+    def SendFds (self, fds, data = None, cancel = None):
+        """Asynchronously send file descriptors
+
+        Write buffer is flushed first, so descriptors are received after all
+        previously written data.
+        """
+        yield self.Flush (cancel)
+        AsyncReturn ((yield self.base.SendFds (fds, data, cancel)))
+
+    @Async
+    def RecvFds (self, size, count, cancel = None):
+        """Asynchronously receive file descriptors
+
+        Descriptors sent along with data which has already been read into the
+        read buffer are discarded by the kernel, hence read buffer must be empty.
+        """
+        if self.read_buffer.Length ():
+            raise RuntimeError ('Read buffer is not empty')
+        AsyncReturn ((yield self.base.RecvFds (size, count, cancel)))
+
     #--------------------------------------------------------------------------#
     # Accept                                                                   #
     #--------------------------------------------------------------------------#
@@ -217,6 +427,7 @@ class BufferedSocket (BufferedStream):
         """Asynchronously accept connection
         """
         sock, addr = yield self.base.Accept ()
-        AsyncReturn ((BufferedSocket (sock.Socket, self.buffer_size, sock.core), addr))
+        AsyncReturn ((BufferedSocket (sock.Socket, self.buffer_size, sock.core,
+            type (self.read_buffer)), addr))
 
 # vim: nu ft=python columns=120 :
@@ -1,18 +1,29 @@
 # -*- coding: utf-8 -*-
 import socket
 import errno
+import threading
+from collections import OrderedDict
 try:
     import ssl
 except ImportError:
     ssl = None # no SSL support
 
+from .stream import Stream
 from .sock import Socket
 from .buffered import BufferedStream
 from ..async import Async, AsyncReturn
+from ..future import Future, FutureSourcePair, FutureCanceled
 from ..core import POLL_READ, POLL_WRITE
 from ..core.error import BrokenPipeError, BlockingErrorSet, PipeErrorSet
 
-__all__ = ('SocketSSL', 'BufferedSocketSSL')
+__all__ = ('SocketSSL', 'BufferedSocketSSL', 'SSLSessionCache', 'OP_ENABLE_KTLS',)
+
+# kernel TLS (linux only)
+OP_ENABLE_KTLS = getattr (ssl, 'OP_ENABLE_KTLS', None) # python 3.12 or higher
+if OP_ENABLE_KTLS is None and ssl is not None and ssl.OPENSSL_VERSION_INFO >= (3,):
+    OP_ENABLE_KTLS = 1 << 3 # SSL_OP_ENABLE_KTLS
+SOL_TLS = getattr (socket, 'SOL_TLS', 282)
+TLS_TX = getattr (socket, 'TLS_TX', 1)
 #------------------------------------------------------------------------------#
 # Asynchronous SSL Socket                                                      #
 #------------------------------------------------------------------------------#
@@ -21,11 +32,23 @@ class SocketSSL (Socket):
 
     If socket has already been connected it must be wrapped with
     ssl.wrap_socket, otherwise it will be wrapped when AsyncSSLSocket.Connect
-    is finished.
+    is finished. If ``context`` (ssl.SSLContext) is provided, it is used to wrap
+    socket instead of ``ssl_options``, and client sessions are stored in
+    ``session_cache`` (global cache by default, False disables it) to be
+    resumed by subsequent connections to the same address. Handshake of
+    accepted socket is done in the background, its reads and writes wait for
+    it to finish.
     """
 
-    def __init__ (self, sock, ssl_options = None, core = None):
+    def __init__ (self, sock, ssl_options = None, core = None, context = None, session_cache = None):
         self.ssl_options = ssl_options or {}
+        self.context = context
+        if session_cache is None and context is not None:
+            session_cache = SSLSessionCache.Instance () # empty cache is falsy, hence explicit check
+        self.session_cache = None if session_cache is False else session_cache
+        self.session_key = None
+        self.handshaking = None
+        self.handshake_timeout = None
         Socket.__init__ (self, sock, core)
 
     #--------------------------------------------------------------------------#
@@ -36,6 +59,9 @@ class SocketSSL (Socket):
         """Unbuffered asynchronous read
         """
         with self.reading:
+            if self.handshaking is not None:
+                yield self.handshaking
+
             while True:
                 try:
                     data = self.sock.recv (size)
@@ -55,6 +81,33 @@ class SocketSSL (Socket):
 
                 yield self.core.Poll (self.fd, POLL_READ, cancel)
 
+    @Async
+    def ReadInto (self, buffer, cancel = None):
+        """Unbuffered asynchronous read into writable buffer
+        """
+        with self.reading:
+            if self.handshaking is not None:
+                yield self.handshaking
+
+            while True:
+                try:
+                    size = self.sock.recv_into (buffer)
+                    if not size and len (buffer):
+                        raise BrokenPipeError (errno.EPIPE, 'Broken pipe')
+                    AsyncReturn (size)
+
+                except ssl.SSLError as error:
+                    if error.args [0] != ssl.SSL_ERROR_WANT_READ:
+                        raise
+
+                except socket.error as error:
+                    if error.errno not in BlockingErrorSet:
+                        if error.errno in PipeErrorSet:
+                            raise BrokenPipeError (error.errno, error.strerror)
+                        raise
+
+                yield self.core.Poll (self.fd, POLL_READ, cancel)
+
     #--------------------------------------------------------------------------#
     # Write                                                                    #
     #--------------------------------------------------------------------------#
@@ -63,6 +116,9 @@ class SocketSSL (Socket):
         """Unbuffered asynchronous write
         """
         with self.writing:
+            if self.handshaking is not None:
+                yield self.handshaking
+
             while True:
                 try:
                     AsyncReturn (self.sock.send (data))
@@ -79,6 +135,23 @@ class SocketSSL (Socket):
 
                 yield self.core.Poll (self.fd, POLL_WRITE, cancel)
 
+    def WriteVector (self, chunks, cancel = None):
+        """Unbuffered asynchronous vectored write
+
+        SSL socket does not support sendmsg, so chunks are joined.
+        """
+        return Stream.WriteVector (self, chunks, cancel)
+
+    def SendFile (self, file, offset = None, count = None, cancel = None):
+        """Asynchronously send content of the file
+
+        If kernel TLS is active, file is sent with sendfile system call (and is
+        encrypted by the kernel), otherwise it is read and written.
+        """
+        if self.KernelTLS ():
+            return Socket.SendFile (self, file, offset, count, cancel)
+        return Stream.SendFile (self, file, offset, count, cancel)
+
     #--------------------------------------------------------------------------#
     # Connect                                                                  #
     #--------------------------------------------------------------------------#
@@ -90,13 +163,36 @@ class SocketSSL (Socket):
 
         with self.connecting:
             # wrap socket
-            self.sock = ssl.wrap_socket (self.sock, do_handshake_on_connect = False, **self.ssl_options)
+            if self.context is None:
+                self.sock = ssl.wrap_socket (self.sock, do_handshake_on_connect = False, **self.ssl_options)
+            else:
+                self.sock = self.wrap_client (address)
+
+            yield self.Handshake (cancel, self.handshake_timeout)
+            AsyncReturn (self)
 
-            # do handshake
+    #--------------------------------------------------------------------------#
+    # Handshake                                                                #
+    #--------------------------------------------------------------------------#
+    @Async
+    def Handshake (self, cancel = None, timeout = None):
+        """Asynchronously do SSL handshake
+
+        If ``timeout`` (in seconds) is set and handshake is not finished in
+        time, socket.timeout error is raised.
+        """
+        timer_cancel, timer_source = None, None
+        if timeout:
+            timer_cancel, timer_source = FutureSourcePair ()
+            timer = self.core.TimeDelay (timeout, timer_cancel)
+            cancel = timer if cancel is None else Future.Any ((timer, cancel))
+
+        try:
             while True:
                 event = None
                 try:
                     self.sock.do_handshake ()
+                    self.session_save ()
                     AsyncReturn (self)
 
                 except ssl.SSLError as error:
@@ -107,7 +203,42 @@ class SocketSSL (Socket):
                     else:
                         raise
 
-                yield self.core.Poll (self.fd, event, cancel)
+                try:
+                    yield self.core.Poll (self.fd, event, cancel)
+                except FutureCanceled:
+                    if timer_source is not None and timer.IsCompleted ():
+                        raise socket.timeout ('SSL handshake has timed out')
+                    raise
+        finally:
+            if timer_source is not None:
+                timer_source.TrySetResult (None) # release timer
+
+    def KernelTLS (self):
+        """Whether sending is done by kernel TLS
+
+        Kernel TLS is used once handshake is finished if OP_ENABLE_KTLS option
+        is set on the context and both kernel and OpenSSL support it (linux
+        only). Option is not set here as context may be shared by other sockets.
+        """
+        if self.sock is None or not isinstance (self.sock, ssl.SSLSocket):
+            return False
+        if OP_ENABLE_KTLS is None or not self.sock.context.options & OP_ENABLE_KTLS:
+            return False
+        try:
+            self.sock.getsockopt (SOL_TLS, TLS_TX, 128)
+            return True
+        except (socket.error, OSError):
+            return False
+
+    def HandshakeTimeout (self, timeout = None):
+        """Set or get handshake timeout (in seconds)
+
+        Timeout is applied to handshakes of connected and accepted sockets.
+        If timeout is not set, returns current timeout.
+        """
+        if timeout is not None:
+            self.handshake_timeout = timeout or None
+        return self.handshake_timeout
 
     #--------------------------------------------------------------------------#
     # Accept                                                                   #
@@ -116,22 +247,28 @@ class SocketSSL (Socket):
     def Accept (self, cancel = None):
         """Asynchronously accept connection
 
-        Returns client AsyncSSLSocket and address.
+        Returns client AsyncSSLSocket and address. Handshake of the client is
+        started in the background (it does not block accepting other clients).
         """
         with self.accepting:
             while True:
                 try:
                     client, addr = self.sock.accept ()
+                    client.setblocking (False)
 
                     # wrap client socket
-                    context = getattr (self.sock, 'context', None)
+                    context = self.context or getattr (self.sock, 'context', None)
                     if context:
                         # use associated context (python 3.2 or higher)
-                        client = context.wrap_socket (client, server_side = True)
+                        client = context.wrap_socket (client, server_side = True,
+                            do_handshake_on_connect = False)
                     else:
-                        client = ssl.wrap_socket (client, server_side = True, **self.ssl_options)
+                        client = ssl.wrap_socket (client, server_side = True,
+                            do_handshake_on_connect = False, **self.ssl_options)
 
-                    AsyncReturn ((SocketSSL (client, self.buffer_size, self.ssl_options, self.core), addr))
+                    client = SocketSSL (client, self.ssl_options, self.core, self.context, False)
+                    client.handshaking = client.Handshake (None, self.handshake_timeout)
+                    AsyncReturn ((client, addr))
 
                 except socket.error as error:
                     if error.errno not in BlockingErrorSet:
@@ -139,14 +276,139 @@ class SocketSSL (Socket):
 
                 yield self.core.Poll (self.fd, POLL_READ, cancel)
 
+    #--------------------------------------------------------------------------#
+    # Dispose                                                                  #
+    #--------------------------------------------------------------------------#
+    @Async
+    def Dispose (self, cancel = None):
+        """Dispose socket
+        """
+        if self.Disposed:
+            return
+
+        # session tickets (TLS 1.3) may arrive after handshake
+        self.session_save ()
+        yield Socket.Dispose (self, cancel)
+
+    #--------------------------------------------------------------------------#
+    # Private                                                                  #
+    #--------------------------------------------------------------------------#
+    def wrap_client (self, address):
+        """Wrap connected socket with context resuming cached session if any
+        """
+        hostname = self.ssl_options.get ('server_hostname')
+        if hostname is None and isinstance (address, tuple):
+            hostname = address [0]
+
+        options = {}
+        if self.session_cache is not None:
+            self.session_key = (self.context, hostname or address [0], address [1]) \
+                if isinstance (address, tuple) else (self.context, address)
+            session = self.session_cache.Get (self.session_key)
+            if session is not None:
+                options ['session'] = session # python 3.6 or higher
+
+        return self.context.wrap_socket (self.sock, server_side = False,
+            do_handshake_on_connect = False, server_hostname = hostname, **options)
+
+    def session_save (self):
+        """Store client session in session cache
+        """
+        if self.session_key is None or self.sock is None:
+            return
+
+        session = getattr (self.sock, 'session', None)
+        if session is not None:
+            self.session_cache.Set (self.session_key, session)
+
+#------------------------------------------------------------------------------#
+# SSL Session Cache                                                            #
+#------------------------------------------------------------------------------#
+class SSLSessionCache (object):
+    """Client SSL sessions cache
+
+    Least recently used cache of ssl.SSLSession objects keyed by context and
+    address of the server. It is safe to use cache from any thread.
+    """
+    instance_lock = threading.Lock ()
+    instance      = None
+
+    default_capacity = 1024
+
+    def __init__ (self, capacity = None):
+        self.capacity = capacity or self.default_capacity
+        self.sessions = OrderedDict ()
+        self.lock = threading.Lock ()
+
+    #--------------------------------------------------------------------------#
+    # Instance                                                                 #
+    #--------------------------------------------------------------------------#
+    @classmethod
+    def Instance (cls, instance = None):
+        """Global session cache instance
+
+        If ``instance`` is provided sets current global instance to ``instance``,
+        otherwise returns current global instance, creates it if needed.
+        """
+        with cls.instance_lock:
+            if instance is not None:
+                cls.instance = instance
+            elif cls.instance is None:
+                cls.instance = SSLSessionCache ()
+            return cls.instance
+
+    #--------------------------------------------------------------------------#
+    # Get                                                                      #
+    #--------------------------------------------------------------------------#
+    def Get (self, key):
+        """Get session by key
+
+        Returns None if there is no session associated with key.
+        """
+        with self.lock:
+            session = self.sessions.pop (key, None)
+            if session is not None:
+                self.sessions [key] = session
+            return session
+
+    #--------------------------------------------------------------------------#
+    # Set                                                                      #
+    #--------------------------------------------------------------------------#
+    def Set (self, key, session):
+        """Associate session with key
+        """
+        with self.lock:
+            self.sessions.pop (key, None)
+            self.sessions [key] = session
+            while len (self.sessions) > self.capacity:
+                self.sessions.popitem (last = False)
+
+    def Remove (self, key):
+        """Remove session associated with key
+        """
+        with self.lock:
+            return self.sessions.pop (key, None) is not None
+
+    #--------------------------------------------------------------------------#
+    # Length                                                                   #
+    #--------------------------------------------------------------------------#
+    def __len__ (self):
+        """Number of cached sessions
+        """
+        return len (self.sessions)
+
 #------------------------------------------------------------------------------#
 # Buffered SSL Socket                                                          #
 #------------------------------------------------------------------------------#
 class BufferedSocketSSL (BufferedStream):
     """Buffered asynchronous SSL socket
+
+    ``sock`` is either socket object or SocketSSL.
     """
-    def __init__ (self, sock, buffer_size = None, ssl_options = None, core = None):
-        BufferedStream.__init__ (self, SocketSSL (sock, ssl_options, core), buffer_size)
+    def __init__ (self, sock, buffer_size = None, ssl_options = None, core = None, buffer_type = None,
+                  context = None, session_cache = None):
+        BufferedStream.__init__ (self, sock if isinstance (sock, SocketSSL) else
+            SocketSSL (sock, ssl_options, core, context, session_cache), buffer_size, buffer_type)
 
     #--------------------------------------------------------------------------#
     # Detach                                                                   #
@@ -165,6 +427,6 @@ class BufferedSocketSSL (BufferedStream):
         """Accept connection
         """
         sock, addr = yield self.base.Accept ()
-        AsyncReturn ((BufferedSocketSSL (sock.Socket, self.buffer_size, sock.ssl_options, sock.core), addr))
+        AsyncReturn ((BufferedSocketSSL (sock, self.buffer_size, buffer_type = type (self.read_buffer)), addr))
 
 # vim: nu ft=python columns=120 :
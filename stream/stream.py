@@ -1,5 +1,8 @@
 # -*- coding: utf-8 -*-
-from ..async import Async
+import os
+import threading
+
+from ..async import Async, AsyncReturn
 from ..future import RaisedFuture, CompletedFuture
 
 __all__ = ('Stream',)
@@ -63,6 +66,16 @@ class Stream (object):
         """
         return RaisedFuture (NotImplementedError ())
 
+    def ReadInto (self, buffer, cancel = None):
+        """Asynchronously read data into writable buffer
+
+        Returns size of read data which is in range [1..len(buffer)].
+        """
+        def read_into (data):
+            buffer [:len (data)] = data
+            return len (data)
+        return self.Read (len (buffer), cancel).ChainResult (read_into)
+
     #--------------------------------------------------------------------------#
     # Write                                                                    #
     #--------------------------------------------------------------------------#
@@ -79,6 +92,39 @@ class Stream (object):
         """
         return RaisedFuture (NotImplementedError ())
 
+    def WriteVector (self, chunks, cancel = None):
+        """Asynchronously write list of data chunks
+
+        Returns size of written data, which may end in the middle of any chunk.
+        """
+        return self.Write (b''.join (chunks), cancel)
+
+    send_file_size = 1 << 16
+
+    @Async
+    def SendFile (self, file, offset = None, count = None, cancel = None):
+        """Asynchronously send content of the file
+
+        Sends ``count`` bytes (until end of file by default) of the file (object
+        or descriptor) starting from ``offset``. Current position of the file is
+        not used. Returns size of sent data.
+        """
+        fd = file if isinstance (file, int) else file.fileno ()
+        offset = offset or 0
+
+        size = 0
+        while count is None or size < count:
+            data = file_read (fd, self.send_file_size if count is None else
+                              min (self.send_file_size, count - size), offset + size)
+            if not data:
+                break
+            while data:
+                written = yield self.Write (data, cancel)
+                data = data [written:]
+                size += written
+
+        AsyncReturn (size)
+
     #--------------------------------------------------------------------------#
     # Flush                                                                    #
     #--------------------------------------------------------------------------#
@@ -140,6 +186,36 @@ class Stream (object):
         """
         return str (self)
 
+#------------------------------------------------------------------------------#
+# Read File                                                                    #
+#------------------------------------------------------------------------------#
+pread = getattr (os, 'pread', None) # python 3.3 or higher
+pwrite = getattr (os, 'pwrite', None)
+seek_lock = threading.Lock () # seek and read (write) emulation of positional I/O is not atomic
+
+def file_read (fd, size, offset):
+    """Read at most size bytes of file descriptor at specified offset
+    """
+    if pread is not None:
+        return pread (fd, size, offset)
+    with seek_lock:
+        os.lseek (fd, offset, os.SEEK_SET)
+        return os.read (fd, size)
+
+#------------------------------------------------------------------------------#
+# Write File                                                                   #
+#------------------------------------------------------------------------------#
+def file_write (fd, data, offset):
+    """Write data to file descriptor at specified offset
+
+    Returns size of written data.
+    """
+    if pwrite is not None:
+        return pwrite (fd, data, offset)
+    with seek_lock:
+        os.lseek (fd, offset, os.SEEK_SET)
+        return os.write (fd, data)
+
 #------------------------------------------------------------------------------#
 # Stream Context                                                               #
 #------------------------------------------------------------------------------#
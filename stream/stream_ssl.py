@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+import errno
+try:
+    import ssl
+except ImportError:
+    ssl = None # no SSL support
+
+from .wrapped import WrappedStream
+from ..async import Async, AsyncReturn
+from ..singleton import Singleton
+from ..core.error import BrokenPipeError
+
+__all__ = ('StreamSSL',)
+#------------------------------------------------------------------------------#
+# SSL Stream                                                                   #
+#------------------------------------------------------------------------------#
+class StreamSSL (WrappedStream):
+    """SSL stream layered over arbitrary stream
+
+    Encryption is done with ssl.SSLObject and memory BIOs, encrypted records are
+    written to base stream, so if it is buffered, records of multiple writes are
+    sent together on flush. Handshake is done on first read or write unless it
+    has been done explicitly with Handshake.
+    """
+    receive_size = 1 << 16
+
+    def __init__ (self, base, context, server_side = None, server_hostname = None, session = None):
+        if not hasattr (ssl, 'MemoryBIO'):
+            raise NotImplementedError ('SSL memory BIO is not supported')
+
+        WrappedStream.__init__ (self, base)
+
+        self.incoming = ssl.MemoryBIO ()
+        self.outgoing = ssl.MemoryBIO ()
+        self.sslobj = context.wrap_bio (self.incoming, self.outgoing, bool (server_side), server_hostname,
+            **({} if session is None else {'session': session}))
+        self.handshaked = False
+
+        # Transmit is singleton as it is used both by readers and writers
+        self.transmit = Singleton (self.transmit_unsafe)
+        self.Handshake = Singleton (self.handshake_unsafe)
+
+    #--------------------------------------------------------------------------#
+    # Properties                                                               #
+    #--------------------------------------------------------------------------#
+    @property
+    def SSLObject (self):
+        """SSL object
+        """
+        return self.sslobj
+
+    @property
+    def Session (self):
+        """SSL session (python 3.6 or higher)
+        """
+        return getattr (self.sslobj, 'session', None)
+
+    #--------------------------------------------------------------------------#
+    # Handshake                                                                #
+    #--------------------------------------------------------------------------#
+    @Async
+    def handshake_unsafe (self, cancel = None):
+        """Handshake function used by singleton Handshake method
+        """
+        while not self.handshaked:
+            try:
+                self.sslobj.do_handshake ()
+                self.handshaked = True
+            except ssl.SSLWantReadError:
+                yield self.transmit (cancel)
+                yield self.base.Flush (cancel)
+                yield self.receive (cancel)
+
+        yield self.transmit (cancel)
+        yield self.base.Flush (cancel)
+        AsyncReturn (self)
+
+    #--------------------------------------------------------------------------#
+    # Read                                                                     #
+    #--------------------------------------------------------------------------#
+    @Async
+    def Read (self, size, cancel = None):
+        """Asynchronously read data
+        """
+        with self.reading:
+            if not self.handshaked:
+                yield self.Handshake (cancel)
+
+            while True:
+                try:
+                    data = self.sslobj.read (size)
+                    if size and not data:
+                        raise BrokenPipeError (errno.EPIPE, 'Broken pipe') # close notification
+                    if self.outgoing.pending:
+                        self.transmit () # post handshake messages
+                    AsyncReturn (data)
+                except ssl.SSLWantReadError:
+                    pass
+                except (ssl.SSLZeroReturnError, ssl.SSLEOFError):
+                    raise BrokenPipeError (errno.EPIPE, 'Broken pipe')
+                yield self.receive (cancel)
+
+    @Async
+    def ReadInto (self, buffer, cancel = None):
+        """Asynchronously read data into writable buffer
+        """
+        with self.reading:
+            if not self.handshaked:
+                yield self.Handshake (cancel)
+
+            while True:
+                try:
+                    size = self.sslobj.read (len (buffer), buffer)
+                    if not size and len (buffer):
+                        raise BrokenPipeError (errno.EPIPE, 'Broken pipe') # close notification
+                    if self.outgoing.pending:
+                        self.transmit () # post handshake messages
+                    AsyncReturn (size)
+                except ssl.SSLWantReadError:
+                    pass
+                except (ssl.SSLZeroReturnError, ssl.SSLEOFError):
+                    raise BrokenPipeError (errno.EPIPE, 'Broken pipe')
+                yield self.receive (cancel)
+
+    #--------------------------------------------------------------------------#
+    # Write                                                                    #
+    #--------------------------------------------------------------------------#
+    def Write (self, data, cancel = None):
+        """Asynchronously write data
+        """
+        return self.WriteVector ((data,), cancel)
+
+    @Async
+    def WriteVector (self, chunks, cancel = None):
+        """Asynchronously write list of data chunks
+
+        Each chunk is encrypted separately (without joining) and all resulting
+        records are written to base stream at once.
+        """
+        with self.writing:
+            if not self.handshaked:
+                yield self.Handshake (cancel)
+
+            size = 0
+            for chunk in chunks:
+                if len (chunk):
+                    size += self.sslobj.write (chunk)
+
+            yield self.transmit (cancel)
+            AsyncReturn (size)
+
+    #--------------------------------------------------------------------------#
+    # Flush                                                                    #
+    #--------------------------------------------------------------------------#
+    @Async
+    def Flush (self, cancel = None):
+        """Flush stream content
+        """
+        if self.base is None:
+            return # base stream was detached
+
+        with self.flushing:
+            yield self.transmit (cancel)
+            yield self.base.Flush (cancel)
+
+    #--------------------------------------------------------------------------#
+    # Dispose                                                                  #
+    #--------------------------------------------------------------------------#
+    @Async
+    def Dispose (self, cancel = None):
+        """Dispose stream
+
+        Sends SSL close notification if possible.
+        """
+        if self.Disposed:
+            return
+
+        if self.handshaked and self.base is not None and not self.base.Disposed:
+            try:
+                try:
+                    self.sslobj.unwrap ()
+                except ssl.SSLWantReadError: pass # peer notification is not awaited
+                yield self.transmit (cancel)
+                yield self.base.Flush (cancel)
+            except Exception: pass
+
+        yield WrappedStream.Dispose (self, cancel)
+
+    #--------------------------------------------------------------------------#
+    # Private                                                                  #
+    #--------------------------------------------------------------------------#
+    @Async
+    def transmit_unsafe (self, cancel = None):
+        """Write pending encrypted data to base stream
+        """
+        while self.outgoing.pending:
+            data = self.outgoing.read ()
+            while data:
+                data = data [(yield self.base.Write (data, cancel)):]
+
+    @Async
+    def receive (self, cancel = None):
+        """Read encrypted data from base stream
+        """
+        try:
+            self.incoming.write ((yield self.base.Read (self.receive_size, cancel)))
+        except BrokenPipeError:
+            if self.incoming.eof:
+                raise
+            self.incoming.write_eof ()
+
+# vim: nu ft=python columns=120 :
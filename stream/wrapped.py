@@ -58,6 +58,13 @@ class WrappedStream (Stream):
         with self.reading:
             AsyncReturn ((yield self.base.Read (size, cancel)))
 
+    @Async
+    def ReadInto (self, buffer, cancel = None):
+        """Asynchronously read data into writable buffer
+        """
+        with self.reading:
+            AsyncReturn ((yield self.base.ReadInto (buffer, cancel)))
+
     #--------------------------------------------------------------------------#
     # Write                                                                    #
     #--------------------------------------------------------------------------#
@@ -68,6 +75,13 @@ class WrappedStream (Stream):
         with self.writing:
             AsyncReturn ((yield self.base.Write (data, cancel)))
 
+    @Async
+    def WriteVector (self, chunks, cancel = None):
+        """Asynchronously write list of data chunks
+        """
+        with self.writing:
+            AsyncReturn ((yield self.base.WriteVector (chunks, cancel)))
+
     #--------------------------------------------------------------------------#
     # Flush                                                                    #
     #--------------------------------------------------------------------------#
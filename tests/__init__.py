@@ -2,8 +2,9 @@
 import functools
 
 from .. import Core, Async
+from ..stream.file import IOV_MAX
 
-__all__ = ('AsyncTest',)
+__all__ = ('AsyncTest', 'WriteVectorCheck',)
 #------------------------------------------------------------------------------#
 # Asynchronous Test                                                            #
 #------------------------------------------------------------------------------#
@@ -25,15 +26,44 @@ def AsyncTest (test):
 
     return test_async
 
+#------------------------------------------------------------------------------#
+# Write Vector Check                                                           #
+#------------------------------------------------------------------------------#
+@Async
+def WriteVectorCheck (test, writer, reader):
+    """Check that flush of ``writer`` is done with vectored writes
+
+    Writes more chunks than IOV_MAX and more data than underlying transport
+    can hold, and reads it back from ``reader``.
+    """
+    calls = []
+    write_vector = writer.Base.write_vector
+    def write_vector_hook (chunks, cancel = None):
+        calls.append (len (chunks))
+        return write_vector (chunks, cancel)
+    writer.Base.write_vector = write_vector_hook
+
+    chunks = [str (index).encode ().rjust (128, b'.') for index in range (IOV_MAX * 2 + 1)]
+    for chunk in chunks:
+        writer.WriteBuffer (chunk)
+    flush = writer.Flush ()
+    data = b''.join (chunks)
+    test.assertEqual ((yield reader.ReadUntilSize (len (data))), data)
+    yield flush
+
+    test.assertEqual (calls [0], IOV_MAX)
+    test.assertTrue (len (calls) > 3) # partial writes
+    test.assertTrue (all (count <= IOV_MAX for count in calls))
+
 #------------------------------------------------------------------------------#
 # Load Test Protocol                                                           #
 #------------------------------------------------------------------------------#
 def load_tests (loader, tests, pattern):
     from unittest import TestSuite
-    from . import future, pair, source, async, limit, file, buffered, event
+    from . import future, pair, source, async, limit, file, buffered, event, relay, sock, sock_ssl, ring, worker, fs, inotify
 
     suite = TestSuite ()
-    for test in (future, pair, source, async, limit, file, buffered, event):
+    for test in (future, pair, source, async, limit, file, buffered, event, relay, sock, sock_ssl, ring, worker, fs, inotify):
         suite.addTests (loader.loadTestsFromModule (test))
 
     return suite
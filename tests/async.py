@@ -2,8 +2,8 @@
 import sys
 import unittest
 
-from ..future import FutureSourcePair
-from ..async  import Async, AsyncReturn
+from ..future import FutureSourcePair, FutureCanceled
+from ..async  import Async, AsyncReturn, Task
 
 __all__ = ('AsyncTests',)
 #------------------------------------------------------------------------------#
@@ -89,4 +89,111 @@ class AsyncTests (unittest.TestCase):
         source.SetResult (1)
         self.assertEqual (result_future.Result (), limit * 2)
 
+    def test_task (self):
+        future, source = FutureSourcePair ()
+
+        @Async
+        def async ():
+            AsyncReturn ((yield future))
+
+        task = async ()
+        self.assertTrue (isinstance (task, Task))
+        self.assertEqual (task.Name, 'async')
+        self.assertTrue (task.Awaiter is future)
+        self.assertEqual ((task.Site, task.Runtime), (None, None))
+
+        source.SetResult ('result')
+        self.assertEqual (task.Awaiter, None)
+        self.assertEqual (task.Result (), 'result')
+        self.assertFalse (task.Cancel ())
+
+        # debug mode
+        future, source = FutureSourcePair ()
+        self.assertTrue (Task.Debug (True))
+        try:
+            task = async (); line = sys._getframe ().f_lineno
+        finally:
+            Task.Debug (False)
+        self.assertEqual (task.Site, (__file__.replace ('.pyc', '.py'), line))
+        self.assertTrue (task.Runtime >= 0)
+
+        source.SetResult ('result')
+        self.assertEqual (task.Runtime, task.Runtime)
+
+    def test_cancel (self):
+        p0, p1, p2 = (FutureSourcePair () for i in range (3))
+        context = []
+
+        @Async
+        def async ():
+            try:
+                yield p0 [0]
+            except FutureCanceled:
+                context.append ('canceled')
+            context.append ((yield p1 [0]))
+            yield p2 [0]
+
+        # suspended task is resumed once its awaiter is completed
+        task = async ()
+        self.assertTrue (task.Cancel ())
+        self.assertEqual (context, [])
+        self.assertTrue (task.Awaiter is p0 [0])
+
+        # result of the awaiter is ignored
+        p0 [1].SetResult (0)
+        self.assertEqual (context, ['canceled'])
+        p1 [1].SetResult (1)
+        self.assertEqual (context, ['canceled', 1])
+        self.assertTrue (task.Awaiter is p2 [0])
+
+        task.Cancel ()
+        p2 [1].SetResult (2)
+        with self.assertRaises (FutureCanceled):
+            task.Result ()
+        self.assertFalse (task.Cancel ())
+
+    def test_cancel_nested (self):
+        p0, p1 = (FutureSourcePair () for i in range (2))
+        context = []
+
+        @Async
+        def inner ():
+            try:
+                yield p0 [0]
+            finally:
+                yield p1 [0] # cleanup
+                context.append ('inner')
+
+        @Async
+        def outer ():
+            try:
+                yield inner ()
+            except FutureCanceled:
+                context.append ('outer')
+
+        # inner task is canceled, outer one is resumed once inner is finished
+        task = outer ()
+        self.assertTrue (task.Cancel ())
+        self.assertFalse (task.IsCompleted ())
+        self.assertEqual (context, [])
+        p0 [1].SetResult (0) # ignored
+        p1 [1].SetResult (1)
+        self.assertEqual (context, ['inner', 'outer'])
+        self.assertTrue (task.IsCompleted ())
+
+    def test_cancel_self (self):
+        p0, p1 = (FutureSourcePair () for i in range (2))
+        tasks = []
+
+        @Async
+        def async ():
+            yield p0 [0]
+            tasks [0].Cancel ()
+            yield p1 [0]
+
+        tasks.append (async ())
+        p0 [1].SetResult (0)
+        with self.assertRaises (FutureCanceled):
+            tasks [0].Result ()
+
 # vim: nu ft=python columns=120 :
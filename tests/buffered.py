@@ -1,6 +1,8 @@
 # -*- coding: utf-8 -*-
 import io
 import re
+import sys
+import array
 import errno
 import struct
 import unittest
@@ -8,12 +10,15 @@ import collections
 
 from ..async import Async, AsyncReturn
 from ..event import Event
+from ..future import SucceededFuture, FutureCanceled
 
-from ..core import BrokenPipeError
+from ..core import Core, BrokenPipeError
 from ..stream import Stream
-from ..stream.buffered import Buffer, BufferedStream
+from ..stream.buffered import Buffer, ArrayBuffer, BufferedStream, BufferOverflowError
+from ..stream.frame import FrameReader, FrameWriter
+from ..stream.pool import BufferPool
 
-__all__ = ('BufferTest', 'StreamTest',)
+__all__ = ('BufferTest', 'ArrayBufferTest', 'BufferPoolTest', 'StreamTest',)
 #------------------------------------------------------------------------------#
 # Buffer Test                                                                  #
 #------------------------------------------------------------------------------#
@@ -99,6 +104,158 @@ class BufferTest (unittest.TestCase):
         self.assertEqual (buff.offset, 0)
         self.assertEqual (tuple (buff.chunks), tuple ())
 
+    def testChunks (self):
+        buff = Buffer ()
+        for _ in range (3):
+            buff.Enqueue (b'0123456789')
+
+        self.assertEqual (buff.Chunks (5), [b'0123456789'])
+        self.assertEqual (buff.Chunks (15), [b'0123456789', b'0123456789'])
+        self.assertEqual (len (buff.Chunks ()), 3)
+
+        # with offset
+        buff.Dequeue (3)
+        self.assertEqual (buff.Chunks (7), [b'3456789'])
+        self.assertEqual (buff.Chunks (8), [b'3456789', b'0123456789'])
+        self.assertEqual (b''.join (buff.Chunks ()), buff.Slice ())
+
+    def testFind (self):
+        for buff in (Buffer (), ArrayBuffer ()):
+            for chunk in (b'01', b'2', b'3456', b'789;', b';01', b'23;'):
+                buff.Enqueue (chunk)
+            buff.Dequeue (1)
+            data = buff.Slice ()
+
+            for sub in (b'1', b'12', b'123456', b'9;', b';;', b';0', b';', b'x', data, data + b'x'):
+                for offset in range (len (data) + 1):
+                    self.assertEqual (buff.Find (sub, offset), data.find (sub, offset),
+                        '{} {!r} {}'.format (buff, sub, offset))
+
+    def testSearch (self):
+        regex = re.compile (br'(\d+);')
+        for buff in (Buffer (), ArrayBuffer ()):
+            for chunk in (b'01', b'2', b'3456', b'789;', b';01', b'23;'):
+                buff.Enqueue (chunk)
+            buff.Dequeue (1)
+
+            self.assertEqual (buff.Search (regex).group (0), b'123456789;')
+            self.assertEqual (buff.Search (regex, 5).group (0), b'6789;')
+            self.assertEqual (buff.Search (regex, 5).end (), 5)
+            self.assertEqual (buff.Search (regex, 10).group (0), b'0123;')
+            self.assertEqual (buff.Search (regex, 16), None)
+
+#------------------------------------------------------------------------------#
+# Array Buffer Test                                                            #
+#------------------------------------------------------------------------------#
+class ArrayBufferTest (unittest.TestCase):
+    """Array buffer unit tests
+    """
+
+    def test (self):
+        buff = ArrayBuffer ()
+
+        buff.Enqueue (b'01234')
+        buff.Enqueue (b'56789')
+        self.assertEqual (buff.Length (), 10)
+        self.assertEqual (buff.Slice (3), b'012')
+        self.assertEqual (buff.Slice (3, 8), b'89')
+        self.assertEqual (buff.View (4, 2).tobytes (), b'2345')
+
+        # dequeue
+        self.assertEqual (buff.Dequeue (4), b'0123')
+        self.assertEqual (buff.Dequeue (2, False), None)
+        self.assertEqual (buff.Slice (), b'6789')
+        self.assertEqual (b''.join (chunk.tobytes () for chunk in buff.Chunks ()), b'6789')
+
+        # reserve and commit
+        capacity = len (buff.data)
+        view = buff.Reserve (6)
+        view [:3] = b'abc'
+        buff.Commit (3)
+        self.assertEqual (len (buff.data), capacity)
+        self.assertEqual (buff.Slice (), b'6789abc')
+
+        # grow (exported views stay valid)
+        view = buff.View ()
+        buff.Enqueue (b'x' * 1024)
+        self.assertEqual (buff.Length (), 7 + 1024)
+        self.assertEqual (view.tobytes (), b'6789abc')
+
+        # dequeue all
+        self.assertEqual (buff.Dequeue (2048), b'6789abc' + b'x' * 1024)
+        self.assertEqual (buff.Length (), 0)
+        self.assertEqual ((buff.head, buff.tail), (0, 0))
+        self.assertFalse (buff)
+
+    def testSearch (self):
+        buff = ArrayBuffer ()
+        buff.Enqueue (b'0123;')
+        match = buff.Search (re.compile (br'\d+'))
+
+        # match does not refer to buffer memory
+        buff.Dequeue ()
+        buff.Enqueue (b'abcd;')
+        self.assertEqual (match.group (), b'0123')
+
+    def testPool (self):
+        pool = BufferPool (1 << 14, 1 << 10)
+        buff = ArrayBuffer (pool)
+
+        buff.Enqueue (b'0123')
+        self.assertEqual (len (buff.data), 1 << 10)
+        buff.Enqueue (b'x' * 1024)
+        self.assertEqual (len (buff.data), 1 << 11)
+        self.assertEqual (pool.Retained, 1 << 10)
+
+        # drained buffer returns its memory
+        self.assertEqual (buff.Dequeue (), b'0123' + b'x' * 1024)
+        self.assertEqual (len (buff.data), 0)
+        self.assertEqual (pool.Retained, 3 << 10)
+
+        # reuse
+        buff.Enqueue (b'0123')
+        self.assertEqual (pool.Retained, 2 << 10)
+        self.assertEqual (buff.Dequeue (), b'0123')
+
+        # match outlives its slab, which is reused by another buffer
+        buff.Enqueue (b'0123;')
+        match = buff.Search (re.compile (br'\d+'))
+        slab = buff.data
+        buff.Dequeue ()
+        other = ArrayBuffer (pool)
+        other.Enqueue (b'abcd;')
+        self.assertTrue (other.data is slab)
+        self.assertEqual (match.group (), b'0123')
+
+#------------------------------------------------------------------------------#
+# Buffer Pool Test                                                             #
+#------------------------------------------------------------------------------#
+class BufferPoolTest (unittest.TestCase):
+    """Buffer pool unit tests
+    """
+
+    def test (self):
+        pool = BufferPool (1 << 12, 1 << 10, 1 << 12)
+
+        # size classes
+        slabs = [pool.Acquire (size) for size in (1, 1024, 1025, 4096)]
+        self.assertEqual ([len (slab) for slab in slabs], [1024, 1024, 2048, 4096])
+        self.assertEqual (len (pool.Acquire (4097)), 4097)
+        self.assertFalse (pool.Release (bytearray (4097)))
+        self.assertFalse (pool.Release (bytearray (1000)))
+
+        # retain limit
+        self.assertEqual ([pool.Release (slab) for slab in slabs], [True, True, True, False])
+        self.assertEqual (pool.Retained, 4096)
+
+        # reuse
+        slab = slabs [2]
+        self.assertTrue (pool.Acquire (1500) is slab)
+        self.assertEqual (pool.Retained, 2048)
+
+        pool.Clear ()
+        self.assertEqual (pool.Retained, 0)
+
 #------------------------------------------------------------------------------#
 # Stream Test                                                                  #
 #------------------------------------------------------------------------------#
@@ -170,6 +327,31 @@ class StreamTest (unittest.TestCase):
         self.assertEqual (stream.ReadComplete (b'234;'), 4)
         self.assertEqual (read.Result (), b'01234;')
 
+    def testReadLines (self):
+        stream = BufferedStream (TestStream (), 1024)
+
+        lines = stream.ReadLines ()
+        self.assertFalse (lines.IsCompleted ())
+        stream.ReadComplete (b'zero\none\ntwo\nthree\nfo')
+        self.assertEqual (lines.Result (), [b'zero\n', b'one\n', b'two\n', b'three\n'])
+
+        lines = stream.ReadLines ()
+        stream.ReadComplete (b'ur\nfive;\nsix;\nseven;\n')
+        self.assertEqual (lines.Result (), [b'four\n', b'five;\n', b'six;\n', b'seven;\n'])
+
+        lines = stream.ReadLines (1, b';')
+        stream.ReadComplete (b'one;two;three;four')
+        self.assertEqual (lines.Result (), [b'one;'])
+
+        # buffered
+        self.assertEqual (stream.ReadLines (1, b';').Result (), [b'two;'])
+        self.assertEqual (stream.ReadLines (2, b';').Result (), [b'three;'])
+
+        lines = stream.ReadLines (2, b';')
+        stream.ReadComplete (b';five')
+        self.assertEqual (lines.Result (), [b'four;'])
+        self.assertEqual (stream.Read (4).Result (), b'five')
+
     def testReadUntilRegex (self):
         stream = BufferedStream (TestStream (), 1024)
         regex  = re.compile (br'([^=]+)=([^&]+)&')
@@ -188,6 +370,95 @@ class StreamTest (unittest.TestCase):
         read = stream.Read (4)
         self.assertEqual (read.Result (), b'tail')
 
+    def testReadUntilSubMaxSize (self):
+        stream = BufferedStream (TestStream (), 4)
+
+        read = stream.ReadUntilSub (b';', max_size = 6)
+        self.assertEqual (stream.ReadComplete (b'0123'), 4)
+        self.assertEqual (stream.ReadComplete (b'4;'), 2)
+        self.assertEqual (read.Result (), b'01234;')
+
+        read = stream.ReadUntilSub (b';', max_size = 6)
+        self.assertEqual (stream.ReadComplete (b'0123'), 4)
+        self.assertEqual (stream.ReadComplete (b'45;'), 3)
+        with self.assertRaises (BufferOverflowError):
+            read.Result ()
+
+        read = stream.ReadUntilSub (b';', max_size = 8)
+        self.assertEqual (read.Result (), b'012345;')
+
+        read = stream.ReadUntilSub (b';', max_size = 6)
+        self.assertEqual (stream.ReadComplete (b'0123'), 4)
+        self.assertEqual (stream.ReadComplete (b'4567'), 4)
+        with self.assertRaises (BufferOverflowError):
+            read.Result ()
+
+        # buffer of exactly max_size bytes without substring
+        self.assertEqual (stream.Read (2).Result (), b'01')
+        read = stream.ReadUntilSub (b';', max_size = 6)
+        with self.assertRaises (BufferOverflowError):
+            read.Result ()
+
+    def testReadUntilRegexOverlap (self):
+        stream = BufferedStream (TestStream (), 1024)
+        regex  = re.compile (br'([^=&]+)=([^&]+)&')
+
+        read = stream.ReadUntilRegex (regex, overlap = 16)
+        stream.ReadComplete (b'a' * 32)
+        stream.ReadComplete (b'&key=val')
+        self.assertFalse (read.IsCompleted ())
+        stream.ReadComplete (b'ue&tail')
+        data, match = read.Result ()
+        self.assertEqual (data, b'a' * 32 + b'&key=value&')
+        self.assertEqual (match.group (1), b'key')
+        self.assertEqual (match.span (), (33, 43))
+
+        read = stream.ReadUntilRegex (regex, max_size = 8)
+        stream.ReadComplete (b'=value&')
+        with self.assertRaises (BufferOverflowError):
+            read.Result ()
+
+    def testReadLimit (self):
+        stream = BufferedStream (TestStream (), 16)
+        self.assertEqual (stream.ReadLimit (), 0)
+        self.assertEqual (stream.ReadLimit (8), 8)
+
+        # buffer never grows beyond limit
+        read = stream.ReadUntilSize (8)
+        self.assertEqual (stream.ReadComplete (b'0123456789'), 8)
+        self.assertEqual (read.Result (), b'01234567')
+
+        # delimited read
+        read = stream.ReadUntilSub (b';')
+        stream.ReadComplete (b'0123')
+        self.assertEqual (stream.ReadComplete (b'456789'), 4)
+        with self.assertRaises (BufferOverflowError):
+            read.Result ()
+
+        stream.ReadLimit (0)
+        read = stream.ReadUntilSub (b';')
+        stream.ReadComplete (b'89;')
+        self.assertEqual (read.Result (), b'0123456789;')
+
+        # read until eof
+        stream.ReadLimit (4)
+        read = stream.ReadUntilEof ()
+        stream.ReadComplete (b'0123')
+        with self.assertRaises (BufferOverflowError):
+            read.Result ()
+
+    def testReadArrayBuffer (self):
+        stream = BufferedStream (TestStream (), 8, ArrayBuffer)
+
+        read = stream.ReadUntilSub (b';')
+        self.assertEqual (stream.ReadComplete (b'01234'), 5)
+        self.assertEqual (stream.ReadComplete (b'56789;01'), 8)
+        self.assertEqual (read.Result (), b'0123456789;')
+
+        read = stream.ReadUntilSize (4)
+        self.assertEqual (stream.ReadComplete (b'23'), 2)
+        self.assertEqual (read.Result (), b'0123')
+
     #--------------------------------------------------------------------------#
     # Write                                                                    #
     #--------------------------------------------------------------------------#
@@ -209,6 +480,73 @@ class StreamTest (unittest.TestCase):
     #--------------------------------------------------------------------------#
     # Serialize                                                                #
     #--------------------------------------------------------------------------#
+    def testWatermarks (self):
+        stream = BufferedStream (TestStream (), 16)
+        self.assertEqual (stream.WriteWatermarks (), (32, 16))
+        self.assertEqual (stream.WriteWatermarks (8), (8, 4))
+        with self.assertRaises (ValueError):
+            stream.WriteWatermarks (8, 9)
+
+        writable = stream.OnWritable.Await ()
+        stream.WriteBuffer (b'0123')
+        stream.WriteBuffer (b'4567')
+        self.assertFalse (stream.Flushing)
+        stream.WriteBuffer (b'89ab')
+        self.assertTrue (stream.Flushing)
+
+        # backpressure
+        write = stream.Write (b'c')
+        drain = stream.Drain ()
+        self.assertFalse (write.IsCompleted ())
+        stream.WriteComplete (6)
+        self.assertFalse (drain.IsCompleted ())
+        stream.WriteComplete (3)
+        self.assertTrue (writable.IsCompleted ())
+        self.assertTrue (drain.IsCompleted ())
+        self.assertEqual (write.Result (), 1)
+
+        stream.WriteComplete (16)
+        self.assertFalse (stream.Flushing)
+        self.assertEqual (stream.Written, b'0123456789abc')
+        self.assertTrue (stream.Drain ().IsCompleted ())
+
+        # canceled drain unregisters its handler
+        stream.WriteBuffer (b'x' * 16)
+        with self.assertRaises (FutureCanceled):
+            stream.Drain (SucceededFuture (None)).Result ()
+        self.assertEqual (stream.OnWritable.handlers, [])
+
+    def testAutoFlush (self):
+        with Core () as core:
+            stream = BufferedStream (TestStream (), 1024)
+            stream.AutoFlush (True, core = core)
+            self.assertTrue (stream.AutoFlush ())
+
+            iterator = core.Iterator (False)
+            next (iterator)
+            stream.Write (b'01234')
+            stream.WriteBuffer (b'56789')
+            stream.Write (b'-' * 1024)
+            self.assertFalse (stream.Flushing)
+
+            # end of iteration
+            next (iterator)
+            self.assertTrue (stream.Flushing)
+            stream.WriteComplete (2048)
+            self.assertFalse (stream.Flushing)
+            self.assertEqual (stream.Written, b'0123456789' + b'-' * 1024)
+
+            # disabled
+            stream.AutoFlush (False)
+            stream.WriteBuffer (b'data')
+            next (iterator)
+            self.assertFalse (stream.Flushing)
+
+            # only sockets can be corked
+            with self.assertRaises (ValueError):
+                stream.AutoFlush (True, cork = True, core = core)
+            self.assertFalse (stream.AutoFlush ())
+
     def testBytes (self):
         stream = BufferedStream (TestStream (), 1024)
 
@@ -250,12 +588,65 @@ class StreamTest (unittest.TestCase):
         stream.ReadComplete (stream.Written)
         self.assertEqual (struct_future.Result (), struct_list)
 
+    def testStructListBulk (self):
+        stream = BufferedStream (TestStream (), 1024)
+
+        for struct_type, struct_list in ((struct.Struct ('>d'), [0.5, -1.0, 2.25]),
+                                         (struct.Struct ('<q'), list (range (-10, 10))),
+                                         (struct.Struct ('2s'), [b'ab', b'cd'])):
+            stream.StructListWriteBuffer (struct_list, struct_type)
+        stream.StructListWriteBuffer ([(1,), (2,)], struct.Struct ('>I'), True)
+        stream.Flush ()
+        stream.WriteComplete (1024)
+        struct_future = stream.StructListRead (struct.Struct ('>d'))
+        stream.ReadComplete (stream.Written)
+
+        self.assertEqual (struct_future.Result (), [0.5, -1.0, 2.25])
+        self.assertEqual (stream.StructListRead (struct.Struct ('<q')).Result (), list (range (-10, 10)))
+        self.assertEqual (stream.StructListRead (struct.Struct ('2s')).Result (), [b'ab', b'cd'])
+        self.assertEqual (stream.StructListRead (struct.Struct ('>I'), True).Result (), [(1,), (2,)])
+
+    def testArray (self):
+        stream = BufferedStream (TestStream (), 1024)
+
+        arrays = [array.array (typecode, range (16)) for typecode in 'bBhHiIlLfd']
+        for array_target in arrays:
+            stream.ArrayWriteBuffer (array_target)
+        stream.Flush ()
+        stream.WriteComplete (1024)
+
+        read = stream.ArrayRead ()
+        stream.ReadComplete (stream.Written)
+        for array_target in arrays:
+            array_result = read.Result () if read else stream.ArrayRead ().Result ()
+            read = None
+            self.assertEqual (array_result.itemsize, array_target.itemsize)
+            self.assertEqual (array_result, array_target)
+
+        # byte order
+        stream = BufferedStream (TestStream (), 1024)
+        array_target = array.array ('i', [1, 2, 3])
+        array_swapped = array.array ('i', array_target)
+        array_swapped.byteswap ()
+        data = array_swapped.tobytes () if hasattr (array_swapped, 'tobytes') else array_swapped.tostring ()
+        stream.BytesWriteBuffer ('{}i{}'.format ('>' if sys.byteorder == 'little' else '<',
+            array_target.itemsize).encode ())
+        stream.StructListWriteBuffer ([3], struct.Struct ('>Q'))
+        stream.BytesWriteBuffer (data)
+        stream.Flush ()
+        stream.WriteComplete (1024)
+
+        read = stream.ArrayRead ()
+        stream.ReadComplete (stream.Written)
+        self.assertEqual (read.Result (), array_target)
+
     def testBytesList (self):
         stream = BufferedStream (TestStream (), 1024)
 
         bytes_list = [b'one', b'two', b'three', b'four', b'five']
 
         stream.BytesListWriteBuffer (bytes_list)
+        self.assertEqual (list (stream.write_buffer.chunks) [-len (bytes_list):], bytes_list) # items are not copied
         stream.Flush ()
         stream.WriteComplete (1024)
 
@@ -263,6 +654,70 @@ class StreamTest (unittest.TestCase):
         stream.ReadComplete (stream.Written)
         self.assertEqual (bytes_list_future.Result (), bytes_list)
 
+        # views
+        offset = len (stream.Written)
+        stream.BytesListWriteBuffer (bytes_list + [b''])
+        stream.BytesListWriteBuffer ([])
+        stream.Flush ()
+        stream.WriteComplete (1024)
+
+        bytes_list_future = stream.BytesListRead (view = True)
+        stream.ReadComplete (stream.Written [offset:])
+        self.assertTrue (all (isinstance (bytes, memoryview) for bytes in bytes_list_future.Result ()))
+        self.assertEqual ([bytes.tobytes () for bytes in bytes_list_future.Result ()], bytes_list + [b''])
+        self.assertEqual (stream.BytesListRead ().Result (), [])
+
+    def testFrames (self):
+        for header in (1, 2, 4, 8):
+            stream = BufferedStream (TestStream (), 1024)
+            reader = FrameReader (stream, header, 16)
+            writer = FrameWriter (stream, header, 16)
+
+            frames = [b'zero', b'', b'two', b'three']
+            writer.WriteBatchBuffer (frames)
+            writer.WriteBuffer (b'four')
+            with self.assertRaises (BufferOverflowError):
+                writer.WriteBuffer (b'x' * 17)
+            writer.Flush ()
+            stream.WriteComplete (1024)
+            data = stream.Written
+
+            # single frame
+            read = reader.Read ()
+            self.assertFalse (read.IsCompleted ())
+            stream.ReadComplete (data [:header + 2])
+            self.assertFalse (read.IsCompleted ())
+            stream.ReadComplete (data [header + 2:-2])
+            self.assertEqual (read.Result (), b'zero')
+
+            # batch
+            self.assertEqual (reader.ReadBatch (2).Result (), [b'', b'two'])
+            self.assertEqual (reader.ReadBatch ().Result (), [b'three'])
+            read = reader.ReadBatch ()
+            self.assertFalse (read.IsCompleted ())
+            stream.ReadComplete (data [-2:])
+            self.assertEqual (read.Result (), [b'four'])
+
+            # empty single frame
+            writer.WriteBatchBuffer ([b'', b'abc'])
+            writer.Flush ()
+            stream.WriteComplete (1024)
+            read = reader.Read ()
+            stream.ReadComplete (stream.Written [len (data):])
+            self.assertEqual (read.Result (), b'')
+            self.assertEqual (reader.Read ().Result (), b'abc')
+            data = stream.Written
+
+            # compatible with bytes
+            stream.BytesWriteBuffer (b'x' * 17)
+            stream.Flush ()
+            stream.WriteComplete (1024)
+            read = FrameReader (stream, None, 16).Read ()
+            stream.ReadComplete (stream.Written [len (data):])
+            with self.assertRaises (BufferOverflowError):
+                read.Result ()
+            self.assertEqual (FrameReader (stream).Read ().Result (), b'x' * 17)
+
 #------------------------------------------------------------------------------#
 # Test Stream                                                                  #
 #------------------------------------------------------------------------------#
@@ -1,10 +1,18 @@
 # -*- coding: utf-8 -*-
 import os
+import socket
+import struct
+import tempfile
 import unittest
+import threading
 
-from ..stream.file import BlockingFD, CloseOnExecFD
+from . import AsyncTest, WriteVectorCheck
+from ..core import BrokenPipeError, WorkerPool
+from ..future import FutureCanceled
+from ..stream import BufferedFile, DiskFile, BufferedDiskFile, BufferedFileFD, BufferedStream, MappedFile
+from ..stream.file import BlockingFD, CloseOnExecFD, writev
 
-__all__ = ('FileOptionsTest',)
+__all__ = ('FileOptionsTest', 'FileTest', 'DiskFileTest', 'MappedFileTest',)
 #------------------------------------------------------------------------------#
 # File Options Test                                                            #
 #------------------------------------------------------------------------------#
@@ -32,4 +40,202 @@ class FileOptionsTest (unittest.TestCase):
             os.close (r)
             os.close (w)
 
+#------------------------------------------------------------------------------#
+# File Test                                                                    #
+#------------------------------------------------------------------------------#
+class FileTest (unittest.TestCase):
+    """File unit tests
+    """
+
+    @AsyncTest
+    def testCancelRead (self):
+        r, w = os.pipe ()
+        reader = BufferedFile (r)
+        try:
+            # canceled read finishes once pending base read is finished
+            read = reader.Read (4)
+            self.assertTrue (read.Cancel ())
+            self.assertFalse (read.IsCompleted ())
+            os.write (w, b'data')
+            with self.assertRaises (FutureCanceled):
+                yield read
+
+            # data is kept in the read buffer
+            self.assertEqual ((yield reader.Read (4)), b'data')
+
+        finally:
+            reader.Dispose ()
+            os.close (w)
+
+    @unittest.skipIf (writev is None, 'writev is not supported')
+    @AsyncTest
+    def testWriteVector (self):
+        r, w = os.pipe ()
+        reader, writer = BufferedFile (r), BufferedFile (w, 1 << 20)
+        try:
+            # flush is done with writev
+            yield WriteVectorCheck (self, writer, reader)
+
+        finally:
+            reader.Dispose ()
+            writer.Dispose ()
+
+#------------------------------------------------------------------------------#
+# Disk File Test                                                               #
+#------------------------------------------------------------------------------#
+class DiskFileTest (unittest.TestCase):
+    """Disk file unit tests
+    """
+
+    @AsyncTest
+    def testReadWrite (self):
+        data = b''.join (str (index).encode () for index in range (1 << 15))
+        with tempfile.TemporaryFile () as file:
+            stream = BufferedFileFD (os.dup (file.fileno ()))
+            self.assertTrue (isinstance (stream, BufferedDiskFile))
+            try:
+                yield stream.Write (data)
+                yield stream.Flush ()
+                self.assertEqual (stream.Base.Position (), len (data))
+
+                # sequential read with read ahead
+                stream.Base.Position (0)
+                stream.Base.readahead_size = 1000
+                self.assertEqual ((yield stream.ReadUntilSize (len (data))), data)
+                with self.assertRaises (BrokenPipeError):
+                    yield stream.Read (1)
+
+                # positional
+                self.assertEqual ((yield stream.Base.WriteAt (b'head', 0)), 4)
+                self.assertEqual ((yield stream.Base.ReadAt (8, 0)), b'head' + data [4:8])
+                self.assertEqual ((yield stream.Base.ReadAt (8, len (data))), b'')
+                yield stream.Base.Sync ()
+
+            finally:
+                stream.Dispose ()
+
+    @AsyncTest
+    def testDispose (self):
+        with tempfile.TemporaryFile () as file, WorkerPool (1) as pool:
+            file.write (b'content')
+            file.flush ()
+
+            fd = os.dup (file.fileno ())
+            stream = DiskFile (fd, pool = pool)
+
+            # queue jobs behind blocked worker
+            event = threading.Event ()
+            blocked = pool.Submit (event.wait)
+            read = stream.ReadAt (7, 0)
+            write = stream.WriteAt (b'C', 0)
+
+            # descriptor is closed only once jobs are finished
+            dispose = stream.Dispose ()
+            self.assertFalse (dispose.IsCompleted ())
+            os.fstat (fd)
+
+            event.set ()
+            yield blocked
+            self.assertEqual ((yield dispose), fd)
+            self.assertEqual ((yield read), b'content')
+            self.assertEqual ((yield write), 1)
+            with self.assertRaises (OSError):
+                os.fstat (fd)
+
+    @AsyncTest
+    def testReadWriteAhead (self):
+        with tempfile.TemporaryFile () as file, WorkerPool (1) as pool:
+            file.write (b'content')
+            file.flush ()
+            file.seek (0)
+
+            stream = DiskFile (os.dup (file.fileno ()), pool = pool)
+            try:
+                # write drops prefetched block while read waits for it
+                read = stream.Read (7)
+                write = stream.WriteAt (b'C', 0)
+                self.assertEqual ((yield read), b'Content')
+                self.assertEqual ((yield write), 1)
+            finally:
+                yield stream.Dispose ()
+
+    @AsyncTest
+    def testFactory (self):
+        sock, peer = socket.socketpair ()
+        stream = BufferedFileFD (sock.fileno (), closefd = False)
+        try:
+            self.assertTrue (isinstance (stream, BufferedFile))
+        finally:
+            yield stream.Dispose ()
+            sock.close ()
+            peer.close ()
+
+#------------------------------------------------------------------------------#
+# Mapped File Test                                                             #
+#------------------------------------------------------------------------------#
+class MappedFileTest (unittest.TestCase):
+    """Mapped file unit tests
+    """
+
+    @AsyncTest
+    def testRead (self):
+        with tempfile.TemporaryFile () as file:
+            # prepare content with the same layout as buffered stream would write
+            stream = BufferedStream (None)
+            stream.WriteBuffer (b'line one\nline two\n')
+            stream.StructListWriteBuffer (list (range (10)), struct.Struct ('>I'))
+            stream.WriteBuffer (b'tail')
+            content = stream.write_buffer.Slice ()
+            file.write (content)
+            file.flush ()
+
+            mapped = MappedFile (file)
+            try:
+                self.assertEqual (mapped.Size, len (content))
+                self.assertEqual ((yield mapped.ReadUntilSub (b'\n')), b'line one\n')
+                self.assertEqual ((yield mapped.ReadLines (1)), [b'line two\n'])
+                self.assertEqual ((yield mapped.StructListRead (struct.Struct ('>I'))), list (range (10)))
+                self.assertEqual (bytes (mapped.View (2)), b'ta')
+                self.assertEqual (bytes (mapped [0:4]), b'line')
+
+                # end of file
+                with self.assertRaises (BrokenPipeError):
+                    yield mapped.ReadUntilSub (b'\n')
+                self.assertEqual ((yield mapped.ReadUntilSize (4)), b'tail')
+                with self.assertRaises (BrokenPipeError):
+                    yield mapped.Read (1)
+
+                mapped.Position (5)
+                self.assertEqual ((yield mapped.Read (3)), b'one')
+
+                mapped.Advise (MappedFile.MADV_SEQUENTIAL)
+                mapped.Advise (MappedFile.MADV_WILLNEED, 16, 10)
+                with self.assertRaises (ValueError):
+                    mapped.WriteAt (b'data', 0)
+
+            finally:
+                yield mapped.Dispose ()
+
+    @AsyncTest
+    def testWrite (self):
+        with tempfile.TemporaryFile () as file:
+            file.write (b'0123456789')
+            file.flush ()
+
+            mapped = MappedFile (file.fileno (), True)
+            try:
+                self.assertEqual (mapped.WriteAt (b'abc', 2), 3)
+                mapped.Sync ()
+                with self.assertRaises (ValueError):
+                    mapped.WriteAt (b'abc', 8)
+                mapped.Advise (MappedFile.MADV_RANDOM, 4, 2)
+                with self.assertRaises (OSError):
+                    mapped.Advise (-1)
+                self.assertEqual ((yield mapped.ReadUntilEof ()), b'01abc56789')
+            finally:
+                yield mapped.Dispose ()
+
+            file.seek (0)
+            self.assertEqual (file.read (), b'01abc56789')
+
 # vim: nu ft=python columns=120 :
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import tempfile
+import unittest
+
+from . import AsyncTest
+from ..fs import Stat, StatBatch, ListDir, ScanDir, Open, Rename, Unlink, FSync
+from ..stream import BufferedDiskFile
+
+__all__ = ('FileSystemTest',)
+#------------------------------------------------------------------------------#
+# File System Test                                                             #
+#------------------------------------------------------------------------------#
+class FileSystemTest (unittest.TestCase):
+    """File system operations unit tests
+    """
+
+    def setUp (self):
+        self.path = tempfile.mkdtemp ()
+
+    def tearDown (self):
+        shutil.rmtree (self.path)
+
+    @AsyncTest
+    def testFileSystem (self):
+        path = lambda name: os.path.join (self.path, name)
+
+        # open and write
+        stream = yield Open (path ('a'), os.O_WRONLY | os.O_CREAT)
+        self.assertTrue (isinstance (stream, BufferedDiskFile))
+        try:
+            yield stream.Write (b'content')
+            yield stream.Flush ()
+            yield FSync (stream.Base.Fd)
+        finally:
+            yield stream.Dispose ()
+
+        # stat
+        self.assertEqual ((yield Stat (path ('a'))).st_size, 7)
+        with self.assertRaises (OSError):
+            yield Stat (path ('b'))
+        stats = yield StatBatch ([path ('a'), path ('b')] * 10, chunk_size = 3)
+        self.assertEqual ([stat and stat.st_size for stat in stats], [7, None] * 10)
+
+        # directory
+        yield Rename (path ('a'), path ('b'))
+        self.assertEqual ((yield ListDir (self.path)), ['b'])
+        if hasattr (os, 'scandir'):
+            self.assertEqual ([entry.name for entry in (yield ScanDir (self.path))], ['b'])
+
+        # read
+        stream = yield Open (path ('b'))
+        try:
+            self.assertEqual ((yield stream.ReadUntilEof ()), b'content')
+        finally:
+            yield stream.Dispose ()
+
+        yield Unlink (path ('b'))
+        self.assertEqual ((yield ListDir (self.path)), [])
+
+# vim: nu ft=python columns=120 :
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+from . import AsyncTest
+from ..stream import Watcher
+
+__all__ = ('WatcherTest',)
+#------------------------------------------------------------------------------#
+# Watcher Test                                                                 #
+#------------------------------------------------------------------------------#
+@unittest.skipIf (not sys.platform.startswith ('linux'), 'inotify is not supported')
+class WatcherTest (unittest.TestCase):
+    """File system watcher unit tests
+    """
+
+    def setUp (self):
+        self.path = tempfile.mkdtemp ()
+
+    def tearDown (self):
+        shutil.rmtree (self.path)
+
+    @AsyncTest
+    def testEvents (self):
+        watcher = Watcher ()
+        try:
+            watcher.Add (self.path)
+            self.assertEqual (watcher.Paths, [self.path])
+
+            # events of the same file are coalesced
+            with open (os.path.join (self.path, 'file'), 'wb') as file:
+                for _ in range (10):
+                    file.write (b'data')
+                    file.flush ()
+            events = yield watcher.Events ()
+            self.assertEqual ([(event.path, event.name) for event in events], [(self.path, 'file')])
+            self.assertTrue (events [0].mask & Watcher.IN_CREATE)
+            self.assertTrue (events [0].mask & Watcher.IN_MODIFY)
+            self.assertTrue (events [0].mask & Watcher.IN_CLOSE_WRITE)
+
+            # burst of events
+            os.mkdir (os.path.join (self.path, 'dir'))
+            events = yield watcher.Events (0.01)
+            self.assertEqual ([event.name for event in events], ['dir'])
+            self.assertTrue (events [0].mask & Watcher.IN_ISDIR)
+
+            # explicitly removed watch is not reported
+            path = os.path.join (self.path, 'dir')
+            watcher.Add (path)
+            watcher.Remove (self.path)
+            self.assertEqual (watcher.Paths, [path])
+            events_future = watcher.Events ()
+            self.assertFalse (events_future.IsCompleted ())
+
+            # watch removed by kernel is reported with ignored event
+            os.rmdir (path)
+            events = yield events_future
+            self.assertEqual ([(event.path, event.name) for event in events], [(path, '')])
+            self.assertTrue (events [0].mask & Watcher.IN_DELETE_SELF)
+            self.assertTrue (events [0].mask & Watcher.IN_IGNORED)
+            self.assertEqual (watcher.Paths, [])
+
+        finally:
+            watcher.Dispose ()
+
+    def testEventsParse (self):
+        watcher = Watcher ()
+        try:
+            wd = watcher.Add (self.path)
+            data = b''.join ((
+                watcher.event_struct.pack (wd, Watcher.IN_CREATE, 0, 8) + b'file\x00\x00\x00\x00',
+                watcher.event_struct.pack (wd + 1, Watcher.IN_MODIFY, 0, 0), # unknown watch
+                watcher.event_struct.pack (-1, Watcher.IN_Q_OVERFLOW, 0, 0)))
+            events = watcher.events_parse (data)
+            self.assertEqual ([(event.path, event.name, event.mask) for event in events],
+                [(self.path, 'file', Watcher.IN_CREATE), (None, '', Watcher.IN_Q_OVERFLOW)])
+
+        finally:
+            watcher.Dispose ()
+
+# vim: nu ft=python columns=120 :
@@ -1,7 +1,8 @@
 # -*- coding: utf-8 -*-
 import unittest
 
-from ..future import FutureSourcePair
+from ..future import FutureSourcePair, Promise, FutureCanceled
+from ..future.pair import SourceReceiver, SourceSender
 from ..future.compat import Raise
 
 #------------------------------------------------------------------------------#
@@ -68,4 +69,47 @@ class FutureSourcePairTest (unittest.TestCase):
         self.assertEqual (results, [(None, future.Error ())])
         self.assertEqual (future_with.Result (), 'done')
 
+#------------------------------------------------------------------------------#
+# Promise Tests                                                                #
+#------------------------------------------------------------------------------#
+class PromiseTest (unittest.TestCase):
+    def test_continuations (self):
+        results = []
+        promise = Promise ()
+        self.assertEqual (promise.conts, None)
+
+        # single continuation is stored without list
+        promise.Then (lambda r, e: results.append ((1, r)))
+        self.assertFalse (isinstance (promise.conts, list))
+        promise.Then (lambda r, e: results.append ((2, r)))
+        promise.Then (lambda r, e: results.append ((3, r)))
+
+        self.assertTrue (promise.TrySetResult ('result'))
+        self.assertFalse (promise.TrySetResult ('other'))
+        with self.assertRaises (ValueError):
+            promise.SetResult ('other')
+
+        self.assertEqual (results, [(1, 'result'), (2, 'result'), (3, 'result')])
+        self.assertEqual (promise.conts, None)
+        self.assertEqual (promise.Result (), 'result')
+
+    def test_dispose (self):
+        with Promise () as promise:
+            pass
+        with self.assertRaises (FutureCanceled):
+            promise.Result ()
+
+    def test_views (self):
+        promise = Promise ()
+        future, source = SourceReceiver (promise), SourceSender (promise)
+        self.assertFalse (future.IsCompleted ())
+
+        source.SetException (RuntimeError ())
+        self.assertTrue (future.IsCompleted ())
+        self.assertFalse (source.TrySetResult (None))
+        with self.assertRaises (RuntimeError):
+            future.Result ()
+        with self.assertRaises (RuntimeError):
+            source.Await ().Result ()
+
 # vim: nu ft=python columns=120 :
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+import socket
+import unittest
+
+from . import AsyncTest
+from ..core import BrokenPipeError
+from ..stream import BufferedSocket, Relay, RelayPair
+from ..stream.relay import relay_splice, splice_supported
+
+__all__ = ('RelayTest',)
+#------------------------------------------------------------------------------#
+# Relay Test                                                                   #
+#------------------------------------------------------------------------------#
+class RelayTest (unittest.TestCase):
+    """Relay unit tests
+    """
+
+    @AsyncTest
+    def testRelay (self):
+        client, proxy_in = (BufferedSocket (sock) for sock in socket.socketpair ())
+        proxy_out, server = (BufferedSocket (sock) for sock in socket.socketpair ())
+        try:
+            yield client.Write (b'buffered')
+            yield client.Flush ()
+            self.assertEqual ((yield proxy_in.ReadUntilSize (4)), b'buff')
+
+            relay = Relay (proxy_in, proxy_out)
+            yield client.Write (b' data' * 1024)
+            yield client.Flush ()
+            client.Shutdown (socket.SHUT_WR)
+
+            self.assertEqual ((yield server.ReadUntilEof ()), b'ered' + b' data' * 1024)
+            self.assertEqual ((yield relay), 4 + 5 * 1024)
+
+        finally:
+            for sock in (client, proxy_in, proxy_out, server):
+                sock.Dispose ()
+
+    @unittest.skipIf (not splice_supported (), 'splice is not supported')
+    @AsyncTest
+    def testSplice (self):
+        client, proxy_in = (BufferedSocket (sock) for sock in socket.socketpair ())
+        proxy_out, server = (BufferedSocket (sock) for sock in socket.socketpair ())
+        try:
+            data = b''.join (str (index).encode () for index in range (1 << 16))
+            relay = relay_splice (proxy_in.Base, proxy_out.Base, 1 << 12)
+            client.Write (data)
+            yield client.Flush ()
+            client.Shutdown (socket.SHUT_WR)
+
+            self.assertEqual ((yield server.ReadUntilSize (len (data))), data)
+            self.assertEqual ((yield relay), len (data))
+
+        finally:
+            for sock in (client, proxy_in, proxy_out, server):
+                sock.Dispose ()
+
+    @AsyncTest
+    def testRelayPair (self):
+        client, proxy_in = (BufferedSocket (sock) for sock in socket.socketpair ())
+        proxy_out, server = (BufferedSocket (sock) for sock in socket.socketpair ())
+        try:
+            relay = RelayPair (proxy_in, proxy_out)
+
+            yield client.Write (b'request')
+            yield client.Flush ()
+            self.assertEqual ((yield server.ReadUntilSize (7)), b'request')
+
+            yield server.Write (b'response')
+            yield server.Flush ()
+            server.Shutdown (socket.SHUT_WR)
+            self.assertEqual ((yield client.ReadUntilEof ()), b'response')
+
+            client.Shutdown (socket.SHUT_WR)
+            with self.assertRaises (BrokenPipeError):
+                yield server.Read (1)
+
+            self.assertEqual ((yield relay), (7, 8))
+
+        finally:
+            for sock in (client, proxy_in, proxy_out, server):
+                sock.Dispose ()
+
+# vim: nu ft=python columns=120 :
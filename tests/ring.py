@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+import struct
+import unittest
+
+from . import AsyncTest
+from ..core import BrokenPipeError
+from ..stream import SharedPipe
+
+__all__ = ('SharedPipeTest',)
+#------------------------------------------------------------------------------#
+# Shared Pipe Test                                                             #
+#------------------------------------------------------------------------------#
+class SharedPipeTest (unittest.TestCase):
+    """Shared memory pipe unit tests
+    """
+
+    @AsyncTest
+    def testTransfer (self):
+        data = b''.join (str (index).encode () for index in range (1 << 12))
+        with SharedPipe (capacity = 1000, buffer_size = 300) as pipe:
+            self.assertEqual (pipe.Reader.Base.Capacity, 1000)
+
+            # data does not fit into the ring, so writer waits for reader
+            write = pipe.Writer.Write (data)
+            flush = pipe.Writer.Flush ()
+            self.assertEqual ((yield pipe.Reader.ReadUntilSize (len (data))), data)
+            yield write
+            yield flush
+            self.assertEqual (pipe.Reader.Base.Length, 0)
+
+            # structures over ring boundary
+            yield pipe.Writer.Write (b'x' * 990)
+            yield pipe.Writer.Flush ()
+            yield pipe.Reader.ReadUntilSize (990)
+            pipe.Writer.StructListWriteBuffer (list (range (100)), struct.Struct ('I'))
+            yield pipe.Writer.Flush ()
+            self.assertEqual ((yield pipe.Reader.StructListRead (struct.Struct ('I'))), list (range (100)))
+
+    @AsyncTest
+    def testDispose (self):
+        pipe = SharedPipe (capacity = 1000)
+        try:
+            # remaining data is readable after writer is disposed
+            yield pipe.Writer.Write (b'data')
+            yield pipe.Writer.Dispose ()
+            self.assertEqual ((yield pipe.Reader.Read (4)), b'data')
+            with self.assertRaises (BrokenPipeError):
+                yield pipe.Reader.Read (1)
+
+        finally:
+            pipe.Dispose ()
+
+        pipe = SharedPipe (capacity = 1000)
+        try:
+            yield pipe.Reader.Dispose ()
+            with self.assertRaises (BrokenPipeError):
+                yield pipe.Writer.Write (b'data')
+                yield pipe.Writer.Flush ()
+
+        finally:
+            pipe.Dispose ()
+
+# vim: nu ft=python columns=120 :
@@ -0,0 +1,225 @@
+# -*- coding: utf-8 -*-
+import os
+import errno
+import socket
+import tempfile
+import unittest
+
+from . import AsyncTest, WriteVectorCheck
+from ..stream import Stream, BufferedSocket, DatagramSocket
+
+__all__ = ('SocketTest', 'DatagramSocketTest',)
+#------------------------------------------------------------------------------#
+# Socket Test                                                                  #
+#------------------------------------------------------------------------------#
+class SocketTest (unittest.TestCase):
+    """Socket unit tests
+    """
+
+    @AsyncTest
+    def testSendFile (self):
+        data = b''.join (str (index).encode () for index in range (1 << 14))
+
+        sender, receiver = (BufferedSocket (sock) for sock in socket.socketpair ())
+        try:
+            with tempfile.TemporaryFile () as file:
+                file.write (data)
+                file.flush ()
+
+                # buffered data is sent first
+                yield sender.Write (b'header')
+                self.assertEqual ((yield sender.SendFile (file)), len (data))
+                self.assertEqual ((yield receiver.ReadUntilSize (6 + len (data))), b'header' + data)
+
+                # offset and count
+                self.assertEqual ((yield sender.SendFile (file.fileno (), 10, 100)), 100)
+                self.assertEqual ((yield receiver.ReadUntilSize (100)), data [10:110])
+
+                # generic implementation
+                self.assertEqual ((yield Stream.SendFile (sender.Base, file, len (data) - 10)), 10)
+                self.assertEqual ((yield receiver.ReadUntilSize (10)), data [-10:])
+
+        finally:
+            sender.Dispose ()
+            receiver.Dispose ()
+
+    @unittest.skipIf (not hasattr (socket.socket, 'sendmsg'), 'sendmsg is not supported')
+    @AsyncTest
+    def testFds (self):
+        sender, receiver = (BufferedSocket (sock) for sock in socket.socketpair ())
+        try:
+            with tempfile.TemporaryFile () as file:
+                file.write (b'content')
+                file.flush ()
+
+                # buffered data is flushed first
+                yield sender.Write (b'header')
+                send = sender.SendFds ((file, file.fileno ()), b'fds')
+                self.assertEqual ((yield receiver.Base.Read (6)), b'header')
+                self.assertEqual ((yield send), 3)
+
+                data, fds = yield receiver.RecvFds (3, 4)
+                try:
+                    self.assertEqual (data, b'fds')
+                    self.assertEqual (len (fds), 2)
+                    for fd in fds:
+                        self.assertEqual (os.fstat (fd).st_ino, os.fstat (file.fileno ()).st_ino)
+                    self.assertEqual (os.pread (fds [0], 7, 0), b'content')
+                finally:
+                    for fd in fds:
+                        os.close (fd)
+
+                # truncated descriptors
+                yield sender.SendFds ((file, file, file), b'fds')
+                with self.assertRaises (socket.error) as context:
+                    yield receiver.RecvFds (3, 1)
+                self.assertEqual (context.exception.errno, errno.EMSGSIZE)
+
+                # buffered data would discard descriptors
+                yield sender.Write (b'data')
+                yield sender.Flush ()
+                self.assertEqual ((yield receiver.Read (1)), b'd')
+                with self.assertRaises (RuntimeError):
+                    yield receiver.RecvFds (3, 1)
+
+        finally:
+            sender.Dispose ()
+            receiver.Dispose ()
+
+    @unittest.skipIf (not hasattr (socket.socket, 'sendmsg'), 'sendmsg is not supported')
+    @AsyncTest
+    def testWriteVector (self):
+        sender, receiver = (BufferedSocket (sock, 1 << 20) for sock in socket.socketpair ())
+        try:
+            sender.Base.sock.setsockopt (socket.SOL_SOCKET, socket.SO_SNDBUF, 1 << 12)
+
+            # flush is done with sendmsg
+            yield WriteVectorCheck (self, sender, receiver)
+
+        finally:
+            sender.Dispose ()
+            receiver.Dispose ()
+
+    @AsyncTest
+    def testCork (self):
+        server = socket.socket ()
+        try:
+            server.bind (('127.0.0.1', 0))
+            server.listen (1)
+            client = socket.create_connection (server.getsockname ())
+            sender, receiver = BufferedSocket (client, 1024), BufferedSocket (server.accept () [0])
+        finally:
+            server.close ()
+
+        unix_pair = [BufferedSocket (sock) for sock in socket.socketpair ()]
+        try:
+            # unix domain socket can not be corked
+            with self.assertRaises (ValueError):
+                unix_pair [0].AutoFlush (True, cork = True)
+
+            data = b'x' * 4096
+            sender.AutoFlush (True, cork = True)
+            sender.WriteBuffer (data)
+            self.assertEqual ((yield receiver.ReadUntilSize (len (data))), data)
+            self.assertFalse (sender.Base.Cork ())
+
+        finally:
+            for stream in [sender, receiver] + unix_pair:
+                stream.Dispose ()
+
+#------------------------------------------------------------------------------#
+# Datagram Socket Test                                                         #
+#------------------------------------------------------------------------------#
+class DatagramSocketTest (unittest.TestCase):
+    """Datagram socket unit tests
+    """
+
+    def datagram_create (self):
+        """Create bound datagram socket (must be called inside asynchronous test)
+        """
+        sock = DatagramSocket ()
+        sock.Bind (('127.0.0.1', 0))
+        return sock
+
+    @AsyncTest
+    def testSendRecv (self):
+        sender, receiver = self.datagram_create (), self.datagram_create ()
+        try:
+            recv = receiver.RecvFrom ()
+            self.assertFalse (recv.IsCompleted ())
+            self.assertEqual ((yield sender.SendTo (b'datagram', receiver.Socket.getsockname ())), 8)
+            self.assertEqual ((yield recv), (b'datagram', sender.Socket.getsockname ()))
+
+        finally:
+            sender.Dispose ()
+            receiver.Dispose ()
+
+    @AsyncTest
+    def testBatch (self):
+        sender, receiver = self.datagram_create (), self.datagram_create ()
+        address = receiver.Socket.getsockname ()
+        try:
+            datagrams = [str (index).encode () for index in range (32)]
+            self.assertEqual ((yield sender.SendToBatch (datagrams, address)), 32)
+            self.assertEqual ((yield sender.SendToBatch ([(b'last', address)])), 1)
+
+            # count limit
+            batch = yield receiver.RecvFromBatch (count = 16)
+            self.assertEqual ([data for data, addr in batch], datagrams [:16])
+
+            # drain
+            batch = yield receiver.RecvFromBatch ()
+            self.assertEqual ([data for data, addr in batch], datagrams [16:] + [b'last'])
+            self.assertEqual (set (addr for data, addr in batch), set ((sender.Socket.getsockname (),)))
+
+        finally:
+            sender.Dispose ()
+            receiver.Dispose ()
+
+    @AsyncTest
+    def testOffload (self):
+        sender, receiver = self.datagram_create (), self.datagram_create ()
+        try:
+            try:
+                sender.SegmentSize (100)
+                receiver.ReceiveOffload (True)
+            except (socket.error, NotImplementedError):
+                self.skipTest ('UDP offload is not supported')
+            self.assertEqual (sender.SegmentSize (), 100)
+            self.assertTrue (receiver.ReceiveOffload ())
+
+            datagrams = [bytes (bytearray ((index,)) * 100) for index in range (8)] + [b'tail']
+            self.assertEqual ((yield sender.SendToBatch (datagrams, receiver.Socket.getsockname ())), 9)
+
+            received = []
+            while len (received) < len (datagrams):
+                received.extend (data for data, addr in (yield receiver.RecvFromBatch ()))
+            self.assertEqual (received, datagrams)
+
+            # datagrams which are not coalesced are not segmented
+            self.assertEqual ((yield sender.SendTo (b'x' * 150, receiver.Socket.getsockname ())), 150)
+            self.assertEqual ((yield sender.SendToBatch ([b'y' * 150], receiver.Socket.getsockname ())), 1)
+            received = []
+            while len (received) < 2:
+                received.extend (data for data, addr in (yield receiver.RecvFromBatch ()))
+            self.assertEqual (received, [b'x' * 150, b'y' * 150])
+
+            # full segment followed by oversized datagram or datagram to other address
+            other = self.datagram_create ()
+            try:
+                address, other_address = receiver.Socket.getsockname (), other.Socket.getsockname ()
+                self.assertEqual ((yield sender.SendToBatch ([(b'a' * 100, address), (b'b' * 150, address),
+                    (b'c' * 100, address), (b'd' * 100, other_address)])), 4)
+                received = []
+                while len (received) < 3:
+                    received.extend (data for data, addr in (yield receiver.RecvFromBatch ()))
+                self.assertEqual (received, [b'a' * 100, b'b' * 150, b'c' * 100])
+                self.assertEqual ((yield other.RecvFrom ()) [0], b'd' * 100)
+            finally:
+                other.Dispose ()
+
+        finally:
+            sender.Dispose ()
+            receiver.Dispose ()
+
+# vim: nu ft=python columns=120 :
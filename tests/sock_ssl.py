@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+import os
+import socket
+import unittest
+try:
+    import ssl
+except ImportError:
+    ssl = None # no SSL support
+
+from . import AsyncTest
+from ..core import BrokenPipeError
+from ..future import Future
+from ..stream import BufferedStream, BufferedSocket, BufferedSocketSSL, StreamSSL, SSLSessionCache, Relay
+
+__all__ = ('SocketSSLTest',)
+#------------------------------------------------------------------------------#
+# SSL Socket Test                                                              #
+#------------------------------------------------------------------------------#
+keycert = os.path.join (os.path.dirname (__file__), 'keycert.pem')
+
+@unittest.skipIf (not hasattr (ssl, 'SSLContext'), 'SSLContext is not supported')
+class SocketSSLTest (unittest.TestCase):
+    """SSL socket unit tests
+    """
+
+    def setUp (self):
+        self.server_context = ssl.SSLContext (getattr (ssl, 'PROTOCOL_TLS_SERVER', ssl.PROTOCOL_SSLv23))
+        self.server_context.load_cert_chain (keycert)
+
+        self.client_context = ssl.SSLContext (getattr (ssl, 'PROTOCOL_TLS_CLIENT', ssl.PROTOCOL_SSLv23))
+        self.client_context.check_hostname = False
+        self.client_context.verify_mode = ssl.CERT_REQUIRED
+        self.client_context.load_verify_locations (keycert)
+
+    def server_create (self):
+        """Create listening server socket (must be called inside asynchronous test)
+        """
+        server = BufferedSocketSSL (socket.socket (), context = self.server_context)
+        server.Bind (('127.0.0.1', 0))
+        server.Listen (10)
+        return server
+
+    @AsyncTest
+    def testEcho (self):
+        server = self.server_create ()
+        client = BufferedSocketSSL (socket.socket (), context = self.client_context, session_cache = False)
+        connect = client.Connect (server.Socket.getsockname ())
+        server_client, addr = yield server.Accept ()
+        try:
+            yield connect
+            self.assertFalse (client.Base.KernelTLS ()) # option is not set on the context
+
+            yield client.Write (b'request')
+            yield client.Flush ()
+            self.assertEqual ((yield server_client.ReadUntilSize (7)), b'request')
+
+            yield server_client.Write (b'response')
+            yield server_client.Flush ()
+            self.assertEqual ((yield client.ReadUntilSize (8)), b'response')
+
+        finally:
+            client.Dispose ()
+            server_client.Dispose ()
+            server.Dispose ()
+
+    @AsyncTest
+    def testHandshakeTimeout (self):
+        server = self.server_create ()
+        server.HandshakeTimeout (0.05)
+        self.assertEqual (server.HandshakeTimeout (), 0.05)
+
+        client = BufferedSocket (socket.socket ())
+        try:
+            yield client.Connect (server.Socket.getsockname ())
+            server_client, addr = yield server.Accept ()
+            with self.assertRaises (socket.timeout):
+                yield server_client.Read (1)
+            server_client.Dispose ()
+
+        finally:
+            client.Dispose ()
+            server.Dispose ()
+
+    @unittest.skipIf (not hasattr (ssl, 'SSLSession'), 'SSLSession is not supported')
+    @AsyncTest
+    def testSessionResume (self):
+        server = self.server_create ()
+        cache = SSLSessionCache ()
+
+        reused = []
+        for _ in range (2):
+            client = BufferedSocketSSL (socket.socket (), context = self.client_context, session_cache = cache)
+            connect = client.Connect (server.Socket.getsockname ())
+            server_client, addr = yield server.Accept ()
+            try:
+                yield connect
+
+                yield server_client.Write (b'data')
+                yield server_client.Flush ()
+                self.assertEqual ((yield client.ReadUntilSize (4)), b'data')
+                reused.append (client.Socket.session_reused)
+
+            finally:
+                client.Dispose ()
+                server_client.Dispose ()
+
+        server.Dispose ()
+        self.assertEqual (reused, [False, True])
+        self.assertEqual (len (cache), 1)
+
+    @unittest.skipIf (not hasattr (ssl, 'MemoryBIO'), 'MemoryBIO is not supported')
+    @AsyncTest
+    def testStreamSSL (self):
+        client_sock, server_sock = socket.socketpair ()
+        client = StreamSSL (BufferedSocket (client_sock), self.client_context)
+        server = StreamSSL (BufferedSocket (server_sock), self.server_context, True)
+        try:
+            yield Future.All ((client.Handshake (), server.Handshake ()))
+
+            # buffered records are sent together
+            stream = BufferedStream (client)
+            for index in range (16):
+                yield stream.Write (b'record')
+            yield stream.Flush ()
+
+            data = b''
+            while len (data) < 96:
+                data += yield server.Read (1024)
+            self.assertEqual (data, b'record' * 16)
+
+            yield server.WriteVector ([b'resp', b'onse'])
+            yield server.Flush ()
+            self.assertEqual ((yield stream.ReadUntilSize (8)), b'response')
+
+            # close notification
+            yield server.Dispose ()
+            with self.assertRaises (BrokenPipeError):
+                yield client.Read (1)
+
+        finally:
+            client.Dispose ()
+            server.Dispose ()
+
+    @unittest.skipIf (not hasattr (ssl, 'MemoryBIO'), 'MemoryBIO is not supported')
+    @AsyncTest
+    def testRelayStreamSSL (self):
+        client_sock, server_sock = socket.socketpair ()
+        client = StreamSSL (BufferedSocket (client_sock), self.client_context)
+        server = BufferedStream (StreamSSL (BufferedSocket (server_sock), self.server_context, True))
+        proxy_out, target = (BufferedSocket (sock) for sock in socket.socketpair ())
+        try:
+            yield Future.All ((client.Handshake (), server.Handshake ()))
+            yield client.Write (b'buffered data')
+            yield client.Flush ()
+            self.assertEqual ((yield server.ReadUntilSize (4)), b'buff')
+
+            # decrypted data is relayed
+            relay = Relay (server, proxy_out)
+            yield client.Write (b' plain')
+            yield client.Dispose ()
+
+            self.assertEqual ((yield target.ReadUntilEof ()), b'ered data plain')
+            self.assertEqual ((yield relay), 15)
+
+        finally:
+            for stream in (client, server, proxy_out, target):
+                stream.Dispose ()
+
+    def testSessionCache (self):
+        cache = SSLSessionCache (2)
+        cache.Set ('a', 1)
+        cache.Set ('b', 2)
+        self.assertEqual (cache.Get ('a'), 1)
+
+        # least recently used session is evicted
+        cache.Set ('c', 3)
+        self.assertEqual (len (cache), 2)
+        self.assertEqual (cache.Get ('b'), None)
+        self.assertEqual ((cache.Get ('a'), cache.Get ('c')), (1, 3))
+
+        self.assertTrue (cache.Remove ('a'))
+        self.assertFalse (cache.Remove ('a'))
+        self.assertEqual (len (cache), 1)
+
+# vim: nu ft=python columns=120 :
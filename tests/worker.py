@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+import threading
+import unittest
+
+from . import AsyncTest
+from ..core import WorkerPool
+from ..future import FutureCanceled
+
+__all__ = ('WorkerPoolTest',)
+#------------------------------------------------------------------------------#
+# Worker Pool Test                                                             #
+#------------------------------------------------------------------------------#
+class WorkerPoolTest (unittest.TestCase):
+    """Worker pool unit tests
+    """
+
+    @AsyncTest
+    def testSubmit (self):
+        with WorkerPool (2) as pool:
+            main = threading.current_thread ()
+            self.assertEqual ((yield pool.Submit (lambda a, b: a + b, 1, 2)), 3)
+            self.assertNotEqual ((yield pool.Submit (threading.current_thread)), main)
+
+            # errors are propagated
+            with self.assertRaises (ZeroDivisionError):
+                yield pool.Submit (lambda: 1 / 0)
+
+            # result is resolved in core's thread
+            threads = []
+            yield pool.Submit (lambda: None).Then (lambda *_: threads.append (threading.current_thread ()))
+            self.assertEqual (threads, [main])
+
+    @AsyncTest
+    def testMap (self):
+        with WorkerPool (3) as pool:
+            self.assertEqual ((yield pool.Map (lambda item: item * 2, range (100))), list (range (0, 200, 2)))
+            self.assertEqual ((yield pool.Map (lambda item: item * 2, range (10), 4)), list (range (0, 20, 2)))
+            self.assertEqual ((yield pool.Map (lambda item: item, ())), [])
+
+    @AsyncTest
+    def testDispose (self):
+        pool = WorkerPool (1)
+        started, event = threading.Event (), threading.Event ()
+        blocked = pool.Submit (lambda: started.set () or event.wait ())
+        pending = pool.Submit (lambda: None)
+        started.wait ()
+
+        # started jobs are finished, pending are canceled
+        pool.Dispose ()
+        event.set ()
+
+        yield blocked
+        with self.assertRaises (FutureCanceled):
+            yield pending
+        with self.assertRaises (FutureCanceled):
+            yield pool.Submit (lambda: None)
+
+# vim: nu ft=python columns=120 :